@@ -252,8 +252,305 @@ def analyze_poor_performance_reasons(performance: Dict[str, List[Dict]],
     
     return reasons
 
-def generate_report(results_file: str, attempts_dir: str) -> str:
-    """Generate comprehensive failure analysis report"""
+def analyze_size_scaling(results: Dict[str, Any]) -> Dict[str, List[Dict]]:
+    """Group problem-size sweep curves by scaling behaviour"""
+    
+    scaling = {
+        'compute_bound': [],    # Speedup holds once the working set leaves the caches
+        'bandwidth_bound': [],  # Speedup collapses out of cache
+        'unknown': []           # Sweep incomplete or no out-of-cache point on this host
+    }
+    
+    for result in results['results']:
+        sweep = result.get('size_sweep')
+        if not sweep:
+            continue
+        
+        curve = []
+        for point in sweep.get('points', []):
+            if point.get('speedup') is None:
+                continue
+            label = point['cache_level'] + ('+r' if point.get('remainder') else '')
+            curve.append(f"{label}={point['speedup']:.2f}x" + ('' if point.get('correct') else '(FAIL)'))
+        
+        scaling.setdefault(sweep.get('scaling', 'unknown'), []).append({
+            'function': result['function'],
+            'curve': curve,
+            'failed_sizes': [p for p in sweep.get('points', []) if p.get('status') != 'ok' or not p.get('correct')]
+        })
+    
+    return scaling
+
+def analyze_cache_modes(results: Dict[str, Any]) -> Dict[str, List[Dict]]:
+    """Group functions by how their speedup depends on the cache state"""
+    
+    sensitivity = {
+        'wins_everywhere': [],  # Speedup holds with hot, cold and streaming caches
+        'wins_only_hot': [],    # Speedup only while the data is already cached
+        'mixed': [],            # Wins in some out-of-cache modes but not others
+        'no_win': [],           # No mode beats the baseline
+        'unknown': []           # No correct measurement
+    }
+    
+    for result in results['results']:
+        cache_modes = result.get('cache_modes')
+        if not cache_modes:
+            continue
+        
+        speedups = []
+        for mode, record in cache_modes.get('modes', {}).items():
+            if record.get('speedup') is None:
+                speedups.append(f"{mode}={record.get('status', 'n/a')}")
+            else:
+                speedups.append(f"{mode}={record['speedup']:.2f}x" + ('' if record.get('correct') else '(FAIL)'))
+        
+        sensitivity.setdefault(cache_modes.get('sensitivity', 'unknown'), []).append({
+            'function': result['function'],
+            'speedups': speedups
+        })
+    
+    return sensitivity
+
+def analyze_alignment(results: Dict[str, Any]) -> Dict[str, List[Dict]]:
+    """Collect functions that crash, fail or slow down on misaligned or huge-page arrays"""
+    
+    alignment = {
+        'crashed': [],      # e.g. aligned loads on misaligned data
+        'incorrect': [],    # Checksum mismatch at some placement
+        'slowed_down': [],  # Vectorized kernel noticeably slower than on aligned heap arrays
+        'robust': []        # Correct and not slower at every placement
+    }
+    
+    for result in results['results']:
+        sweep = result.get('alignment_sweep')
+        if not sweep:
+            continue
+        summary = sweep.get('summary', {})
+        speedups = [f"{p['name']}={p['speedup']:.2f}x" if p.get('speedup') is not None
+                    else f"{p['name']}={p.get('signal') or p.get('status')}"
+                    for p in sweep.get('placements', [])]
+        entry = {'function': result['function'], 'speedups': speedups}
+        problems = [key for key in ['crashed', 'incorrect', 'slowed_down'] if summary.get(key)]
+        for key in problems:
+            alignment[key].append(dict(entry, placements=summary[key]))
+        if not problems:
+            alignment['robust'].append(entry)
+    
+    return alignment
+
+def analyze_thread_scaling(results: Dict[str, Any], efficiency_threshold: float = 0.7) -> Dict[str, List[Dict]]:
+    """Summarize OpenMP strong scaling next to the single-thread SIMD speedup"""
+    
+    scaling = {
+        'scales': [],          # Efficiency at the largest thread count >= efficiency_threshold
+        'poor_scaling': [],    # Threads used but efficiency below the threshold
+        'single_threaded': []  # Candidate did not use OpenMP
+    }
+    
+    for result in results['results']:
+        thread_scaling = result.get('thread_scaling')
+        if not thread_scaling:
+            continue
+        points = [p for p in thread_scaling.get('points', []) if p.get('parallel_efficiency') is not None]
+        entry = {
+            'function': result['function'],
+            'simd_speedup': thread_scaling.get('simd_speedup'),
+            'efficiencies': [f"{p['threads']}t={p['parallel_efficiency']:.2f}" for p in points],
+            'incorrect_threads': [p['threads'] for p in thread_scaling.get('points', []) if not p.get('correct')]
+        }
+        if not thread_scaling.get('uses_openmp'):
+            scaling['single_threaded'].append(entry)
+        elif points and points[-1]['parallel_efficiency'] >= efficiency_threshold:
+            scaling['scales'].append(entry)
+        else:
+            scaling['poor_scaling'].append(entry)
+    
+    return scaling
+
+def analyze_roofline(results: Dict[str, Any], ceiling_pct: float = 80.0) -> Dict[str, List[Dict]]:
+    """Group successful functions by which roofline ceiling bounds them"""
+    
+    roofline = {
+        'memory_bound': [],     # Arithmetic intensity below the ridge point
+        'compute_bound': [],    # At or above the ridge point (or no flops to move data for)
+        'original_at_ceiling': []  # Baseline already at >= ceiling_pct of the roofline
+    }
+    
+    for result in results['results']:
+        final_perf = result.get('final_performance_data')
+        if not result['success'] or not final_perf or not final_perf.get('roofline'):
+            continue
+        annotation = final_perf['roofline']
+        original = annotation.get('original') or {}
+        vectorized = annotation.get('vectorized') or {}
+        entry = {
+            'function': result['function'],
+            'speedup': final_perf.get('speedup'),
+            'memory_level': annotation['memory_level'],
+            'arithmetic_intensity': annotation['arithmetic_intensity'],
+            'original_pct': original.get('pct_of_roofline'),
+            'vectorized_pct': vectorized.get('pct_of_roofline'),
+            'vectorized_gbs': vectorized.get('gbs'),
+            'vectorized_gflops': vectorized.get('gflops')
+        }
+        roofline[f"{annotation['bound']}_bound"].append(entry)
+        if entry['original_pct'] is not None and entry['original_pct'] >= ceiling_pct:
+            roofline['original_at_ceiling'].append(entry)
+    
+    return roofline
+
+def analyze_compiler_baselines(results: Dict[str, Any]) -> List[Dict]:
+    """LLM speedups against the autotuned compiler build next to the default-flags speedup"""
+    
+    entries = []
+    for result in results['results']:
+        baseline = result.get('compiler_baseline')
+        if not baseline:
+            continue
+        final_perf = result.get('final_performance_data') or {}
+        entries.append({
+            'function': result['function'],
+            'success': result['success'],
+            'extra_flags': baseline['extra_flags'],
+            'flag_gain': baseline.get('gain'),
+            'speedup_vs_tuned': final_perf.get('speedup'),
+            'speedup_vs_default': final_perf.get('speedup_vs_default_flags')
+        })
+    return entries
+
+def analyze_compiler_strategies(results: Dict[str, Any]) -> List[Dict]:
+    """PGO and polyhedral build timings of the original next to the default build and the LLM kernel"""
+    
+    entries = []
+    for result in results['results']:
+        strategies = result.get('compiler_strategies')
+        if not strategies:
+            continue
+        entries.append({
+            'function': result['function'],
+            'builds': {name: record for name, record in strategies['builds'].items() if name != 'default'},
+            'llm_speedup_vs': strategies.get('llm_speedup_vs', {})
+        })
+    return entries
+
+def analyze_isas(results: Dict[str, Any]) -> Dict[str, Dict]:
+    """Success rate and mean speedup per target ISA"""
+    
+    by_isa = defaultdict(lambda: {'total': 0, 'successful': 0, 'speedups': []})
+    for result in results['results']:
+        stats = by_isa[result.get('isa', 'avx2')]
+        stats['total'] += 1
+        if result['success']:
+            stats['successful'] += 1
+            speedup = (result.get('final_performance_data') or {}).get('speedup')
+            if speedup is not None:
+                stats['speedups'].append(speedup)
+    
+    for stats in by_isa.values():
+        stats['mean_speedup'] = sum(stats['speedups']) / len(stats['speedups']) if stats['speedups'] else None
+    return dict(by_isa)
+
+def analyze_pipeline_timing(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Wall time per pipeline stage and LLM tokens summed over all functions"""
+    
+    totals = {'stages': defaultdict(lambda: {'seconds': 0.0, 'count': 0}),
+              'tokens': {'input_tokens': 0, 'output_tokens': 0}, 'wall_seconds': 0.0}
+    for result in results['results']:
+        timing = result.get('timing')
+        if not timing:
+            continue
+        totals['wall_seconds'] += timing.get('wall_seconds', 0.0)
+        for stage, entry in timing['stages'].items():
+            totals['stages'][stage]['seconds'] += entry['seconds']
+            totals['stages'][stage]['count'] += entry['count']
+        for name in totals['tokens']:
+            totals['tokens'][name] += timing['tokens'].get(name, 0)
+    totals['stages'] = dict(totals['stages'])
+    return totals
+
+def analyze_kernel_registry(results: Dict[str, Any]) -> Dict[str, Any]:
+    """How often registered winners were reused, and which functions got a new winner"""
+    
+    summary = {'consulted': 0, 'reused': [], 'new_winners': [], 'llm_calls': 0}
+    for result in results['results']:
+        registry = result.get('kernel_registry')
+        if not registry:
+            continue
+        summary['consulted'] += 1
+        summary['llm_calls'] += sum(1 for attempt in result['attempts'] if not attempt.get('registered'))
+        speedup = (result.get('final_performance_data') or {}).get('speedup')
+        entry = {'function': result['function'], 'speedup': speedup,
+                 'registered_speedup': registry.get('registered_speedup')}
+        if registry.get('reused'):
+            summary['reused'].append(entry)
+        elif registry.get('new_winner'):
+            summary['new_winners'].append(entry)
+    return summary
+
+def analyze_precisions(result_sets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Success rate and mean speedup per real_t precision, plus per-function float vs double speedups.
+    
+    result_sets are loaded results files; runs at different precisions are usually separate files.
+    """
+    
+    by_precision = defaultdict(lambda: {'total': 0, 'successful': 0, 'speedups': []})
+    speedups = defaultdict(dict)
+    for results in result_sets:
+        for result in results['results']:
+            precision = result.get('precision', results.get('precision', 'float'))
+            stats = by_precision[precision]
+            stats['total'] += 1
+            if not result['success']:
+                continue
+            stats['successful'] += 1
+            speedup = (result.get('final_performance_data') or {}).get('speedup')
+            if speedup is not None:
+                stats['speedups'].append(speedup)
+                key = (result['function'], result.get('isa', 'avx2'))
+                speedups[key][precision] = max(speedup, speedups[key].get(precision, 0.0))
+    
+    for stats in by_precision.values():
+        stats['mean_speedup'] = sum(stats['speedups']) / len(stats['speedups']) if stats['speedups'] else None
+    pairs = [{'function': func, 'isa': isa, 'float': values['float'], 'double': values['double']}
+             for (func, isa), values in sorted(speedups.items()) if 'float' in values and 'double' in values]
+    return {'by_precision': dict(by_precision), 'pairs': pairs}
+
+def analyze_success_by_iteration(result_sets: List[Dict[str, Any]]) -> Dict[str, Dict]:
+    """
+    Cumulative success rate after each FSM iteration, with and without the dependence-analysis prompt hints.
+    
+    A function counts as solved at the iteration of its first successful LLM attempt; registry
+    reuse does not count. result_sets are loaded results files, typically a run before and one
+    after enabling the hints.
+    """
+    
+    groups = defaultdict(lambda: {'total': 0, 'solved_at': [], 'max_iterations': 0})
+    for results in result_sets:
+        label = 'with dependence hints' if results.get('dependence_hints') else 'without dependence hints'
+        group = groups[label]
+        group['max_iterations'] = max(group['max_iterations'], results.get('max_iterations') or 0)
+        for result in results['results']:
+            group['total'] += 1
+            iterations = [attempt.get('iteration', 0) for attempt in result['attempts']
+                          if attempt.get('success') and not attempt.get('registered')]
+            if iterations:
+                group['solved_at'].append(min(iterations))
+    
+    for group in groups.values():
+        last = max([group['max_iterations']] + group['solved_at'])
+        group['cumulative_rate'] = [sum(1 for at in group['solved_at'] if at <= k) / group['total'] if group['total'] else 0.0
+                                    for k in range(1, last + 1)]
+        group['mean_iterations'] = sum(group['solved_at']) / len(group['solved_at']) if group['solved_at'] else None
+    return dict(groups)
+
+def generate_report(results_file: str, attempts_dir: str, compare_files: List[str] = None) -> str:
+    """
+    Generate comprehensive failure analysis report
+    
+    compare_files are further results files (e.g. the same functions at the other precision,
+    or without the dependence hints) that only feed the precision and iteration comparisons.
+    """
     
     results = load_results(results_file)
     failures = analyze_failures(results)
@@ -362,6 +659,170 @@ def generate_report(results_file: str, attempts_dir: str) -> str:
     if llm_broke:
         report.append(f"- **LLM broke compiler vectorization**: {', '.join(llm_broke)}")
     
+    # Problem-size scaling analysis
+    size_scaling = analyze_size_scaling(results)
+    if any(size_scaling.values()):
+        report.append("\n## Problem-Size Scaling\n")
+        report.append("Speedup per working-set size (L1/L2/L3/DRAM; +r = non-multiple-of-8 remainder size):")
+        for category, entries in size_scaling.items():
+            if entries:
+                report.append(f"- **{category.replace('_', ' ').title()}**: {len(entries)} functions")
+                for entry in entries:
+                    report.append(f"  - {entry['function']}: {', '.join(entry['curve'])}")
+                    if entry['failed_sizes']:
+                        sizes = [f"{p['len_1d']}x{p['len_2d']}" for p in entry['failed_sizes']]
+                        report.append(f"    - Failed or incorrect at sizes: {', '.join(sizes)}")
+    
+    # Cache-state analysis
+    cache_sensitivity = analyze_cache_modes(results)
+    if any(cache_sensitivity.values()):
+        report.append("\n## Cache-State Sensitivity\n")
+        report.append("Speedup with arrays hot in cache, flushed (cold) and evicted by streaming traffic:")
+        for category, entries in cache_sensitivity.items():
+            if entries:
+                report.append(f"- **{category.replace('_', ' ').title()}**: {len(entries)} functions")
+                for entry in entries:
+                    report.append(f"  - {entry['function']}: {', '.join(entry['speedups'])}")
+    
+    # Alignment / huge-page analysis
+    alignment = analyze_alignment(results)
+    if any(alignment.values()):
+        report.append("\n## Alignment and Huge-Page Sensitivity\n")
+        report.append("Speedup with heap arrays at offsets from a 64-byte boundary and on huge pages:")
+        for category, entries in alignment.items():
+            if entries:
+                report.append(f"- **{category.replace('_', ' ').title()}**: {len(entries)} functions")
+                for entry in entries:
+                    where = f" (at {', '.join(entry['placements'])})" if entry.get('placements') else ""
+                    report.append(f"  - {entry['function']}{where}: {', '.join(entry['speedups'])}")
+    
+    # OpenMP thread scaling
+    thread_scaling = analyze_thread_scaling(results)
+    if any(thread_scaling.values()):
+        report.append("\n## OpenMP Thread Scaling\n")
+        report.append("Single-thread SIMD speedup and parallel efficiency per thread count (pinned, strong scaling):")
+        for category, entries in thread_scaling.items():
+            if entries:
+                report.append(f"- **{category.replace('_', ' ').title()}**: {len(entries)} functions")
+                for entry in entries:
+                    simd = f"{entry['simd_speedup']:.2f}x" if entry['simd_speedup'] is not None else "n/a"
+                    line = f"  - {entry['function']}: SIMD {simd}, efficiency {', '.join(entry['efficiencies']) or 'n/a'}"
+                    if entry['incorrect_threads']:
+                        line += f" (incorrect at {entry['incorrect_threads']} threads)"
+                    report.append(line)
+    
+    # Roofline analysis
+    roofline = analyze_roofline(results)
+    if any(roofline.values()):
+        report.append("\n## Roofline Analysis\n")
+        report.append("Percent of the attainable roofline (original -> vectorized) at the cache level holding the working set:")
+        for category in ['memory_bound', 'compute_bound']:
+            entries = roofline[category]
+            if entries:
+                report.append(f"- **{category.replace('_', ' ').title()}**: {len(entries)} functions")
+                for entry in sorted(entries, key=lambda e: -(e['vectorized_pct'] or 0)):
+                    original_pct = f"{entry['original_pct']:.0f}%" if entry['original_pct'] is not None else "n/a"
+                    vectorized_pct = f"{entry['vectorized_pct']:.0f}%" if entry['vectorized_pct'] is not None else "n/a"
+                    speedup = f"{entry['speedup']:.2f}x" if entry['speedup'] is not None else "n/a"
+                    rates = ""
+                    if entry['vectorized_gbs'] is not None:
+                        rates = f", {entry['vectorized_gbs']:.1f} GB/s, {entry['vectorized_gflops']:.1f} GFLOP/s"
+                    report.append(f"  - {entry['function']} ({entry['memory_level']}, {speedup}): "
+                                  f"{original_pct} -> {vectorized_pct}{rates}")
+        if roofline['original_at_ceiling']:
+            functions = [f"{e['function']} ({e['original_pct']:.0f}%)" for e in roofline['original_at_ceiling']]
+            report.append(f"- **Original already at the ceiling (little headroom for any vectorization)**: {', '.join(functions)}")
+    
+    # Autotuned compiler baselines
+    compiler_baselines = analyze_compiler_baselines(results)
+    if compiler_baselines:
+        report.append("\n## Autotuned Compiler Baselines\n")
+        beaten = sum(1 for e in compiler_baselines if e['success'] and (e['speedup_vs_tuned'] or 0) > 1.0)
+        report.append(f"LLM beats the best gcc flag configuration on {beaten}/{len(compiler_baselines)} functions:")
+        for entry in compiler_baselines:
+            gain = f"{entry['flag_gain']:.2f}x" if entry['flag_gain'] else "n/a"
+            tuned = f"{entry['speedup_vs_tuned']:.2f}x" if entry['speedup_vs_tuned'] is not None else "n/a"
+            default = f"{entry['speedup_vs_default']:.2f}x" if entry['speedup_vs_default'] is not None else "n/a"
+            report.append(f"- {entry['function']}: flags {' '.join(entry['extra_flags']) or '(default)'} "
+                          f"({gain} over default); LLM {tuned} vs tuned, {default} vs default flags")
+    
+    # PGO and polyhedral compiler baselines
+    compiler_strategies = analyze_compiler_strategies(results)
+    if compiler_strategies:
+        report.append("\n## PGO and Polyhedral Baselines\n")
+        report.append("Original kernel speedup over the default build per strategy, and the LLM kernel's speedup over each:")
+        for entry in compiler_strategies:
+            parts = []
+            for name, record in entry['builds'].items():
+                if record.get('status') != 'ok':
+                    parts.append(f"{name} {record.get('status')}")
+                    continue
+                llm = entry['llm_speedup_vs'].get(name)
+                llm_text = f", LLM {llm:.2f}x" if llm is not None else ""
+                parts.append(f"{name} {record['speedup_over_default']:.2f}x{llm_text}")
+            default_llm = entry['llm_speedup_vs'].get('default')
+            default_text = f"LLM {default_llm:.2f}x vs default; " if default_llm is not None else ""
+            report.append(f"- {entry['function']}: {default_text}{'; '.join(parts)}")
+    
+    # Where the pipeline's wall time went
+    timing = analyze_pipeline_timing(results)
+    if timing['stages']:
+        report.append("\n## Pipeline Time Breakdown\n")
+        report.append(f"- Total function wall time: {timing['wall_seconds']:.1f}s; "
+                      f"LLM tokens: {timing['tokens']['input_tokens']} input, {timing['tokens']['output_tokens']} output")
+        for stage, entry in sorted(timing['stages'].items(), key=lambda item: -item[1]['seconds']):
+            share = 100.0 * entry['seconds'] / timing['wall_seconds'] if timing['wall_seconds'] else 0.0
+            report.append(f"- {stage}: {entry['seconds']:.1f}s over {entry['count']} calls ({share:.1f}%)")
+    
+    # Verified-kernel registry reuse
+    registry = analyze_kernel_registry(results)
+    if registry['consulted']:
+        report.append("\n## Verified Kernel Registry\n")
+        report.append(f"- Functions checked against the registry: {registry['consulted']}")
+        report.append(f"- Registered kernels reused: {len(registry['reused'])} "
+                      f"(LLM attempts made: {registry['llm_calls']})")
+        report.append(f"- New winners registered: {len(registry['new_winners'])}")
+        for entry in registry['new_winners']:
+            previous = entry['registered_speedup']
+            previous_text = f" (was {previous:.2f}x)" if previous is not None else ""
+            speedup_text = f"{entry['speedup']:.2f}x" if entry['speedup'] is not None else "n/a"
+            report.append(f"  - {entry['function']}: {speedup_text}{previous_text}")
+    
+    # Per-ISA results (only interesting when several targets were run)
+    isa_stats = analyze_isas(results)
+    if len(isa_stats) > 1 or results.get('skipped_isas'):
+        report.append("\n## Results by Target ISA\n")
+        for isa, stats in isa_stats.items():
+            mean = f"{stats['mean_speedup']:.2f}x" if stats['mean_speedup'] is not None else "n/a"
+            report.append(f"- **{isa}**: {stats['successful']}/{stats['total']} successful, mean speedup {mean}")
+        if results.get('skipped_isas'):
+            report.append(f"- **Skipped (not supported by host CPU)**: {', '.join(results['skipped_isas'])}")
+    
+    compare_sets = [load_results(path) for path in compare_files or []]
+    
+    # Success rate per iteration count, before and after the dependence hints
+    iteration_stats = analyze_success_by_iteration([results] + compare_sets)
+    if iteration_stats:
+        report.append("\n## Success by Iteration\n")
+        report.append("Share of functions solved within the first k iterations:")
+        for label, stats in sorted(iteration_stats.items()):
+            rates = ', '.join(f"{k}: {rate*100:.0f}%" for k, rate in enumerate(stats['cumulative_rate'], 1))
+            mean = f"{stats['mean_iterations']:.2f}" if stats['mean_iterations'] is not None else "n/a"
+            report.append(f"- **{label.capitalize()}** ({stats['total']} functions): {rates or 'n/a'}; "
+                          f"mean iterations to success {mean}")
+    
+    # Float vs double (needs results at both precisions, typically from two runs)
+    precision_stats = analyze_precisions([results] + compare_sets)
+    if len(precision_stats['by_precision']) > 1:
+        report.append("\n## Results by Precision\n")
+        for precision, stats in precision_stats['by_precision'].items():
+            mean = f"{stats['mean_speedup']:.2f}x" if stats['mean_speedup'] is not None else "n/a"
+            report.append(f"- **{precision}**: {stats['successful']}/{stats['total']} successful, mean speedup {mean}")
+        if precision_stats['pairs']:
+            report.append("\nFunctions vectorized at both precisions (float speedup / double speedup):")
+            for pair in precision_stats['pairs']:
+                report.append(f"- {pair['function']} [{pair['isa']}]: {pair['float']:.2f}x / {pair['double']:.2f}x")
+    
     # Detailed function analysis
     report.append("\n## Detailed Function Analysis\n")
     
@@ -426,7 +887,8 @@ def generate_report(results_file: str, attempts_dir: str) -> str:
 def main():
     import sys
     
-    # Allow path to be specified as command line argument
+    # Allow path to be specified as command line argument; further paths are compared by precision and prompt hints
+    compare_files = sys.argv[2:]
     if len(sys.argv) > 1:
         results_file = sys.argv[1]
         attempts_dir = sys.argv[1].replace("tsvc_vectorization_results.json", "tsvc_vectorized_attempts")
@@ -435,7 +897,7 @@ def main():
         results_file = "/home/qinxiao/workspace/PE/tsvc_vectorization_results.json"
         attempts_dir = "/home/qinxiao/workspace/PE/tsvc_vectorized_attempts"
     
-    report = generate_report(results_file, attempts_dir)
+    report = generate_report(results_file, attempts_dir, compare_files)
     print(report)
 
 if __name__ == "__main__":
@@ -5,237 +5,384 @@ Run multiple LLM vectorization experiments with different seeds for statistical
 
 import os
 import sys
-import subprocess
+import glob
 import json
 import time
+import traceback
+import multiprocessing
+import multiprocessing.connection
 from datetime import datetime
 import argparse
-import shutil
+
+
+class PrefixedOutput:
+    """stdout of a worker process: copied to the current run's output file and, line-prefixed, to the console"""
+    
+    def __init__(self, prefix: str, console, log_file=None):
+        self.prefix = prefix
+        self.console = console
+        self.log_file = log_file
+        self.partial = ""
+    
+    def write(self, text: str) -> int:
+        if self.log_file is not None:
+            self.log_file.write(text)
+        self.partial += text
+        while "\n" in self.partial:
+            line, self.partial = self.partial.split("\n", 1)
+            self.console.write(f"{self.prefix} {line}\n")
+        return len(text)
+    
+    def flush(self):
+        if self.log_file is not None:
+            self.log_file.flush()
+        self.console.flush()
+
+
+def scheduler_worker(worker_idx: int, configs: list, functions: list, tasks, done, resources,
+                     deadline: float, metrics_port: int = None):
+    """
+    Worker process: take (run, function, ISA) tasks from the shared queue until it hands out the
+    end marker or the global budget is spent. One experiment object serves tasks of every run.
+    """
+    if metrics_port is not None:
+        os.environ['TSVC_METRICS_PORT'] = str(metrics_port)
+    import vectorizer
+    from result_log import ResultLog
+    
+    output = PrefixedOutput(f"[Worker {worker_idx + 1}]", sys.__stdout__)
+    sys.stdout = sys.stderr = output
+    experiment = None
+    result_logs = {}
+    try:
+        while True:
+            task = tasks.get()
+            if task is None or time.time() >= deadline or resources.budget_exhausted():
+                break
+            config = configs[task['run']]
+            os.chdir(config.output_root)
+            start_time = time.time()
+            status = 'done'
+            result = None
+            with open(config.output_path("experiment_output.txt"), 'a') as log_file:
+                output.prefix = f"[Run {task['run'] + 1} {task['function']}/{task['isa']}]"
+                output.log_file = log_file
+                try:
+                    if experiment is None:
+                        experiment = vectorizer.create_experiment(config, resources)
+                        experiment.test_functions = experiment.extract_tsvc_functions(functions)
+                        default_iterations = experiment.max_iterations
+                    experiment.apply_config(config)
+                    # Headroom scheduling gives each task its own share of the iteration budget
+                    experiment.max_iterations = task.get('max_iterations', default_iterations)
+                    if experiment.isa.name != task['isa']:
+                        experiment.set_target_isa(task['isa'])
+                    if task['function'] in experiment.test_functions:
+                        result_log = result_logs.setdefault(
+                            task['run'], ResultLog(config.output_path('tsvc_results_log.jsonl')))
+                        result, _ = experiment.run_function(task['function'], result_log)
+                except Exception:
+                    traceback.print_exc()
+                    status = 'error'
+                output.flush()
+                output.log_file = None
+            done.put(dict(task, status=status, seconds=time.time() - start_time, worker=worker_idx,
+                          success=bool(result and result['success']),
+                          speedup=((result or {}).get('final_performance_data') or {}).get('speedup'),
+                          budget_exhausted=bool(result and result.get('budget_exhausted'))))
+    finally:
+        sys.stdout = sys.__stdout__
+        sys.stderr = sys.__stderr__
+
 
 class MultipleExperimentRunner:
     """Run multiple vectorization experiments with different seeds"""
     
-    def __init__(self, base_dir: str, n_runs: int = 5):
+    def __init__(self, base_dir: str, n_runs: int = 5, metrics_port: int = None,
+                 max_parallel: int = None, llm_concurrency: int = 4,
+                 model: str = None, temperature: float = None, deadline_hours: float = 12.0,
+                 priority: str = 'cost', token_budget: int = None, model_cascade: list = None,
+                 resume_timestamp: str = None):
+        """
+        Args:
+            base_dir: Repository root; runs read src/core and share caches placed here
+            n_runs: Number of runs (seeds)
+            metrics_port: First of max_parallel consecutive localhost ports serving live worker metrics
+            max_parallel: Worker processes taking (run, function, ISA) tasks (default: n_runs)
+            llm_concurrency: LLM requests in flight across all runs
+            model: Anthropic model (default: vectorizer's default)
+            temperature: Sampling temperature (default: vectorizer's default)
+            deadline_hours: Global deadline; no task starts after it and running ones are stopped
+            priority: Task order: 'cost' (longest first) or 'headroom' (expected speedup gain per
+                      second first, with FSM iterations allocated from the token and time budget)
+            token_budget: LLM tokens all runs may use together (None: unlimited)
+            model_cascade: 'model[:attempts]' tiers from cheapest to strongest (None: model only)
+            resume_timestamp: Reuse the experiment_run_*_<timestamp> directories of an earlier
+                              invocation ('latest': the newest) so their logged results are resumed
+        """
         self.base_dir = base_dir
         self.n_runs = n_runs
+        self.metrics_port = metrics_port
+        self.max_parallel = max_parallel or n_runs
+        self.llm_concurrency = llm_concurrency
+        self.deadline_seconds = deadline_hours * 3600
+        self.priority = priority
+        self.token_budget = token_budget
+        self.anytime_best = {}
         self.experiment_dirs = []
         
+        # Runs import vectorizer.py and its modules straight from the source tree
+        tools_dir = os.path.join(base_dir, "src", "tools")
+        if tools_dir not in sys.path:
+            sys.path.insert(0, tools_dir)
+        from experiment_config import DEFAULT_MODEL, DEFAULT_TEMPERATURE
+        self.model = model or DEFAULT_MODEL
+        self.temperature = temperature if temperature is not None else DEFAULT_TEMPERATURE
+        self.model_cascade = model_cascade
+        self.resume_timestamp = resume_timestamp
+        
+    def latest_run_timestamp(self):
+        """Timestamp of the newest experiment_run_1_<timestamp> directory under base_dir, or None"""
+        prefix = os.path.join(self.base_dir, "experiment_run_1_")
+        timestamps = [path[len(prefix):] for path in glob.glob(prefix + "*") if os.path.isdir(path)]
+        return max(timestamps) if timestamps else None
+    
     def setup_experiment_directories(self):
-        """Create separate directories for each experimental run"""
-        base_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        """Create separate directories for each experimental run, or reuse an earlier invocation's"""
+        base_timestamp = self.resume_timestamp
+        if base_timestamp == 'latest':
+            base_timestamp = self.latest_run_timestamp()
+            if base_timestamp is None:
+                print("No earlier experiment directories to resume; starting new runs")
+        if base_timestamp is None:
+            base_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.anytime_best_file = os.path.join(self.base_dir, f"tsvc_anytime_best_{base_timestamp}.json")
+        try:
+            with open(self.anytime_best_file, 'r') as f:
+                self.anytime_best = json.load(f)
+        except (OSError, ValueError):
+            pass
         
         for i in range(self.n_runs):
             exp_dir = os.path.join(self.base_dir, f"experiment_run_{i+1}_{base_timestamp}")
+            reused = os.path.isdir(exp_dir)
             os.makedirs(exp_dir, exist_ok=True)
             self.experiment_dirs.append(exp_dir)
-            print(f"Created experiment directory: {exp_dir}")
+            print(f"{'Reusing' if reused else 'Created'} experiment directory: {exp_dir}")
     
-    def modify_vectorizer_for_seed(self, seed: int, output_dir: str):
-        """Modify vectorizer.py to use specific seed and output directory"""
-        # Read the original vectorizer.py
-        vectorizer_path = os.path.join(self.base_dir, "src", "tools", "vectorizer.py")
-        
-        with open(vectorizer_path, 'r') as f:
-            content = f.read()
-        
-        # Add seed parameter to the class initialization
-        modified_content = content.replace(
-            'self.temperature = 0.7  # Balanced temperature for creative but consistent solutions',
-            f'self.temperature = 0.7  # Balanced temperature for creative but consistent solutions\n        self.seed = {seed}'
-        )
-        
-        # Add seed initialization to the class __init__ method
-        modified_content = modified_content.replace(
-            'self.test_functions = {}',
-            f'self.test_functions = {{}}\n        \n        # Set random seed for reproducibility\n        import random\n        import numpy as np\n        random.seed({seed})\n        np.random.seed({seed})'
-        )
-        
-        # Fix cleanup_workspace() to work with experiment directories
-        modified_content = modified_content.replace(
-            'def cleanup_workspace():\n    """Clean up workspace before running vectorizer"""\n    # Calculate workspace root relative to this script\'s location\n    script_dir = os.path.dirname(os.path.abspath(__file__))\n    workspace_dir = os.path.join(script_dir, \'../..\')\n    workspace_dir = os.path.abspath(workspace_dir)',
-            f'def cleanup_workspace():\n    """Clean up workspace before running vectorizer"""\n    # Use current working directory for experiments\n    workspace_dir = os.getcwd()'
-        )
-        
-        # Add imports at the top if not already present
-        if "import random" not in modified_content[:100]:
-            modified_content = modified_content.replace(
-                "import anthropic",
-                "import anthropic\nimport random\nimport numpy as np"
-            )
-        
-        # Modify paths to use the specific experiment directory
-        modified_content = modified_content.replace(
-            'tsvc_results_dir = os.path.join(workspace_dir, "tsvc_results")',
-            f'tsvc_results_dir = os.path.join("{output_dir}", "tsvc_results")'
-        )
-        
-        modified_content = modified_content.replace(
-            'tsvc_attempts_dir = os.path.join(workspace_dir, "tsvc_vectorized_attempts")',
-            f'tsvc_attempts_dir = os.path.join("{output_dir}", "tsvc_vectorized_attempts")'
-        )
-        
-        modified_content = modified_content.replace(
-            'results_file = os.path.join(workspace_dir, "tsvc_vectorization_results.json")',
-            f'results_file = os.path.join("{output_dir}", "tsvc_vectorization_results.json")'
-        )
-        
-        # Also fix the main results_file path in run_experiment()
-        modified_content = modified_content.replace(
-            'results_file = os.path.join(workspace_root, \'tsvc_vectorization_results.json\')',
-            f'results_file = os.path.join("{output_dir}", "tsvc_vectorization_results.json")'
-        )
-        
-        # Fix workspace_root calculation for experiment directories
-        modified_content = modified_content.replace(
-            'workspace_root = os.path.join(os.path.dirname(__file__), \'../..\')\n        workspace_root = os.path.abspath(workspace_root)',
-            f'workspace_root = "{output_dir}"'
-        )
-        
-        # Write modified vectorizer
-        exp_vectorizer_path = os.path.join(output_dir, "vectorizer.py")
-        with open(exp_vectorizer_path, 'w') as f:
-            f.write(modified_content)
-        
-        return exp_vectorizer_path
+    def summarize_stage_times(self, output_dir: str) -> dict:
+        """Pipeline stage seconds and LLM tokens summed over a run's per-function timing records"""
+        totals = {'stages': {}, 'tokens': {'input_tokens': 0, 'output_tokens': 0}}
+        results_file = os.path.join(output_dir, "tsvc_vectorization_results.json")
+        try:
+            with open(results_file, 'r') as f:
+                results = json.load(f).get('results', [])
+        except (OSError, ValueError):
+            return totals
+        for result in results:
+            timing = result.get('timing') or {}
+            for stage, entry in timing.get('stages', {}).items():
+                total = totals['stages'].setdefault(stage, {'seconds': 0.0, 'count': 0})
+                total['seconds'] += entry['seconds']
+                total['count'] += entry['count']
+            for name in totals['tokens']:
+                totals['tokens'][name] += timing.get('tokens', {}).get(name, 0)
+        return totals
     
-    def copy_necessary_files(self, output_dir: str):
-        """Copy necessary files to experiment directory"""
-        core_dir = os.path.join(self.base_dir, "src", "core")
-        tools_dir = os.path.join(self.base_dir, "src", "tools")
-        
-        # Files to copy from core directory
-        core_files = [
-            "tsvc.c",
-            "common.h", 
-            "common.c",
-            "dummy.c",
-            "array_defs.h",
-            "Makefile"
-        ]
-        
-        for file_name in core_files:
-            src_path = os.path.join(core_dir, file_name)
-            dst_path = os.path.join(output_dir, file_name)
-            if os.path.exists(src_path):
-                shutil.copy2(src_path, dst_path)
-        
-        # Files to copy from tools directory
-        tools_files = [
-            "alive2_verifier.py"
-        ]
-        
-        for file_name in tools_files:
-            src_path = os.path.join(tools_dir, file_name)
-            dst_path = os.path.join(output_dir, file_name)
-            if os.path.exists(src_path):
-                shutil.copy2(src_path, dst_path)
+    def make_config(self, seed: int, output_dir: str):
+        """ExperimentConfig of one run: its own output directory, caches shared under base_dir"""
+        from experiment_config import ExperimentConfig
+        return ExperimentConfig(seed=seed, output_root=output_dir, model=self.model,
+                                temperature=self.temperature,
+                                source_dir=os.path.join(self.base_dir, "src", "core"),
+                                shared_dir=self.base_dir, model_cascade=self.model_cascade)
     
-    def run_single_experiment(self, run_idx: int, seed: int, output_dir: str):
-        """Run a single experiment with specified seed"""
-        print(f"\\n=== Running Experiment {run_idx + 1}/{self.n_runs} (seed={seed}) ===")
-        
-        # Setup experiment directory
-        self.copy_necessary_files(output_dir)
-        
-        # Modify vectorizer for this run
-        exp_vectorizer_path = self.modify_vectorizer_for_seed(seed, output_dir)
-        
-        # Set up environment
-        env = os.environ.copy()
-        env['PYTHONPATH'] = output_dir
-        
-        # Run the experiment
-        cmd = [sys.executable, exp_vectorizer_path]
-        
+    def plan_by_headroom(self, planner, tasks: list, functions: list, isas: list, cost_model) -> list:
+        """Probe gcc's headroom per function and ISA, rank tasks and split the budget into iterations"""
+        from headroom import HeadroomProbe, probe_functions
+        from task_scheduler import allocate_iterations, rank_by_headroom
+        
+        probe = HeadroomProbe(planner, planner.config.shared_path('tsvc_compiler_baselines', 'TSVC_COMPILER_BASELINES'))
+        probes, isa_lanes = {}, {}
+        for isa_name in isas:
+            planner.set_target_isa(isa_name)
+            isa_lanes[isa_name] = planner.isa.lanes
+            print(f"Probing compiler headroom for {len(functions)} functions [{isa_name}]...")
+            for func_name, record in probe_functions(planner, probe, functions).items():
+                probes[(func_name, isa_name)] = record
+        
+        tasks = allocate_iterations(rank_by_headroom(tasks, cost_model, probes, isa_lanes), cost_model,
+                                    self.token_budget, self.deadline_seconds * self.max_parallel,
+                                    default_iterations=planner.max_iterations)
+        scheduled = [task for task in tasks if task['max_iterations'] > 0]
+        if len(scheduled) < len(tasks):
+            print(f"Budget covers {len(scheduled)}/{len(tasks)} tasks; lowest-headroom tasks are not scheduled")
+        return scheduled
+    
+    def update_anytime_best(self, record: dict):
+        """Keep the fastest verified kernel per function and ISA found so far, on disk after every task"""
+        if not record.get('success') or not record.get('speedup'):
+            return
+        key = f"{record['function']}_{record['isa']}"
+        best = self.anytime_best.get(key)
+        if best is not None and best['speedup'] >= record['speedup']:
+            return
+        self.anytime_best[key] = {'function': record['function'], 'isa': record['isa'],
+                                  'speedup': record['speedup'], 'run': record['run'] + 1, 'seed': record['seed'],
+                                  'predicted_speedup': record.get('predicted_speedup'),
+                                  'results_dir': self.experiment_dirs[record['run']], 'found_at': time.time()}
+        tmp_path = self.anytime_best_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.anytime_best, f, indent=2)
+        os.replace(tmp_path, self.anytime_best_file)
+    
+    def write_experiment_log(self, run_idx: int, seed: int, output_dir: str, task_records: list, missing: list):
+        """Summarize one run's tasks in experiment_log.txt next to its results"""
+        output_file = os.path.join(output_dir, "experiment_output.txt")
         try:
-            print(f"Starting experiment in {output_dir}")
-            start_time = time.time()
-            
-            # Use Popen for real-time output
-            process = subprocess.Popen(
-                cmd,
-                cwd=output_dir,
-                env=env,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
-            )
-            
-            # Stream output in real-time with timeout
-            output_lines = []
-            timeout_seconds = 7200  # 2 hours
-            
-            try:
-                while True:
-                    line = process.stdout.readline()
-                    if not line and process.poll() is not None:
-                        break
-                    if line:
-                        print(f"[Run {run_idx + 1}] {line.rstrip()}")
-                        output_lines.append(line)
-                
-                # Wait for completion
-                process.wait(timeout=timeout_seconds)
-                result_stdout = ''.join(output_lines)
-                result_stderr = ""
-                returncode = process.returncode
-                
-            except subprocess.TimeoutExpired:
-                process.kill()
-                raise subprocess.TimeoutExpired(cmd, timeout_seconds)
-            
-            end_time = time.time()
-            duration = end_time - start_time
-            
-            # Log results
-            log_file = os.path.join(output_dir, "experiment_log.txt")
-            with open(log_file, 'w') as f:
-                f.write(f"Experiment Run {run_idx + 1}\\n")
-                f.write(f"Seed: {seed}\\n")
-                f.write(f"Duration: {duration:.2f} seconds\\n")
-                f.write(f"Return code: {returncode}\\n\\n")
-                f.write("STDOUT:\\n")
-                f.write(result_stdout)
-                f.write("\\nSTDERR:\\n")
-                f.write(result_stderr)
-            
-            if returncode == 0:
-                print(f"✓ Experiment {run_idx + 1} completed successfully ({duration:.1f}s)")
-                return True
-            else:
-                print(f"✗ Experiment {run_idx + 1} failed (return code: {returncode})")
-                return False
-                
-        except subprocess.TimeoutExpired:
-            print(f"✗ Experiment {run_idx + 1} timed out after 2 hours")
-            return False
-        except Exception as e:
-            print(f"✗ Experiment {run_idx + 1} failed with error: {e}")
-            return False
+            with open(output_file, 'r') as f:
+                result_stdout = f.read()
+        except OSError:
+            result_stdout = ""
+        
+        log_file = os.path.join(output_dir, "experiment_log.txt")
+        with open(log_file, 'w') as f:
+            f.write(f"Experiment Run {run_idx + 1}\n")
+            f.write(f"Seed: {seed}\n")
+            f.write(f"Task time: {sum(record['seconds'] for record in task_records):.2f} seconds "
+                    f"({len(task_records)} tasks)\n")
+            stage_times = self.summarize_stage_times(output_dir)
+            for stage, entry in sorted(stage_times['stages'].items(), key=lambda item: -item[1]['seconds']):
+                f.write(f"  {stage}: {entry['seconds']:.2f} seconds ({entry['count']} calls)\n")
+            if stage_times['tokens']['input_tokens'] or stage_times['tokens']['output_tokens']:
+                f.write(f"Tokens: {stage_times['tokens']['input_tokens']} input, "
+                        f"{stage_times['tokens']['output_tokens']} output\n")
+            f.write(f"Unfinished tasks: {len(missing)}\n")
+            for func_name, isa_name in missing:
+                f.write(f"  {func_name} [{isa_name}]\n")
+            f.write("\nSTDOUT:\n")
+            f.write(result_stdout)
     
     def run_all_experiments(self, function_subset: list = None):
-        """Run all experiments"""
-        print(f"Starting {self.n_runs} experimental runs...")
+        """
+        Run all experiments as one matrix of (run, function, ISA) tasks.
+        
+        Tasks go to a single queue in longest-expected-first order (costs from earlier runs'
+        result logs) and each worker process takes the next one as soon as it is idle, so a
+        run stuck on slow kernels never holds up the others. A single global deadline bounds
+        the whole matrix; unfinished tasks are not logged and are redone when the same run
+        directories are resumed (resume_timestamp).
+        
+        With priority='headroom' the queue instead starts with the kernels expected to gain the
+        most speedup per second, and the token and worker-time budget is split into per-task
+        iteration limits; the best verified kernel found so far per function is kept in
+        tsvc_anytime_best_<timestamp>.json whenever the budget runs out.
+        """
+        import vectorizer
+        from isa_targets import get_isa_target
+        from shared_resources import SharedResources
+        from task_scheduler import TaskCostModel, longest_first
+        
+        # Cost estimates come from earlier runs only
+        cost_model = TaskCostModel.from_runs(self.base_dir)
         
         # Setup directories
         self.setup_experiment_directories()
-        
+        configs = [self.make_config(42 + i * 100, exp_dir)  # Different seeds for each run
+                   for i, exp_dir in enumerate(self.experiment_dirs)]
+        
+        # Target ISAs and the function list come from vectorizer.py's settings
+        planner = vectorizer.create_experiment(configs[0])
+        functions = function_subset or vectorizer.get_all_tsvc_functions(configs[0].source_dir)
+        planner.test_functions = planner.extract_tsvc_functions(functions)
+        functions = [func_name for func_name in functions if func_name in planner.test_functions]
+        isas = [isa for isa in planner.target_isas if get_isa_target(isa).is_supported(planner.host_flags)]
+        tasks = [{'run': run_idx, 'seed': config.seed, 'function': func_name, 'isa': isa_name}
+                 for func_name in functions for isa_name in isas for run_idx, config in enumerate(configs)]
+        if self.priority == 'headroom':
+            tasks = self.plan_by_headroom(planner, tasks, functions, isas, cost_model)
+        else:
+            tasks = longest_first(tasks, cost_model)
+        print(f"Scheduling {len(tasks)} tasks ({self.n_runs} runs x {len(functions)} functions x {len(isas)} ISAs) "
+              f"on {self.max_parallel} workers; {len(cost_model.costs)} cost estimates from "
+              f"{len(cost_model.log_paths)} earlier runs")
+        
+        # LLM request limiter, benchmark CPU pool and global budget shared by all workers
+        start_time = time.time()
+        deadline = start_time + self.deadline_seconds
+        resources = SharedResources(llm_concurrency=self.llm_concurrency, token_budget=self.token_budget,
+                                    deadline=deadline)
+        print(f"LLM requests in flight: {resources.llm_concurrency}, benchmark CPUs: {resources.cpus}, "
+              f"token budget: {self.token_budget or 'unlimited'}")
+        
+        # Forked workers inherit sys.path, the shared semaphore and CPU queue, and the task queue
+        context = multiprocessing.get_context('fork')
+        task_queue = context.Queue()
+        done_queue = context.Queue()
+        for task in tasks:
+            task_queue.put(task)
+        for _ in range(self.max_parallel):
+            task_queue.put(None)  # One end marker per worker
+        
+        workers = []
+        for worker_idx in range(self.max_parallel):
+            # Each worker serves its metrics on its own port
+            metrics_port = self.metrics_port + worker_idx if self.metrics_port is not None else None
+            worker = context.Process(target=scheduler_worker, name=f"tsvc-worker-{worker_idx + 1}",
+                                     args=(worker_idx, configs, functions, task_queue, done_queue,
+                                           resources, deadline, metrics_port))
+            worker.start()
+            workers.append(worker)
+        
+        task_records = []
+        
+        def drain_done_queue():
+            while not done_queue.empty():
+                record = done_queue.get()
+                task_records.append(record)
+                self.update_anytime_best(record)
+                mark = "✓" if record['status'] == 'done' else "✗"
+                print(f"{mark} Run {record['run'] + 1} {record['function']} [{record['isa']}] "
+                      f"{record['seconds']:.1f}s (expected {record['expected_seconds']:.1f}s), "
+                      f"{len(task_records)}/{len(tasks)} tasks")
+        
+        while any(worker.is_alive() for worker in workers):
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                print(f"Global deadline of {self.deadline_seconds / 3600:g} hours reached; stopping workers")
+                for worker in workers:
+                    if worker.is_alive():
+                        worker.terminate()
+                break
+            multiprocessing.connection.wait([worker.sentinel for worker in workers], timeout=min(remaining, 10))
+            drain_done_queue()
+        for worker in workers:
+            worker.join()
+        drain_done_queue()
+        print(f"Task matrix finished in {time.time() - start_time:.1f}s, {resources.tokens_used} LLM tokens used")
+        if self.anytime_best:
+            improved = [best['speedup'] for best in self.anytime_best.values() if best['speedup'] > 1.0]
+            print(f"Anytime best: {len(improved)}/{len(self.anytime_best)} function variants improved "
+                  f"(see {self.anytime_best_file})")
+        
+        # Assemble each run's results file, summary and kernel library from its result log
         successful_runs = 0
         failed_runs = 0
-        
-        for i, exp_dir in enumerate(self.experiment_dirs):
-            seed = 42 + i * 100  # Different seeds for each run
-            
-            success = self.run_single_experiment(i, seed, exp_dir)
-            
-            if success:
-                successful_runs += 1
-            else:
+        for run_idx, config in enumerate(configs):
+            print(f"\n=== Experiment {run_idx + 1}/{self.n_runs} (seed={config.seed}) ===")
+            planner.apply_config(config)
+            results, skipped_isas, missing = planner.collect_logged_results(functions)
+            planner.finish_experiment(results, skipped_isas)
+            self.write_experiment_log(run_idx, config.seed, config.output_root,
+                                      [record for record in task_records if record['run'] == run_idx], missing)
+            if missing:
+                print(f"✗ Experiment {run_idx + 1} incomplete: {len(missing)} tasks unfinished")
                 failed_runs += 1
+            else:
+                print(f"✓ Experiment {run_idx + 1} completed successfully")
+                successful_runs += 1
         
-        print(f"\\n=== Experiment Summary ===")
+        print(f"\n=== Experiment Summary ===")
         print(f"Total runs: {self.n_runs}")
         print(f"Successful: {successful_runs}")
         print(f"Failed: {failed_runs}")
@@ -281,10 +428,39 @@ def main():
                        help='Base directory for experiments')
     parser.add_argument('--check-only', action='store_true',
                        help='Only check existing results, don\'t run new experiments')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                       help='Serve live Prometheus metrics of worker i on this localhost port + i')
+    parser.add_argument('--parallel', type=int, default=None,
+                       help='Worker processes taking (run, function, ISA) tasks (default: number of runs)')
+    parser.add_argument('--deadline-hours', type=float, default=12.0,
+                       help='Global deadline for the whole task matrix (default: 12)')
+    parser.add_argument('--priority', choices=['cost', 'headroom'], default='cost',
+                       help='Task order: longest first, or most expected speedup gain first with '
+                            'iterations allocated from the budget (default: cost)')
+    parser.add_argument('--token-budget', type=int, default=None,
+                       help='LLM tokens all runs may use together (default: unlimited)')
+    parser.add_argument('--llm-concurrency', type=int, default=4,
+                       help='LLM requests in flight across all runs (default: 4)')
+    parser.add_argument('--model', type=str, default=None,
+                       help='Anthropic model (default: the vectorizer default)')
+    parser.add_argument('--temperature', type=float, default=None,
+                       help='LLM sampling temperature (default: the vectorizer default)')
+    parser.add_argument('--model-cascade', type=str, default=None,
+                       help='Comma-separated model[:attempts] tiers from cheapest to strongest, e.g. '
+                            'claude-3-5-haiku-20241022:1,claude-sonnet-4-20250514 (default: --model only)')
+    parser.add_argument('--resume', type=str, nargs='?', const='latest', default=None, metavar='TIMESTAMP',
+                       help='Reuse the experiment_run_*_TIMESTAMP directories of an earlier invocation (default '
+                            'without a value: the newest) so finished functions are not redone')
     
     args = parser.parse_args()
     
-    runner = MultipleExperimentRunner(args.base_dir, args.runs)
+    runner = MultipleExperimentRunner(args.base_dir, args.runs, args.metrics_port,
+                                      max_parallel=args.parallel, llm_concurrency=args.llm_concurrency,
+                                      model=args.model, temperature=args.temperature,
+                                      deadline_hours=args.deadline_hours, priority=args.priority,
+                                      token_budget=args.token_budget,
+                                      model_cascade=args.model_cascade.split(',') if args.model_cascade else None,
+                                      resume_timestamp=args.resume)
     
     if args.check_only:
         print("Checking existing results...")
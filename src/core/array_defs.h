@@ -5,6 +5,18 @@
 
 #define ARRAY_ALIGNMENT 64
 
+#ifdef TSVC_HEAP_ARRAYS
+
+// Heap mode: the arrays are pointers into one allocation, each placed TSVC_ARRAY_OFFSET
+// bytes past a 64-byte boundary and optionally backed by huge pages (see common.c)
+extern real_t *flat_2d_array, *x, *a, *b, *c, *d, *e;
+extern real_t (*aa)[LEN_2D], (*bb)[LEN_2D], (*cc)[LEN_2D], (*tt)[LEN_2D];
+extern int *indx;
+
+void tsvc_allocate_arrays(void);
+
+#else
+
 extern __attribute__((aligned(ARRAY_ALIGNMENT))) real_t flat_2d_array[LEN_2D*LEN_2D];
 
 extern __attribute__((aligned(ARRAY_ALIGNMENT))) real_t x[LEN_1D];
@@ -14,6 +26,8 @@ extern __attribute__((aligned(ARRAY_ALIGNMENT))) real_t a[LEN_1D],b[LEN_1D],c[LE
 
 extern __attribute__((aligned(ARRAY_ALIGNMENT))) int indx[LEN_1D];
 
+#endif
+
 extern real_t* __restrict__ xx;
 extern real_t* yy;
 
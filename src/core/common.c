@@ -1,3 +1,6 @@
+#ifdef TSVC_HEAP_ARRAYS
+#define _GNU_SOURCE  // posix_memalign, mmap flags and madvise for the heap-allocated arrays
+#endif
 
 #include "common.h"
 #include "array_defs.h"
@@ -7,6 +10,96 @@
 #include <malloc.h>
 #include <string.h>
 
+#ifdef TSVC_HEAP_ARRAYS
+#include <stdint.h>
+#include <sys/mman.h>
+
+#ifndef TSVC_ARRAY_OFFSET
+#define TSVC_ARRAY_OFFSET 0   // Bytes past a 64-byte boundary for every array
+#endif
+#ifndef TSVC_ARRAY_STAGGER
+#define TSVC_ARRAY_STAGGER 0  // Extra offset per successive array, so arrays are mutually misaligned
+#endif
+#ifndef TSVC_HUGEPAGES
+#define TSVC_HUGEPAGES 0      // 0 = regular pages, 1 = transparent huge pages, 2 = MAP_HUGETLB
+#endif
+#define TSVC_HUGEPAGE_SIZE (2UL * 1024 * 1024)
+#define TSVC_HEAP_ARRAY_COUNT 13
+
+real_t *flat_2d_array, *x, *a, *b, *c, *d, *e;
+real_t (*aa)[LEN_2D], (*bb)[LEN_2D], (*cc)[LEN_2D], (*tt)[LEN_2D];
+int *indx;
+
+static char * tsvc_arena_next;
+static int tsvc_arena_count;
+
+static char * tsvc_map_arena(size_t bytes, const char ** pages)
+{
+    char * base = NULL;
+#if TSVC_HUGEPAGES >= 1
+    size_t huge_bytes = (bytes + TSVC_HUGEPAGE_SIZE - 1) / TSVC_HUGEPAGE_SIZE * TSVC_HUGEPAGE_SIZE;
+#endif
+#if TSVC_HUGEPAGES == 2
+    base = mmap(NULL, huge_bytes, PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_ANONYMOUS | MAP_HUGETLB, -1, 0);
+    if (base != MAP_FAILED) {
+        *pages = "hugetlb";
+        return base;
+    }
+    base = NULL;
+    fprintf(stderr, "MAP_HUGETLB failed (no reserved huge pages?), falling back to transparent huge pages\n");
+#endif
+#if TSVC_HUGEPAGES >= 1
+    if (posix_memalign((void **)&base, TSVC_HUGEPAGE_SIZE, huge_bytes) == 0) {
+        madvise(base, huge_bytes, MADV_HUGEPAGE);
+        *pages = "thp";
+        return base;
+    }
+#endif
+    if (posix_memalign((void **)&base, ARRAY_ALIGNMENT, bytes) != 0) {
+        fprintf(stderr, "cannot allocate %zu bytes for the heap arrays\n", bytes);
+        exit(EXIT_FAILURE);
+    }
+    *pages = "regular";
+    return base;
+}
+
+static void * tsvc_carve(size_t bytes)
+{
+    size_t offset = (TSVC_ARRAY_OFFSET + (size_t)tsvc_arena_count++ * TSVC_ARRAY_STAGGER) % ARRAY_ALIGNMENT;
+    char * p = tsvc_arena_next + offset;
+    uintptr_t end = (uintptr_t)(p + bytes);
+    tsvc_arena_next += (end + ARRAY_ALIGNMENT - 1) / ARRAY_ALIGNMENT * ARRAY_ALIGNMENT - (uintptr_t)tsvc_arena_next;
+    return p;
+}
+
+void tsvc_allocate_arrays(void)
+{
+    size_t bytes_1d = LEN_1D * sizeof(real_t);
+    size_t bytes_2d = LEN_2D * LEN_2D * sizeof(real_t);
+    size_t total = 7 * bytes_1d + 5 * bytes_2d + LEN_1D * sizeof(int) + 2 * TSVC_HEAP_ARRAY_COUNT * ARRAY_ALIGNMENT;
+    const char * pages;
+
+    tsvc_arena_next = tsvc_map_arena(total, &pages);
+    tsvc_arena_count = 0;
+    a = tsvc_carve(bytes_1d);
+    b = tsvc_carve(bytes_1d);
+    c = tsvc_carve(bytes_1d);
+    d = tsvc_carve(bytes_1d);
+    e = tsvc_carve(bytes_1d);
+    x = tsvc_carve(bytes_1d);
+    xx = tsvc_carve(bytes_1d);
+    indx = tsvc_carve(LEN_1D * sizeof(int));
+    aa = tsvc_carve(bytes_2d);
+    bb = tsvc_carve(bytes_2d);
+    cc = tsvc_carve(bytes_2d);
+    tt = tsvc_carve(bytes_2d);
+    flat_2d_array = tsvc_carve(bytes_2d);
+
+    printf("Array placement: offset %d bytes, stagger %d bytes, pages %s\n",
+           TSVC_ARRAY_OFFSET, TSVC_ARRAY_STAGGER, pages);
+}
+#endif
+
 void set_1d_array(real_t * arr, int length, real_t value, int stride);
 void set_2d_array(real_t arr[LEN_2D][LEN_2D], real_t value, int stride);
 
@@ -155,16 +248,25 @@ void set_2d_array(real_t arr[LEN_2D][LEN_2D], real_t value, int stride)
 }
 
 void init(int** ip, real_t* s1, real_t* s2){
+#ifdef TSVC_HEAP_ARRAYS
+    tsvc_allocate_arrays();
+#else
     xx = (real_t*) memalign(ARRAY_ALIGNMENT, LEN_1D*sizeof(real_t));
+#endif
     *ip = (int *) memalign(ARRAY_ALIGNMENT, LEN_1D*sizeof(real_t));
 
-    for (int i = 0; i < LEN_1D; i = i+5){
+    int i = 0;
+    for (; i + 4 < LEN_1D; i = i+5){
         (*ip)[i]   = (i+4);
         (*ip)[i+1] = (i+2);
         (*ip)[i+2] = (i);
         (*ip)[i+3] = (i+3);
         (*ip)[i+4] = (i+1);
     }
+    // LEN_1D need not be a multiple of 5 when overridden
+    for (; i < LEN_1D; i++){
+        (*ip)[i] = i;
+    }
 
     set_1d_array(a, LEN_1D, 1.,1);
     set_1d_array(b, LEN_1D, 1.,1);
@@ -1,9 +1,16 @@
 #ifndef TSVC_COMMON_HDR
 #define TSVC_COMMON_HDR
 
+// Overridable with -D so harnesses can be rebuilt for other problem sizes
+#ifndef iterations
 #define iterations 100000
+#endif
+#ifndef LEN_1D
 #define LEN_1D 32000
+#endif
+#ifndef LEN_2D
 #define LEN_2D 256
+#endif
 
 #include <sys/time.h>
 
@@ -13,14 +20,23 @@ struct args_t {
     void * __restrict__ arg_info;
 };
 
-#if 0
+// Build with -DTSVC_DOUBLE to run every kernel in double precision
+#ifdef TSVC_DOUBLE
 typedef double real_t;
 #define ABS fabs
+#define TSVC_CHECKSUM_ATOL 1e-9
+#define TSVC_CHECKSUM_RTOL 1e-12
 #else
 typedef float real_t;
 #define ABS fabsf
+#define TSVC_CHECKSUM_ATOL 1e-5
+#define TSVC_CHECKSUM_RTOL 0.0
 #endif
 
+// Checksums match when |ref - val| is within the precision's absolute plus relative tolerance
+#define TSVC_CHECKSUM_OK(ref, val) \
+    (fabs((double)(ref) - (double)(val)) < TSVC_CHECKSUM_ATOL + TSVC_CHECKSUM_RTOL * fabs((double)(ref)))
+
 int dummy(real_t[LEN_1D], real_t[LEN_1D], real_t[LEN_1D], real_t[LEN_1D], real_t[LEN_1D], real_t[LEN_2D][LEN_2D], real_t[LEN_2D][LEN_2D], real_t[LEN_2D][LEN_2D], real_t);
 
 void init(int** ip, real_t* s1, real_t* s2);
@@ -31,7 +31,8 @@
 #include "common.h"
 #include "array_defs.h"
 
-// array definitions
+// array definitions (heap mode allocates them in common.c instead)
+#ifndef TSVC_HEAP_ARRAYS
 __attribute__((aligned(ARRAY_ALIGNMENT))) real_t flat_2d_array[LEN_2D*LEN_2D];
 
 __attribute__((aligned(ARRAY_ALIGNMENT))) real_t x[LEN_1D];
@@ -40,6 +41,7 @@ __attribute__((aligned(ARRAY_ALIGNMENT))) real_t a[LEN_1D],b[LEN_1D],c[LEN_1D],d
                                    aa[LEN_2D][LEN_2D],bb[LEN_2D][LEN_2D],cc[LEN_2D][LEN_2D],tt[LEN_2D][LEN_2D];
 
 __attribute__((aligned(ARRAY_ALIGNMENT))) int indx[LEN_1D];
+#endif
 
 real_t* __restrict__ xx;
 real_t* yy;
@@ -0,0 +1,74 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+from baseline_cache import BaselineTimingCache, load_json, t_critical_95
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return BaselineTimingCache(str(tmp_path / 'baselines.json'), recheck_interval=2)
+
+
+def establish(cache, key, times=(1.0, 1.0, 1.0), checksum=5.0, iterations=100):
+    for elapsed in times:
+        cache.add_sample(key, elapsed, checksum, iterations)
+
+
+def test_t_critical_rounds_to_the_smaller_tabulated_df():
+    assert t_critical_95(0) == float('inf')
+    assert t_critical_95(10) == 2.228
+    assert t_critical_95(11) == 2.228
+    assert t_critical_95(19) == 2.131
+    assert t_critical_95(31) == 2.042
+    assert t_critical_95(120) == 1.980
+    assert t_critical_95(121) == 1.96
+
+
+def test_summarize(cache):
+    assert cache.summarize([1.0])['ci_half_width'] == float('inf')
+    stats = cache.summarize([1.0, 2.0, 3.0])
+    assert stats['n'] == 3 and stats['mean'] == 2.0
+    # t(2) * stdev / sqrt(n) = 4.303 * 1 / sqrt(3)
+    assert stats['ci_half_width'] == pytest.approx(4.303 / 3 ** 0.5)
+    assert stats['rel_ci'] == pytest.approx(stats['ci_half_width'] / 2.0)
+
+
+def test_lookup_needs_a_tight_interval(cache):
+    establish(cache, 'noisy', times=(1.0, 2.0, 3.0))
+    assert cache.lookup('noisy') is None
+    establish(cache, 'short', times=(1.0, 1.0))
+    assert cache.lookup('short') is None
+    assert cache.lookup('missing') is None
+
+
+def test_lookup_forces_a_recheck_after_the_interval(cache):
+    establish(cache, 'k')
+    for _ in range(2):
+        cached = cache.lookup('k')
+        assert cached['time'] == 1.0 and cached['checksum'] == 5.0 and cached['iterations'] == 100
+    assert cache.lookup('k') is None
+    # A fresh measurement resets the reuse count
+    cache.add_sample('k', 1.0, 5.0, 100)
+    assert cache.lookup('k') is not None
+
+
+def test_add_sample_detects_timing_and_checksum_drift(cache):
+    establish(cache, 'k')
+    result = cache.add_sample('k', 1.5, 5.0, 100)
+    assert result['drift'] and result['n'] == 1
+    establish(cache, 'k', times=(1.5, 1.5))
+    result = cache.add_sample('k', 1.5, 6.0, 100)
+    assert result['drift'] and result['reason'] == 'checksum changed'
+    assert load_json(cache.cache_path)['k']['drift_events'] == 2
+
+
+def test_add_sample_at_a_new_repeat_count_replaces_the_entry(cache):
+    establish(cache, 'k')
+    result = cache.add_sample('k', 2.0, 5.0, 200)
+    assert not result['drift'] and result['n'] == 1
+    assert cache.pinned_iterations('k') == 200
+    assert load_json(cache.cache_path)['k'].get('drift_events') == 0
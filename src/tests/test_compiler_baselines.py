@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+from compiler_baselines import compare_with_strategies
+
+STRATEGIES = {
+    'pgo': {'status': 'ok', 'threads': 1, 'time_per_iteration': 4.0},
+    'graphite_parallel': {'status': 'ok', 'threads': 4, 'time_per_iteration': 2.0},
+    'polly': {'status': 'unavailable', 'threads': 1},
+}
+
+
+def point(threads, vectorized_time):
+    return {'threads': threads, 'status': 'ok', 'correct': True,
+            'vectorized_time': vectorized_time, 'iterations': 1}
+
+
+def test_single_threaded_builds_use_the_one_thread_point():
+    # The final timing here is a multithreaded one; the 1-thread scaling point must win
+    final = {'vectorized_time': 0.5, 'iterations': 1}
+    speedups = compare_with_strategies(STRATEGIES, final, [point(1, 2.0), point(4, 1.0)])
+    assert speedups == {'pgo': 2.0, 'graphite_parallel': 2.0}
+
+
+def test_multithreaded_builds_need_a_point_at_the_same_count():
+    final = {'vectorized_time': 2.0, 'iterations': 1}
+    assert compare_with_strategies(STRATEGIES, final) == {'pgo': 2.0}
+    assert compare_with_strategies(STRATEGIES, final, [point(2, 1.0)]) == {'pgo': 2.0}
+
+
+def test_failed_points_are_ignored():
+    final = {'vectorized_time': 2.0, 'iterations': 1}
+    failed = dict(point(1, 0.1), correct=False)
+    assert compare_with_strategies(STRATEGIES, final, [failed])['pgo'] == 2.0
@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+from dependence_analysis import analyze_kernel, format_analysis
+from kernel_catalog import KernelCatalog
+
+CATALOG = KernelCatalog.from_file(os.path.join(os.path.dirname(__file__), '..', 'core', 'tsvc.c'))
+
+
+def analysis(name):
+    return format_analysis(analyze_kernel(CATALOG, name))
+
+
+def test_s318_goto_skipped_statements_are_conditional():
+    text = analysis('s318')
+    assert 'max: conditional reduction' in text
+    assert 'index: index of the selected element' in text
+    assert 'wrap-around' not in text
+
+
+def test_s332_goto_out_of_loop_is_early_exit():
+    text = analysis('s332')
+    assert 'early exit via `goto L20`' in text
+    assert 'index: index of the first match' in text
+    assert 'argmax' not in text
+
+
+def test_s161_and_s277_dependences_are_conditional():
+    assert 'c[i+1] -> c[i], distance 1 in i (conditional)' in analysis('s161')
+    assert 'b[i+1] -> b[i], distance 1 in i (conditional)' in analysis('s277')
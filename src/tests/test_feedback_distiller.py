@@ -0,0 +1,60 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+from feedback_distiller import distill_compiler_errors
+
+# gcc 12, -std=c99 -O3 -mavx2 -mfma: a misspelled intrinsic and an undeclared name on one line
+MISSPELLED_INTRINSIC = """\
+r.c: In function 'f':
+r.c:2:31: warning: implicit declaration of function '_mm256_fmadd_pss'; did you mean '_mm256_fmadd_ps'? [-Wimplicit-function-declaration]
+    2 | void f(float *a) { __m256 x = _mm256_fmadd_pss(_mm256_loadu_ps(a), _mm256_loadu_ps(a), _mm256_loadu_ps(a)); a[0] = undefined_var; }
+      |                               ^~~~~~~~~~~~~~~~
+      |                               _mm256_fmadd_ps
+r.c:2:31: error: incompatible types when initializing type '__m256' using type 'int'
+r.c:2:116: error: 'undefined_var' undeclared (first use in this function)
+    2 | void f(float *a) { __m256 x = _mm256_fmadd_pss(_mm256_loadu_ps(a), _mm256_loadu_ps(a), _mm256_loadu_ps(a)); a[0] = undefined_var; }
+      |                                                                                                                    ^~~~~~~~~~~~~
+r.c:2:116: note: each undeclared identifier is reported only once for each function it appears in
+"""
+
+# An incompatible pointer passed to an intrinsic, plus an unrelated warning
+POINTER_TYPES = """\
+k.c: In function 's000_vectorized':
+k.c:3:9: warning: unused variable 'unused' [-Wunused-variable]
+k.c:5:14: warning: initialization of 'int *' from incompatible pointer type 'float *' [-Wincompatible-pointer-types]
+    5 |     int *p = &a[0];
+      |              ^
+k.c:6:34: error: incompatible type for argument 1 of '_mm256_add_epi32'
+    6 |     __m256i q = _mm256_add_epi32(p, p);
+      |                                  ^
+/usr/lib/gcc/x86_64-linux-gnu/12/include/avx2intrin.h:119:27: note: expected '__m256i' but argument is of type 'int *'
+k.c:6:37: error: incompatible type for argument 2 of '_mm256_add_epi32'
+    6 |     __m256i q = _mm256_add_epi32(p, p);
+      |                                     ^
+/usr/lib/gcc/x86_64-linux-gnu/12/include/avx2intrin.h:119:40: note: expected '__m256i' but argument is of type 'int *'
+"""
+
+
+def test_keeps_did_you_mean_warning_and_errors_on_the_same_line():
+    text = distill_compiler_errors(MISSPELLED_INTRINSIC)
+    assert "did you mean '_mm256_fmadd_ps'?" in text
+    assert "incompatible types when initializing type '__m256' using type 'int'" in text
+    assert "'undefined_var' undeclared" in text
+    assert text.startswith('Compilation failed with 2 errors and 1 related warning:')
+    # The shared source line is shown once
+    assert text.count('void f(float *a)') == 1
+
+
+def test_root_cause_warnings_outside_the_kernel_are_dropped():
+    text = distill_compiler_errors(MISSPELLED_INTRINSIC, kernel_lines=(10, 20))
+    assert 'did you mean' not in text
+    assert text.startswith('Compilation failed with 2 errors:')
+
+
+def test_keeps_pointer_warning_but_not_other_warnings():
+    text = distill_compiler_errors(POINTER_TYPES, kernel_lines=(2, 8))
+    assert 'incompatible pointer type' in text
+    assert 'unused variable' not in text
+    assert 'argument 1 of' in text and 'argument 2 of' in text
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+from model_cascade import ModelCascade, predict_difficulty
+
+
+@pytest.fixture
+def cascade():
+    return ModelCascade.parse(['haiku:1', 'sonnet:2', 'opus'])
+
+
+def test_parse(cascade):
+    assert [(tier.model, tier.attempts) for tier in cascade.tiers] == [('haiku', 1), ('sonnet', 2), ('opus', None)]
+    assert cascade.spec() == ['haiku:1', 'sonnet:2', 'opus']
+    assert ModelCascade.parse(['sonnet']).is_single()
+    with pytest.raises(ValueError):
+        ModelCascade.parse(['haiku:one'])
+    with pytest.raises(ValueError):
+        ModelCascade.parse([])
+
+
+def test_escalates_on_listed_error_types(cascade):
+    assert cascade.next_tier(1, 1, 'compilation') == 2
+    assert cascade.next_tier(1, 1, 'correctness') == 2
+    # Other failures stay on the tier while it has attempts left
+    assert cascade.next_tier(1, 1, 'performance') == 1
+    custom = ModelCascade.parse(['haiku:3', 'sonnet'], escalate_on=['timeout'])
+    assert custom.next_tier(0, 1, 'compilation') == 0
+    assert custom.next_tier(0, 1, 'timeout') == 1
+
+
+def test_escalates_when_the_tier_attempts_are_used(cascade):
+    assert cascade.next_tier(0, 1, 'performance') == 1
+    assert cascade.next_tier(1, 2, 'performance') == 2
+
+
+def test_last_tier_keeps_every_iteration(cascade):
+    assert cascade.next_tier(2, 10, 'compilation') == 2
+
+
+def test_start_tier_follows_difficulty(cascade):
+    assert cascade.start_tier({'score': 0}) == 0
+    assert cascade.start_tier({'score': 1}) == 0
+    assert cascade.start_tier({'score': 2}) == 1
+    assert cascade.start_tier({'score': 5}) == 2
+    assert ModelCascade.parse(['haiku', 'sonnet'], hard_threshold=0).start_tier({'score': 5}) == 0
+
+
+def test_predict_difficulty():
+    simple = "real_t s000(struct args_t * func_args) { for (int i = 0; i < LEN_1D; i++) { a[i] = b[i] + 1; } }"
+    assert predict_difficulty(simple) == {'features': [], 'score': 0}
+    hard = ("real_t s000(struct args_t * func_args) { for (int i = 1; i < LEN_1D; i++) {"
+            " if (b[i] > 0.) { a[i] = a[i-1] + c[indx[i]]; } } }")
+    assert predict_difficulty(hard)['features'] == ['conditional', 'indirect', 'shifted_access']
@@ -0,0 +1,23 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+from result_log import ResultLog
+
+
+def test_append_after_torn_line(tmp_path):
+    path = str(tmp_path / 'results.jsonl')
+    log = ResultLog(path)
+    log.append('k1', {'function': 's000', 'success': True})
+    log.append('k2', {'function': 's111', 'success': False})
+    # A crash in the middle of a write leaves a partial last line
+    with open(path, 'rb+') as f:
+        f.truncate(os.path.getsize(path) - 10)
+
+    ResultLog(path).append('k3', {'function': 's112', 'success': True})
+
+    entries = ResultLog(path).entries()
+    assert entries['k1']['function'] == 's000'
+    assert 'k2' not in entries
+    assert entries['k3'] == {'function': 's112', 'success': True}
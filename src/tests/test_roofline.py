@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+from roofline import HostRoofline
+
+LEVELS = [{'level': 1, 'size_bytes': 32768}]
+TRAFFIC = {'bytes_per_element': 12, 'flops_per_element': 2}
+
+
+class FailingProbe(HostRoofline):
+    calls = 0
+
+    def probe(self):
+        FailingProbe.calls += 1
+        return None
+
+
+def test_failed_probe_is_not_repeated(tmp_path):
+    path = str(tmp_path / 'roofline.json')
+    FailingProbe.calls = 0
+    roofline = FailingProbe(path, cache_levels=LEVELS)
+    for _ in range(3):
+        assert roofline.annotate(TRAFFIC, 1000, 100, {'original': 1.0}) is None
+    # Another run on the same host reads the failure marker instead of probing
+    assert FailingProbe(path, cache_levels=LEVELS).get() is None
+    assert FailingProbe.calls == 1
+    # ... until the marker is older than the retry interval
+    FailingProbe(path, cache_levels=LEVELS, retry_failed_seconds=-1).get()
+    assert FailingProbe.calls == 2
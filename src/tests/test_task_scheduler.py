@@ -0,0 +1,96 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+from result_log import ResultLog
+from task_scheduler import TaskCostModel, allocate_iterations, longest_first, rank_by_headroom
+
+LANES = {'avx2': 8}
+
+
+def logged(func_name, wall_seconds, success, speedup=None):
+    return {
+        'function': func_name, 'isa': 'avx2', 'success': success,
+        'final_performance_data': {'speedup': speedup} if speedup else None,
+        'timing': {'wall_seconds': wall_seconds, 'stages': {'llm': {'seconds': 1.0, 'count': 2}},
+                   'tokens': {'input_tokens': 3000, 'output_tokens': 1000}},
+    }
+
+
+@pytest.fixture
+def cost_model(tmp_path):
+    log = ResultLog(str(tmp_path / 'tsvc_results_log.jsonl'))
+    log.append('a1', logged('s111', 30.0, True, 4.0))
+    log.append('a2', logged('s111', 50.0, True, 2.0))
+    log.append('b1', logged('s112', 10.0, False))
+    log.append('c1', logged('s113', 60.0, True, 1.05))
+    # Budget-exhausted results are not evidence of cost or success
+    log.append('c2', dict(logged('s113', 1.0, False), budget_exhausted=True))
+    return TaskCostModel([log.path])
+
+
+def tasks(*functions):
+    return [{'function': func_name, 'isa': 'avx2'} for func_name in functions]
+
+
+def test_cost_model(cost_model):
+    assert cost_model.expected_seconds('s111', 'avx2') == 40.0
+    assert cost_model.expected_seconds('s113', 'avx2') == 60.0
+    # Unknown functions are assumed as slow as the slowest known one
+    assert cost_model.expected_seconds('s999', 'avx2') == 60.0
+    assert cost_model.success_rate('s111') == 0.75
+    assert cost_model.success_rate('s112') == pytest.approx(1 / 3)
+    assert cost_model.past_speedup('s111') == 3.0
+    assert cost_model.tokens_per_iteration == 2000
+
+
+def test_longest_first(cost_model):
+    ordered = longest_first(tasks('s112', 's111', 's113'), cost_model)
+    assert [task['function'] for task in ordered] == ['s113', 's111', 's112']
+
+
+def test_rank_by_headroom(cost_model):
+    ranked = rank_by_headroom(tasks('s113', 's112', 's111'), cost_model, {}, LANES)
+    by_name = {task['function']: task for task in ranked}
+    assert by_name['s111']['predicted_speedup'] == 3.0
+    # No past speedup and no probe: half the lanes
+    assert by_name['s112']['predicted_speedup'] == 4.0
+    assert by_name['s111']['expected_gain'] == pytest.approx(0.75 * 2.0)
+    # s112: gain 1/3 * 3 over 10 s beats s111: 1.5 over 40 s; s113 barely gains
+    assert [task['function'] for task in ranked] == ['s112', 's111', 's113']
+
+
+def test_allocate_without_budget(cost_model):
+    allocated = allocate_iterations(rank_by_headroom(tasks('s111', 's112'), cost_model, {}, LANES),
+                                    cost_model, None, None, default_iterations=3)
+    assert [task['max_iterations'] for task in allocated] == [3, 3]
+
+
+@pytest.mark.parametrize('token_budget,seconds_budget', [(9000, None), (None, 45.0), (20000, 70.0)])
+def test_allocate_never_overspends(cost_model, token_budget, seconds_budget):
+    allocated = allocate_iterations(rank_by_headroom(tasks('s111', 's112', 's113', 's999'), cost_model, {}, LANES),
+                                    cost_model, token_budget, seconds_budget, default_iterations=3)
+    iterations = sum(task['max_iterations'] for task in allocated)
+    assert iterations > 0
+    if token_budget is not None:
+        assert iterations * cost_model.tokens_per_iteration <= token_budget
+    if seconds_budget is not None:
+        assert sum(task['max_iterations'] * task['iteration_seconds'] for task in allocated) <= seconds_budget
+
+
+def test_allocate_prefers_high_value_tasks_and_cuts_the_rest(cost_model):
+    allocated = allocate_iterations(rank_by_headroom(tasks('s111', 's112', 's113'), cost_model, {}, LANES),
+                                    cost_model, 3 * 2000, None, default_iterations=3)
+    by_name = {task['function']: task['max_iterations'] for task in allocated}
+    assert sum(by_name.values()) == 3
+    assert by_name['s113'] == 0
+    assert by_name['s112'] >= 1 and by_name['s111'] >= 1
+
+
+def test_allocate_caps_iterations_per_task(cost_model):
+    allocated = allocate_iterations(rank_by_headroom(tasks('s112'), cost_model, {}, LANES),
+                                    cost_model, 10 ** 9, None, default_iterations=3, max_iterations=5)
+    assert allocated[0]['max_iterations'] == 5
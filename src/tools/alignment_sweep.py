@@ -0,0 +1,130 @@
+import os
+import signal
+import subprocess
+from typing import Dict, List, Optional
+
+# Values of the TSVC_HUGEPAGES switch in common.c
+HUGEPAGE_MODES = {'none': 0, 'thp': 1, 'hugetlb': 2}
+
+# Heap placements tried by default: the aligned heap run is the reference, then every
+# array misaligned by the same amount, arrays misaligned against each other, and huge pages
+DEFAULT_PLACEMENTS = [
+    {'name': 'heap_aligned', 'offset': 0, 'stagger': 0, 'hugepages': 'none'},
+    {'name': 'offset_4', 'offset': 4, 'stagger': 0, 'hugepages': 'none'},
+    {'name': 'offset_16', 'offset': 16, 'stagger': 0, 'hugepages': 'none'},
+    {'name': 'offset_32', 'offset': 32, 'stagger': 0, 'hugepages': 'none'},
+    {'name': 'staggered_4', 'offset': 4, 'stagger': 4, 'hugepages': 'none'},
+    {'name': 'thp', 'offset': 0, 'stagger': 0, 'hugepages': 'thp'},
+    {'name': 'hugetlb', 'offset': 0, 'stagger': 0, 'hugepages': 'hugetlb'},
+]
+
+
+def read_thp_setting() -> Optional[str]:
+    """Active transparent huge page policy, e.g. 'madvise', or None if unavailable."""
+    try:
+        with open('/sys/kernel/mm/transparent_hugepage/enabled', 'r') as f:
+            text = f.read()
+    except OSError:
+        return None
+    start, end = text.find('['), text.find(']')
+    return text[start + 1:end] if start >= 0 and end > start else text.strip()
+
+
+class AlignmentSweep:
+    """
+    Rebuild a function's harness with heap-allocated arrays at several placements.
+
+    With TSVC_HEAP_ARRAYS the harness arrays become pointers into one allocation,
+    each placed at a configurable byte offset from a 64-byte boundary and optionally
+    backed by transparent or hugetlbfs huge pages. Aligned loads on misaligned data
+    crash, so each placement records crashes and correctness along with speedup.
+    All placements run at the repeat count calibrated for the first one.
+    """
+
+    def __init__(self, experiment, placements: List[Dict] = None, timeout: int = 120):
+        """
+        Args:
+            experiment: TSVCVectorizerExperiment providing harness generation and compilation
+            placements: List of {'name', 'offset', 'stagger', 'hugepages'} (default DEFAULT_PLACEMENTS)
+            timeout: Per-placement harness timeout in seconds
+        """
+        self.experiment = experiment
+        self.placements = placements or DEFAULT_PLACEMENTS
+        self.timeout = timeout
+
+    def run(self, func_name: str, vectorized_func: str, output_dir: str) -> List[Dict]:
+        """Build and run the harness for every placement; returns one record per placement."""
+        os.makedirs(output_dir, exist_ok=True)
+        harness = self.experiment.create_modified_tsvc(func_name, vectorized_func)
+        harness_path = os.path.join(output_dir, f"modified_tsvc_{func_name}_alignment.c")
+        with open(harness_path, 'w') as f:
+            f.write(harness)
+
+        records = []
+        pinned_iterations = None
+        for placement in self.placements:
+            exe_file = os.path.join(output_dir, f"align_{placement['name']}_{func_name}")
+            defines = [
+                '-DTSVC_HEAP_ARRAYS',
+                f"-DTSVC_ARRAY_OFFSET={placement['offset']}",
+                f"-DTSVC_ARRAY_STAGGER={placement['stagger']}",
+                f"-DTSVC_HUGEPAGES={HUGEPAGE_MODES[placement['hugepages']]}",
+            ]
+            if pinned_iterations:
+                defines.append(f"-DTSVC_FIXED_ITERATIONS={pinned_iterations}")
+            record = dict(placement)
+
+            compile_result = self.experiment.compile_harness(harness_path, exe_file, defines)
+            if compile_result.returncode != 0:
+                record['status'] = 'compile_error'
+                records.append(record)
+                continue
+
+            try:
+                run_result = self.experiment.run_harness(exe_file, timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                record['status'] = 'timeout'
+                records.append(record)
+                continue
+
+            perf = self.experiment.parse_performance_output(run_result.stdout)
+            record.update({
+                'status': 'ok' if run_result.returncode == 0 else 'crashed',
+                'correct': "CORRECTNESS: PASS" in run_result.stdout,
+                'pages': perf.get('pages'),
+                'iterations': perf.get('iterations'),
+                'original_time': perf.get('original_time'),
+                'vectorized_time': perf.get('vectorized_time'),
+                'speedup': perf.get('speedup'),
+            })
+            if run_result.returncode < 0:
+                record['signal'] = signal.Signals(-run_result.returncode).name
+            if pinned_iterations is None and perf.get('iterations'):
+                pinned_iterations = perf['iterations']
+            records.append(record)
+            print(f"    {placement['name']:>13}: status={record['status']} speedup={record['speedup']}x "
+                  f"correct={record['correct']}")
+
+        self._add_relative_times(records)
+        return records
+
+    def _add_relative_times(self, records: List[Dict]):
+        # Time of each variant relative to the first (aligned heap) placement
+        reference = next((r for r in records if r.get('status') == 'ok'), None)
+        if reference is None:
+            return
+        for record in records:
+            for key in ['original', 'vectorized']:
+                elapsed, base = record.get(f'{key}_time'), reference.get(f'{key}_time')
+                if elapsed and base:
+                    record[f'{key}_relative_time'] = elapsed / base
+
+
+def summarize_alignment(records: List[Dict], slowdown_threshold: float = 1.15) -> Dict[str, List[str]]:
+    """Placements where the vectorized kernel crashed, went wrong, or slowed down."""
+    return {
+        'crashed': [r['name'] for r in records if r.get('status') == 'crashed'],
+        'incorrect': [r['name'] for r in records if r.get('status') == 'ok' and not r.get('correct')],
+        'slowed_down': [r['name'] for r in records
+                        if (r.get('vectorized_relative_time') or 0) > slowdown_threshold],
+    }
@@ -0,0 +1,253 @@
+import fcntl
+import hashlib
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import time
+from typing import Dict, List, Optional
+
+# Two-sided 95% Student t critical values, indexed by degrees of freedom
+T_CRITICAL_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365,
+    8: 2.306, 9: 2.262, 10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086, 30: 2.042,
+    40: 2.021, 60: 2.000, 120: 1.980
+}
+
+
+def t_critical_95(df: int) -> float:
+    """
+    Return the 95% t critical value for df degrees of freedom.
+
+    Between tabulated values the next smaller df is used, whose larger t widens the
+    interval (conservative); beyond the table the normal value 1.96 applies.
+    """
+    if df <= 0:
+        return float('inf')
+    if df > max(T_CRITICAL_95):
+        return 1.96
+    return T_CRITICAL_95[max(bound for bound in T_CRITICAL_95 if bound <= df)]
+
+
+def get_cpu_model() -> str:
+    """Read the CPU model name from /proc/cpuinfo, falling back to platform info."""
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def get_compiler_version(compiler: str = 'gcc') -> str:
+    """Return the first line of `<compiler> --version`."""
+    try:
+        result = subprocess.run([compiler, '--version'], capture_output=True, text=True)
+        return result.stdout.split('\n')[0].strip()
+    except (FileNotFoundError, IndexError):
+        return 'unknown'
+
+
+def function_hash(code: str) -> str:
+    """Hash kernel source with whitespace normalized so formatting changes don't matter."""
+    normalized = ' '.join(code.split())
+    return hashlib.sha256(normalized.encode()).hexdigest()[:16]
+
+
+class BaselineTimingCache:
+    """
+    Persistent store of original-kernel timings shared across attempts, iterations and runs.
+
+    Entries are keyed by (function hash, compiler version, flags, CPU model, timing config).
+    Each entry accumulates timing samples; once the 95% confidence interval of the mean
+    is tight enough the harness reuses the cached mean instead of re-timing the original.
+    Every `recheck_interval` reuses the baseline is measured again so drift is detected.
+    """
+
+    def __init__(self, cache_path: str, max_rel_ci: float = 0.05, min_samples: int = 3,
+                 max_samples: int = 30, recheck_interval: int = 10,
+                 drift_tolerance: float = 0.10):
+        """
+        Args:
+            cache_path: JSON file holding the cache (shared between processes)
+            max_rel_ci: Maximum CI half-width relative to the mean for reuse
+            min_samples: Samples required before an entry can be reused
+            max_samples: Most recent samples kept per entry
+            recheck_interval: Reuses allowed before a spot-recheck is forced
+            drift_tolerance: Relative deviation of a recheck sample that counts as drift
+        """
+        self.cache_path = cache_path
+        self.lock_path = cache_path + '.lock'
+        self.max_rel_ci = max_rel_ci
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.recheck_interval = recheck_interval
+        self.drift_tolerance = drift_tolerance
+        self._host = {'cpu_model': get_cpu_model()}
+        self._compiler_versions = {}
+
+    def make_key(self, func_code: str, compiler: str, flags: List[str],
+                 timing_config: Dict) -> str:
+        """Build the cache key for an original kernel under a given build and timing setup."""
+        if compiler not in self._compiler_versions:
+            self._compiler_versions[compiler] = get_compiler_version(compiler)
+        key_material = json.dumps({
+            'function': function_hash(func_code),
+            'compiler': self._compiler_versions[compiler],
+            'flags': list(flags),
+            'cpu_model': self._host['cpu_model'],
+            'timing': timing_config
+        }, sort_keys=True)
+        return hashlib.sha256(key_material.encode()).hexdigest()[:24]
+
+    def summarize(self, samples: List[float]) -> Dict[str, float]:
+        """Mean and 95% confidence interval of the samples."""
+        n = len(samples)
+        mean = statistics.mean(samples) if n else 0.0
+        if n < 2:
+            return {'n': n, 'mean': mean, 'ci_half_width': float('inf'), 'rel_ci': float('inf')}
+        half_width = t_critical_95(n - 1) * statistics.stdev(samples) / math.sqrt(n)
+        return {
+            'n': n,
+            'mean': mean,
+            'ci_half_width': half_width,
+            'rel_ci': half_width / mean if mean > 0 else float('inf')
+        }
+
+    def _is_established(self, entry: Dict) -> bool:
+        stats = self.summarize(entry['samples'])
+        return stats['n'] >= self.min_samples and stats['rel_ci'] <= self.max_rel_ci
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """
+        Return a reusable baseline for key, or None if the original must be timed.
+
+        None is returned when the entry is missing, still too noisy, or due for a
+        spot-recheck. A successful lookup counts as one reuse.
+        """
+        with self._locked():
+            cache = load_json(self.cache_path)
+            entry = cache.get(key)
+            if not entry or not self._is_established(entry):
+                return None
+            if entry.get('reuses_since_check', 0) >= self.recheck_interval:
+                return None
+            entry['reuses_since_check'] = entry.get('reuses_since_check', 0) + 1
+            entry['total_reuses'] = entry.get('total_reuses', 0) + 1
+            save_json(self.cache_path, cache)
+
+        stats = self.summarize(entry['samples'])
+        return {
+            'time': stats['mean'],
+            'checksum': entry['checksum'],
+            'iterations': entry.get('iterations'),
+            'n': stats['n'],
+            'rel_ci': stats['rel_ci']
+        }
+
+    def pinned_iterations(self, key: str) -> Optional[int]:
+        """Repeat count recorded for key, so new samples are taken at the same count."""
+        with self._locked():
+            entry = load_json(self.cache_path).get(key)
+        return entry.get('iterations') if entry else None
+
+    def add_sample(self, key: str, elapsed: float, checksum: float,
+                   iterations: int = None, metadata: Dict = None) -> Dict:
+        """
+        Record a freshly measured baseline sample.
+
+        Returns a dict with 'drift' set when the sample disagrees with an established
+        entry (timing outside tolerance, or a different checksum); the entry's samples
+        are then reset to the new measurement. Samples taken at a different repeat
+        count replace the entry without counting as drift.
+        """
+        with self._locked():
+            cache = load_json(self.cache_path)
+            entry = cache.get(key)
+            drift = False
+            reason = None
+
+            if entry is None or entry.get('iterations') != iterations:
+                entry = {'samples': [], 'checksum': checksum, 'iterations': iterations,
+                         'drift_events': 0, 'created': time.time(), 'metadata': metadata or {}}
+            elif entry['checksum'] != checksum:
+                drift, reason = True, 'checksum changed'
+            elif self._is_established(entry):
+                stats = self.summarize(entry['samples'])
+                deviation = abs(elapsed - stats['mean'])
+                if deviation > max(stats['ci_half_width'], self.drift_tolerance * stats['mean']):
+                    drift = True
+                    reason = f'sample {elapsed:.6f}s vs cached mean {stats["mean"]:.6f}s'
+
+            if drift:
+                entry['samples'] = []
+                entry['checksum'] = checksum
+                entry['drift_events'] = entry.get('drift_events', 0) + 1
+                entry['last_drift'] = time.time()
+
+            entry['samples'] = (entry['samples'] + [elapsed])[-self.max_samples:]
+            entry['reuses_since_check'] = 0
+            entry['last_measured'] = time.time()
+            cache[key] = entry
+            save_json(self.cache_path, cache)
+
+        return {'drift': drift, 'reason': reason, **self.summarize(entry['samples'])}
+
+    def invalidate(self, key: str):
+        """Drop an entry, e.g. when a cached baseline could not be confirmed."""
+        with self._locked():
+            cache = load_json(self.cache_path)
+            if cache.pop(key, None) is not None:
+                save_json(self.cache_path, cache)
+
+    def compile_defines(self, cached: Dict) -> List[str]:
+        """Preprocessor flags that make the harness reuse a cached baseline."""
+        defines = [
+            f"-DTSVC_CACHED_BASELINE_TIME={cached['time']:.9f}",
+            f"-DTSVC_CACHED_BASELINE_CHECKSUM={cached['checksum']!r}"
+        ]
+        if cached.get('iterations'):
+            defines.append(f"-DTSVC_FIXED_ITERATIONS={cached['iterations']}")
+        return defines
+
+    def _locked(self):
+        return FileLock(self.lock_path)
+
+
+class FileLock:
+    """Exclusive advisory lock so concurrent experiment runs can share one cache file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+
+
+def load_json(path: str) -> Dict:
+    """Read a JSON cache file; a missing or unreadable file is an empty cache. Call under a FileLock."""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_json(path: str, data: Dict):
+    """Write a JSON cache file atomically (temp file + rename) so readers never see a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,115 @@
+import os
+import subprocess
+from typing import Dict, List
+
+from size_sweep import read_cache_hierarchy
+
+# Values of the harness's TSVC_CACHE_MODE switch
+CACHE_MODES = {
+    'hot': 0,        # Arrays stay cached between repetitions (the historical behaviour)
+    'cold': 1,       # Every array line is flushed before each repetition
+    'streaming': 2,  # An eviction buffer is streamed through the caches before each repetition
+}
+
+
+class CacheModeRunner:
+    """
+    Re-time an original/vectorized pair with the caches in a controlled state.
+
+    Each mode calibrates its own repeat count until the kernel's time, with the
+    flush/eviction hook's time subtracted, reaches min_kernel_seconds, so cold and
+    streaming speedups are not dominated by timer noise on short kernels. The
+    repeat count stops growing once one run's hook time would pass max_hook_seconds;
+    'iterations' and 'original_time' in each record show where calibration ended.
+    """
+
+    def __init__(self, experiment, modes: List[str] = None, min_kernel_seconds: float = 0.1,
+                 max_hook_seconds: float = 10.0, evict_factor: float = 2.0,
+                 max_evict_bytes: int = 1 << 30, timeout: int = 300):
+        """
+        Args:
+            experiment: TSVCVectorizerExperiment providing harness generation and compilation
+            modes: Subset of CACHE_MODES to run (default: all)
+            min_kernel_seconds: Calibration target for the original kernel's time, hook excluded
+            max_hook_seconds: Cap on the flush/eviction time of one calibrated run
+            evict_factor: Eviction buffer size as a multiple of the last-level cache
+            max_evict_bytes: Cap on the eviction buffer
+            timeout: Per-mode harness timeout in seconds
+        """
+        self.experiment = experiment
+        self.modes = list(modes or CACHE_MODES)
+        self.min_kernel_seconds = min_kernel_seconds
+        self.max_hook_seconds = max_hook_seconds
+        llc = read_cache_hierarchy()[-1]['size_bytes']
+        self.evict_bytes = int(min(llc * evict_factor, max_evict_bytes)) // 64 * 64
+        self.timeout = timeout
+
+    def run(self, func_name: str, vectorized_func: str, output_dir: str) -> Dict[str, Dict]:
+        """Build and run the harness once per mode; returns {mode: record}."""
+        os.makedirs(output_dir, exist_ok=True)
+        harness = self.experiment.create_modified_tsvc(func_name, vectorized_func)
+        harness_path = os.path.join(output_dir, f"modified_tsvc_{func_name}_cache_modes.c")
+        with open(harness_path, 'w') as f:
+            f.write(harness)
+
+        records = {}
+        for mode in self.modes:
+            exe_file = os.path.join(output_dir, f"cache_{mode}_{func_name}")
+            # -U first: the experiment's own calibration target may already be defined
+            defines = [f"-DTSVC_CACHE_MODE={CACHE_MODES[mode]}", f"-DTSVC_EVICT_BYTES={self.evict_bytes}L",
+                       '-DTSVC_CALIBRATE', '-UTSVC_CALIBRATE_TARGET',
+                       f"-DTSVC_CALIBRATE_TARGET={self.min_kernel_seconds}",
+                       f"-DTSVC_CALIBRATE_HOOK_BUDGET={self.max_hook_seconds}"]
+            record = {}
+
+            compile_result = self.experiment.compile_harness(harness_path, exe_file, defines)
+            if compile_result.returncode != 0:
+                record['status'] = 'compile_error'
+                records[mode] = record
+                continue
+
+            try:
+                run_result = self.experiment.run_harness(exe_file, timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                record['status'] = 'timeout'
+                records[mode] = record
+                continue
+
+            perf = self.experiment.parse_performance_output(run_result.stdout)
+            record.update({
+                'status': 'ok' if run_result.returncode == 0 else 'crashed',
+                'correct': "CORRECTNESS: PASS" in run_result.stdout,
+                'iterations': perf.get('iterations'),
+                'original_time': perf.get('original_time'),
+                'vectorized_time': perf.get('vectorized_time'),
+                'speedup': perf.get('speedup'),
+                'hook_calls': perf.get('vectorized_cache_hook_calls'),
+                'hook_seconds': {
+                    'original': perf.get('original_cache_hook_seconds'),
+                    'vectorized': perf.get('vectorized_cache_hook_seconds')
+                },
+            })
+            records[mode] = record
+            print(f"    {mode:>9}: speedup={record['speedup']}x correct={record['correct']}")
+        return records
+
+
+def classify_cache_sensitivity(records: Dict[str, Dict], win_threshold: float = 1.1) -> str:
+    """
+    Summarize per-mode speedups.
+
+    'wins_everywhere' when every measured mode beats the baseline by win_threshold,
+    'wins_only_hot' when only hot mode does, 'no_win' when none does, otherwise 'mixed'.
+    """
+    speedups = {mode: r['speedup'] for mode, r in records.items()
+                if r.get('speedup') is not None and r.get('correct')}
+    if not speedups:
+        return 'unknown'
+    wins = {mode for mode, speedup in speedups.items() if speedup >= win_threshold}
+    if wins == set(speedups):
+        return 'wins_everywhere'
+    if not wins:
+        return 'no_win'
+    if wins == {'hot'}:
+        return 'wins_only_hot'
+    return 'mixed'
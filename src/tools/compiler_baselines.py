@@ -0,0 +1,498 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from baseline_cache import FileLock, function_hash, get_compiler_version, get_cpu_model, load_json, save_json
+from thread_scaling import available_cpus, openmp_env
+
+
+def default_flag_dimensions(host_flags=None) -> List[Dict]:
+    """
+    Flag space searched by FlagAutotuner, one dimension at a time.
+
+    Each dimension lists alternative flag groups; the empty group keeps the default.
+    """
+    params = [[], ['--param=vect-epilogues-nomask=0'], ['--param=vect-max-version-for-alias-checks=100']]
+    if host_flags and 'avx512f' in host_flags:
+        # Let the vectorizer use 512-bit vectors and masked epilogues where the CPU has them
+        params += [['-mprefer-vector-width=512'], ['-mprefer-vector-width=512', '--param=vect-partial-vector-usage=2']]
+    return [
+        {'name': 'arch', 'options': [[], ['-march=native']]},
+        {'name': 'unroll', 'options': [[], ['-funroll-loops']]},
+        {'name': 'cost_model', 'options': [[], ['-fvect-cost-model=unlimited'], ['-fvect-cost-model=dynamic']]},
+        {'name': 'params', 'options': params},
+        {'name': 'fast_math', 'options': [[], ['-ffast-math']]},
+        {'name': 'lto', 'options': [[], ['-flto']]},
+    ]
+
+
+def reference_harness(experiment, func_name: str) -> str:
+    """Harness whose 'vectorized' kernel is the original itself, for timing compiler builds of it."""
+    functions = experiment.test_functions or experiment.extract_tsvc_functions([func_name])
+    code = functions[func_name]['code'].replace('__func__', f'"{func_name}"')
+    code = re.sub(rf'\breal_t {func_name}\(', f'real_t {func_name}_vectorized(', code, count=1)
+    return experiment.create_modified_tsvc(func_name, code)
+
+
+def build_harness(experiment, harness_path: str, exe_file: str, flags: List[str],
+                  defines: List[str] = None, compiler: str = None) -> subprocess.CompletedProcess:
+    """
+    Compile a harness with an arbitrary flag set (and optionally another compiler).
+
+    dummy.c must stay a separate, opaque unit so kernels cannot be optimized away; with
+    -flto it is therefore compiled to an object without LTO before the LTO link.
+    """
+    compiler = compiler or experiment.compiler
+    src_dir = experiment.config.source_dir
+    dummy = os.path.join(src_dir, 'dummy.c')
+    defines = list(defines or [])
+    if any(flag.startswith('-flto') for flag in flags):
+        dummy_obj = exe_file + '.dummy.o'
+        plain_flags = [flag for flag in flags if not flag.startswith('-flto')]
+        result = subprocess.run([compiler] + plain_flags + defines +
+                                ['-I', src_dir, '-c', '-o', dummy_obj, dummy],
+                                capture_output=True, text=True, cwd=src_dir)
+        if result.returncode != 0:
+            return result
+        dummy = dummy_obj
+    return subprocess.run([compiler] + flags + defines +
+                          ['-I', src_dir, '-o', exe_file, harness_path, os.path.join(src_dir, 'common.c'), dummy, '-lm'],
+                          capture_output=True, text=True, cwd=src_dir)
+
+
+def calibrated_defines(experiment, exe_file: str, timeout: int) -> Optional[List[str]]:
+    """Run a calibrating build once and return harness defines pinned to the repeat count it chose."""
+    calibrated = time_original(experiment, exe_file, 1, timeout)
+    if calibrated is None:
+        return None
+    defines = experiment.get_harness_defines()
+    if calibrated['iterations']:
+        defines = [d for d in defines if not d.startswith('-DTSVC_CALIBRATE_TARGET')]
+        defines.append(f"-DTSVC_FIXED_ITERATIONS={calibrated['iterations']}")
+    return defines
+
+
+def checksum_matches(experiment, measured: Dict, reference: Dict) -> bool:
+    """Same verdict as the harness's TSVC_CHECKSUM_OK for the experiment's precision."""
+    if measured.get('checksum') is None or reference.get('checksum') is None:
+        return False
+    return experiment.precision.checksum_ok(reference['checksum'], measured['checksum'])
+
+
+def time_original(experiment, exe_file: str, repetitions: int, timeout: int,
+                  env: Optional[Dict] = None) -> Optional[Dict]:
+    """Run a reference harness repetitions times; returns median time, checksum and repeat count."""
+    times = []
+    perf = {}
+    for _ in range(repetitions):
+        try:
+            run_result = experiment.run_harness(exe_file, timeout=timeout, env=env)
+        except subprocess.TimeoutExpired:
+            return None
+        perf = experiment.parse_performance_output(run_result.stdout)
+        if run_result.returncode != 0 or not perf.get('original_time'):
+            return None
+        times.append(perf['original_time'])
+    return {
+        'time': statistics.median(times),
+        'samples': times,
+        'checksum': perf.get('original_checksum_exact'),
+        'iterations': perf.get('iterations')
+    }
+
+
+class FlagAutotuner:
+    """
+    Per-kernel greedy search for the compiler flags that make the original fastest.
+
+    Starting from the experiment's flags, every dimension of the flag space is tried in
+    turn and the best option kept when it beats the current configuration by min_gain.
+    Candidate builds of a dimension compile in parallel and executables are cached by
+    content hash, while timing runs are serial so they do not disturb each other. All
+    builds run at the repeat count calibrated for the default build, and configurations
+    whose checksum differs from the default build (e.g. -ffast-math reassociation) are
+    rejected. The winning time and checksum replace the baseline the LLM must beat.
+    """
+
+    def __init__(self, experiment, cache_dir: str, dimensions: List[Dict] = None, repetitions: int = 3,
+                 min_gain: float = 0.02, workers: int = None, timeout: int = 120):
+        """
+        Args:
+            experiment: TSVCVectorizerExperiment providing harness generation and runs
+            cache_dir: Directory for the tuned-baseline JSON file and cached executables
+            dimensions: Flag space (default default_flag_dimensions() for the host)
+            repetitions: Timing runs per configuration (the median is used)
+            min_gain: Relative improvement a new option needs to be accepted
+            workers: Parallel compile jobs (default: CPU count)
+            timeout: Per-run harness timeout in seconds
+        """
+        self.experiment = experiment
+        self.cache_dir = cache_dir
+        self.cache_path = os.path.join(cache_dir, 'tuned_baselines.json')
+        self.build_dir = os.path.join(cache_dir, 'builds')
+        self.dimensions = dimensions or default_flag_dimensions(getattr(experiment, 'host_flags', None))
+        self.repetitions = repetitions
+        self.min_gain = min_gain
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+
+    def make_key(self, func_name: str) -> str:
+        return json.dumps({
+            'function': function_hash(self._function_code(func_name)),
+            'compiler': get_compiler_version(self.experiment.compiler),
+            'cpu_model': get_cpu_model(),
+            'flags': self.experiment.compile_flags,
+            'timing': self.experiment.get_timing_config(),
+            'dimensions': [d['options'] for d in self.dimensions]
+        }, sort_keys=True)
+
+    def tune(self, func_name: str) -> Optional[Dict]:
+        """Return the tuned baseline for func_name, searching (and caching) it on first use."""
+        key = self.make_key(func_name)
+        with FileLock(self.cache_path + '.lock'):
+            cached = load_json(self.cache_path).get(key)
+        if cached:
+            return cached
+
+        print(f"  Autotuning compiler flags for {func_name}...")
+        tuned = self.search(func_name)
+        if tuned is None:
+            return None
+        with FileLock(self.cache_path + '.lock'):
+            cache = load_json(self.cache_path)
+            cache[key] = tuned
+            save_json(self.cache_path, cache)
+        return tuned
+
+    def search(self, func_name: str) -> Optional[Dict]:
+        """Greedy coordinate search over the flag dimensions."""
+        os.makedirs(self.build_dir, exist_ok=True)
+        harness_path = os.path.join(self.build_dir, f"reference_{func_name}.c")
+        with open(harness_path, 'w') as f:
+            f.write(reference_harness(self.experiment, func_name))
+
+        # Calibrate the repeat count once with the default flags, then pin it for every build
+        base_flags = list(self.experiment.compile_flags)
+        calibration_exe = self._build_all(func_name, harness_path, [base_flags],
+                                          self.experiment.get_harness_defines())[0]
+        defines = calibrated_defines(self.experiment, calibration_exe, self.timeout) if calibration_exe else None
+        if defines is None:
+            return None
+
+        # Default flags are the reference for both time and checksum
+        default = self._measure(func_name, harness_path, base_flags, defines)
+        if default is None:
+            return None
+
+        trials = [{'flags': [], 'time': default['time'], 'status': 'default'}]
+        chosen = {}
+        best_time = default['time']
+        for dimension in self.dimensions:
+            candidates = [option for option in dimension['options'] if option != chosen.get(dimension['name'], [])]
+            configs = [self._flags(base_flags, dict(chosen, **{dimension['name']: option})) for option in candidates]
+            builds = self._build_all(func_name, harness_path, configs, defines)
+
+            for option, flags, exe in zip(candidates, configs, builds):
+                trial = {'flags': self._extra(flags, base_flags)}
+                measured = self._time(exe) if exe else None
+                if exe is None:
+                    trial['status'] = 'compile_error'
+                elif measured is None:
+                    trial['status'] = 'run_failed'
+                elif not checksum_matches(self.experiment, measured, default):
+                    trial.update(status='checksum_mismatch', time=measured['time'])
+                else:
+                    trial.update(status='ok', time=measured['time'])
+                    if measured['time'] < best_time * (1 - self.min_gain):
+                        best_time = measured['time']
+                        chosen[dimension['name']] = option
+                trials.append(trial)
+
+        best_flags = self._flags(base_flags, chosen)
+        extra = self._extra(best_flags, base_flags)
+        print(f"    tuned flags: {' '.join(extra) or '(default)'} "
+              f"{default['time']:.6f}s -> {best_time:.6f}s")
+        return {
+            'flags': best_flags,
+            'extra_flags': extra,
+            'time': best_time,
+            'checksum': default['checksum'],
+            'iterations': default['iterations'],
+            'default_time': default['time'],
+            'gain': default['time'] / best_time if best_time > 0 else None,
+            'trials': trials,
+            'tuned': time.time()
+        }
+
+    def compile_defines(self, tuned: Dict) -> List[str]:
+        """Preprocessor flags that make the harness use the tuned baseline instead of timing the original."""
+        defines = [
+            f"-DTSVC_CACHED_BASELINE_TIME={tuned['time']:.9f}",
+            f"-DTSVC_CACHED_BASELINE_CHECKSUM={tuned['checksum']!r}"
+        ]
+        if tuned.get('iterations'):
+            defines.append(f"-DTSVC_FIXED_ITERATIONS={tuned['iterations']}")
+        return defines
+
+    def _function_code(self, func_name: str) -> str:
+        functions = self.experiment.test_functions or self.experiment.extract_tsvc_functions([func_name])
+        return functions[func_name]['code']
+
+    def _flags(self, base_flags: List[str], chosen: Dict[str, List[str]]) -> List[str]:
+        flags = list(base_flags)
+        for dimension in self.dimensions:
+            flags += chosen.get(dimension['name'], [])
+        return flags
+
+    @staticmethod
+    def _extra(flags: List[str], base_flags: List[str]) -> List[str]:
+        return flags[len(base_flags):]
+
+    def _measure(self, func_name, harness_path, flags, defines) -> Optional[Dict]:
+        exe = self._build_all(func_name, harness_path, [flags], defines)[0]
+        return self._time(exe) if exe else None
+
+    def _time(self, exe: str) -> Optional[Dict]:
+        return time_original(self.experiment, exe, self.repetitions, self.timeout)
+
+    def _build_all(self, func_name: str, harness_path: str, configs: List[List[str]],
+                   defines: List[str]) -> List[Optional[str]]:
+        """Compile configurations in parallel, reusing cached executables; None marks a failed build."""
+        with open(harness_path, 'r') as f:
+            harness = f.read()
+        compiler = get_compiler_version(self.experiment.compiler)
+
+        def build(flags):
+            digest = hashlib.sha256(json.dumps([harness, compiler, flags, defines]).encode()).hexdigest()[:16]
+            exe = os.path.join(self.build_dir, f"{func_name}_{digest}")
+            if os.path.exists(exe):
+                return exe
+            result = build_harness(self.experiment, harness_path, exe + '.tmp', flags, defines)
+            if result.returncode != 0:
+                return None
+            os.replace(exe + '.tmp', exe)
+            return exe
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(build, configs))
+
+
+# Alternative compiler strategies for the original kernel, on top of the experiment's flags
+COMPILER_STRATEGIES = {
+    'pgo': {'compiler': None, 'flags': []},
+    'graphite': {'compiler': None, 'flags': ['-floop-nest-optimize']},
+    'graphite_parallel': {'compiler': None, 'flags': ['-floop-nest-optimize', '-floop-parallelize-all']},
+    'polly': {'compiler': 'clang', 'flags': ['-mllvm', '-polly', '-mllvm', '-polly-vectorizer=stripmine']},
+}
+
+# gcc flags clang rejects or ignores; dropped from the experiment's flags for Polly builds
+GCC_ONLY_FLAGS = ['-fivopts', '-fopt-info']
+
+
+class CompilerStrategyBaselines:
+    """
+    Profile-guided and polyhedral builds of the original kernel, timed next to the default build.
+
+    PGO compiles an instrumented harness, runs it once to collect profile data (cached per
+    kernel, flags and compiler), then rebuilds with -fprofile-use. Graphite adds gcc's
+    isl-based loop nest optimizer, optionally with auto-parallelization over the available
+    CPUs, and Polly builds with clang's polyhedral optimizer when clang with Polly exists.
+    Every build runs at the repeat count calibrated for the default build; times are also
+    kept per repetition so they compare with harness runs at other counts. Each record
+    carries its thread count: the auto-parallelized build runs pinned like ThreadScalingRunner
+    and is only compared with LLM kernels timed at the same count.
+    """
+
+    def __init__(self, experiment, cache_dir: str, strategies: List[str] = None,
+                 repetitions: int = 3, timeout: int = 120):
+        """
+        Args:
+            experiment: TSVCVectorizerExperiment providing harness generation and runs
+            cache_dir: Directory for the strategy JSON file, profiles and builds
+            strategies: Subset of COMPILER_STRATEGIES to build (default: all)
+            repetitions: Timing runs per build (the median is used)
+            timeout: Per-run harness timeout in seconds
+        """
+        self.experiment = experiment
+        self.cache_path = os.path.join(cache_dir, 'strategy_baselines.json')
+        self.build_dir = os.path.join(cache_dir, 'strategy_builds')
+        self.profile_dir = os.path.join(cache_dir, 'profiles')
+        self.strategies = list(strategies or COMPILER_STRATEGIES)
+        self.repetitions = repetitions
+        self.timeout = timeout
+
+    def make_key(self, func_name: str) -> str:
+        functions = self.experiment.test_functions or self.experiment.extract_tsvc_functions([func_name])
+        return json.dumps({
+            'function': function_hash(functions[func_name]['code']),
+            'compiler': get_compiler_version(self.experiment.compiler),
+            'cpu_model': get_cpu_model(),
+            'flags': self.experiment.compile_flags,
+            'timing': self.experiment.get_timing_config(),
+            'strategies': self.strategies,
+            'threads': available_cpus()
+        }, sort_keys=True)
+
+    def run(self, func_name: str) -> Optional[Dict]:
+        """Return {'default': ..., strategy: ...} for func_name, measuring (and caching) on first use."""
+        key = self.make_key(func_name)
+        with FileLock(self.cache_path + '.lock'):
+            cached = load_json(self.cache_path).get(key)
+        if cached:
+            return cached
+
+        print(f"  Building PGO/polyhedral baselines for {func_name}...")
+        measured = self.measure(func_name)
+        if measured is None:
+            return None
+        with FileLock(self.cache_path + '.lock'):
+            cache = load_json(self.cache_path)
+            cache[key] = measured
+            save_json(self.cache_path, cache)
+        return measured
+
+    def measure(self, func_name: str) -> Optional[Dict]:
+        work_dir = os.path.join(self.build_dir, func_name)
+        os.makedirs(work_dir, exist_ok=True)
+        harness_path = os.path.join(work_dir, f"reference_{func_name}.c")
+        with open(harness_path, 'w') as f:
+            f.write(reference_harness(self.experiment, func_name))
+
+        base_flags = list(self.experiment.compile_flags)
+        calibration_exe = os.path.join(work_dir, 'calibrate')
+        if build_harness(self.experiment, harness_path, calibration_exe, base_flags,
+                         self.experiment.get_harness_defines()).returncode != 0:
+            return None
+        defines = calibrated_defines(self.experiment, calibration_exe, self.timeout)
+        if defines is None:
+            return None
+
+        default_exe = os.path.join(work_dir, 'default')
+        if build_harness(self.experiment, harness_path, default_exe, base_flags, defines).returncode != 0:
+            return None
+        default = time_original(self.experiment, default_exe, self.repetitions, self.timeout)
+        if default is None:
+            return None
+        records = {'default': self._record(default, default, [], 1)}
+
+        for name in self.strategies:
+            strategy = COMPILER_STRATEGIES[name]
+            extra = list(strategy['flags'])
+            threads, env = 1, None
+            if name == 'graphite_parallel':
+                threads = available_cpus()
+                env = openmp_env(threads)
+                extra.append(f"-ftree-parallelize-loops={threads}")
+            flags = base_flags + extra
+            exe = os.path.join(work_dir, name)
+            if name == 'pgo':
+                status = self._build_pgo(func_name, harness_path, work_dir, exe, flags, defines)
+            else:
+                if strategy['compiler'] == 'clang':
+                    flags = [flag for flag in flags if not any(flag.startswith(g) for g in GCC_ONLY_FLAGS)]
+                status = self._build_plain(harness_path, exe, flags, defines, strategy['compiler'])
+
+            if status != 'ok':
+                records[name] = {'status': status, 'flags': extra, 'threads': threads}
+                continue
+            measured = time_original(self.experiment, exe, self.repetitions, self.timeout, env)
+            if measured is None:
+                records[name] = {'status': 'run_failed', 'flags': extra, 'threads': threads}
+                continue
+            records[name] = self._record(measured, default, extra, threads)
+            print(f"    {name:>17}: {measured['time']:.6f}s ({records[name]['speedup_over_default']:.2f}x over default)")
+        return records
+
+    def _record(self, measured: Dict, default: Dict, flags: List[str], threads: int) -> Dict:
+        record = {
+            'status': 'ok' if checksum_matches(self.experiment, measured, default) else 'checksum_mismatch',
+            'flags': flags,
+            'threads': threads,
+            'time': measured['time'],
+            'iterations': measured['iterations'],
+            'speedup_over_default': default['time'] / measured['time'] if measured['time'] > 0 else None,
+        }
+        if measured['iterations']:
+            record['time_per_iteration'] = measured['time'] / measured['iterations']
+        return record
+
+    def _build_plain(self, harness_path, exe, flags, defines, compiler) -> str:
+        if compiler and shutil.which(compiler) is None:
+            return 'unavailable'
+        result = build_harness(self.experiment, harness_path, exe, flags, defines, compiler=compiler)
+        if result.returncode != 0:
+            # clang without Polly rejects -polly; report that as missing rather than failed
+            return 'unavailable' if compiler and 'polly' in result.stderr.lower() else 'compile_error'
+        return 'ok'
+
+    def _build_pgo(self, func_name, harness_path, work_dir, exe, flags, defines) -> str:
+        """Instrumented build and training run (skipped when cached profile data exists), then -fprofile-use."""
+        with open(harness_path, 'r') as f:
+            harness = f.read()
+        digest = hashlib.sha256(json.dumps([harness, get_compiler_version(self.experiment.compiler),
+                                            flags, defines]).encode()).hexdigest()[:16]
+        profile_dir = os.path.join(self.profile_dir, f"{func_name}_{digest}")
+        has_profile = os.path.isdir(profile_dir) and any(
+            name.endswith('.gcda') for _, _, files in os.walk(profile_dir) for name in files)
+
+        if not has_profile:
+            instrumented = os.path.join(work_dir, 'pgo_instrumented')
+            status = self._build_objects(harness_path, work_dir, instrumented, flags, defines,
+                                         [f'-fprofile-generate={profile_dir}', '-fprofile-update=single'])
+            if status != 'ok':
+                return status
+            try:
+                training = self.experiment.run_harness(instrumented, timeout=self.timeout * 4)
+            except subprocess.TimeoutExpired:
+                return 'training_timeout'
+            if training.returncode != 0:
+                return 'training_failed'
+        return self._build_objects(harness_path, work_dir, exe, flags, defines,
+                                   [f'-fprofile-use={profile_dir}', '-fprofile-partial-training', '-Wno-missing-profile'])
+
+    def _build_objects(self, harness_path, work_dir, exe, flags, defines, profile_flags) -> str:
+        # Profile files are named after the object path, so both PGO stages compile to the same objects
+        src_dir = self.experiment.config.source_dir
+        objects = []
+        for source, profiled in [(harness_path, True), (os.path.join(src_dir, 'common.c'), True),
+                                 (os.path.join(src_dir, 'dummy.c'), False)]:
+            obj = os.path.join(work_dir, os.path.splitext(os.path.basename(source))[0] + '.o')
+            result = subprocess.run([self.experiment.compiler] + flags + (profile_flags if profiled else []) +
+                                    defines + ['-I', src_dir, '-c', '-o', obj, source],
+                                    capture_output=True, text=True, cwd=src_dir)
+            if result.returncode != 0:
+                return 'compile_error'
+            objects.append(obj)
+        result = subprocess.run([self.experiment.compiler] + flags + profile_flags + ['-o', exe] + objects + ['-lm'],
+                                capture_output=True, text=True, cwd=src_dir)
+        return 'ok' if result.returncode == 0 else 'compile_error'
+
+
+def compare_with_strategies(strategies: Dict, performance_data: Dict,
+                            thread_points: Optional[List[Dict]] = None) -> Dict[str, float]:
+    """
+    LLM speedup over each compiler strategy, compared per repetition of the timed loop.
+
+    Every build is compared with the LLM kernel at the build's thread count: a thread-scaling
+    point (thread_points) when one exists, otherwise the final kernel's own single-threaded timing.
+    """
+    timings = {1: performance_data}
+    for point in thread_points or []:
+        if point.get('status') == 'ok' and point.get('correct'):
+            timings[point['threads']] = point
+    speedups = {}
+    for name, record in (strategies or {}).items():
+        if record.get('status') != 'ok' or not record.get('time_per_iteration'):
+            continue
+        llm = timings.get(record.get('threads', 1), {})
+        if not llm.get('vectorized_time') or not llm.get('iterations'):
+            continue
+        speedups[name] = record['time_per_iteration'] / (llm['vectorized_time'] / llm['iterations'])
+    return speedups
@@ -0,0 +1,675 @@
+import ast
+import math
+import re
+from typing import Dict, List, Optional
+
+from kernel_catalog import TRAFFIC_ARRAYS, TWO_D_ARRAYS, eval_c_int_expression
+
+# Dependences listed per kernel in the prompt, most important first
+MAX_DEPENDENCES = 8
+
+# Names that are neither loop variables nor scalars of the kernel
+_CONSTANTS = {'LEN_1D', 'LEN_2D', 'iterations', 'real_t', 'int', 'float', 'double', 'func_args', 'arg_info'}
+_KEYWORDS = {'for', 'while', 'if', 'else', 'switch', 'case', 'goto', 'break', 'continue', 'return', 'do', 'sizeof'}
+# Function-like macros of common.h that are plain arithmetic
+_MACROS = {'ABS', 'MAX', 'MIN'}
+
+_CONTROL = re.compile(r'\b(for|while|if|switch|else)\b')
+_ARRAY_START = re.compile(r'\b(' + '|'.join(TRAFFIC_ARRAYS) + r')\s*\[')
+# First assignment operator, including compound ones, but not ==, <=, >= or !=
+_ASSIGNMENT = re.compile(r'(?<![=!<>+\-*/])([+\-*/]?)=(?!=)')
+_INCREMENT = re.compile(r'^(?:(\+\+|--)\s*(\w+)|(\w+)\s*(\+\+|--))$')
+_LABEL = re.compile(r'^\s*(?:case\s+\w+|default|\w+)\s*:(?!:)')
+_DECLARATION = re.compile(r'^\s*(?:const\s+)?(?:real_t|int|float|double)\s+(?=\w)')
+_CALL = re.compile(r'\b([A-Za-z_]\w*)\s*\(')
+_IDENTIFIER = re.compile(r'\b([A-Za-z_]\w*)\b(?!\s*[\[(])')
+_LOOP_HEADER = re.compile(r'^\s*(?:int\s+)?(\w+)\s*=\s*(.+)$')
+
+
+def analyze_kernel(catalog, func_name: str) -> Dict:
+    """
+    Static dependence analysis of a kernel's loops (cached in the catalog entry).
+
+    The loop nests inside the timed `nl` loop are parsed into loops, statements and array
+    references. Affine subscripts are compared pairwise (ZIV/SIV tests with a GCD fallback)
+    to give dependence kinds, distances and directions; scalars are classified as
+    reductions, induction variables or values carried across iterations; and control flow
+    that needs masking or stops the loop early is listed.
+
+    Returns:
+        Dict with 'loops', 'accesses', 'dependences', 'scalars' and 'control_flow'
+    """
+    kernel = catalog.get(func_name)
+    if 'dependences' not in kernel:
+        kernel['dependences'] = _analyze_body(catalog.loop_body(func_name))
+    return kernel['dependences']
+
+
+def format_analysis(analysis: Dict, max_dependences: int = MAX_DEPENDENCES) -> str:
+    """Prompt text of an analyze_kernel() result: loops with their accesses and dependences, then scalars and control flow."""
+    if not analysis['loops']:
+        return ''
+    lines = ["Static dependence analysis of the original loops (from the subscripts; "
+             "distances are in iterations of the named loops, verify before relying on them):"]
+    dependences = sorted(analysis['dependences'], key=lambda dep: dep['priority'])[:max_dependences]
+    for loop in analysis['loops']:
+        accesses = [access for access in analysis['accesses'] if access['loop'] == loop['id']]
+        loop_dependences = [dep for dep in dependences if dep['loop'] == loop['id']]
+        if not accesses and not loop_dependences:
+            continue
+        lines.append(f"Loop `for ({loop['header']})`:")
+        if accesses:
+            lines.append("- Accesses: " + ', '.join(f"{access['text']} {access['mode']} ({access['stride']})"
+                                                      for access in accesses))
+        lines.extend(f"- {dep['text']}" for dep in loop_dependences)
+    if len(analysis['dependences']) > max_dependences:
+        lines.append(f"- ... {len(analysis['dependences']) - max_dependences} less important dependences omitted")
+    if not analysis['dependences']:
+        lines.append("No dependences between array accesses of different iterations found.")
+    if analysis['scalars']:
+        lines.append("Scalars: " + '; '.join(f"{entry['name']}: {entry['role']}" for entry in analysis['scalars']))
+    lines.append("Control flow: " + ('; '.join(analysis['control_flow']) or 'none (straight-line loop body)'))
+    return '\n'.join(lines)
+
+
+def _analyze_body(body: str) -> Dict:
+    parsed = {'loops': [], 'statements': [], 'control_flow': [], 'labels': {}, 'jumps': []}
+    _walk(body, [], False, parsed)
+    loops = {loop['id']: loop for loop in parsed['loops']}
+    exits = _apply_jumps(parsed)
+    statements = [statement for statement in parsed['statements'] if statement['loops']]
+
+    variant = {statement['scalar'] for statement in statements if statement['scalar']}
+    substitutions = _substitutions(statements, loops)
+    for statement in statements:
+        loop_vars = {loops[loop_id]['var'] for loop_id in statement['loops']}
+        for ref in statement['refs']:
+            ref['conditional'] = statement['conditional']  # Jumps can make a statement conditional after parsing
+            ref['forms'] = [_linear(subscript, loop_vars, variant, substitutions.get(statement['index'], {}))
+                            for subscript in ref['subscripts']]
+
+    return {
+        'loops': [{key: loop[key] for key in ['id', 'var', 'header', 'step', 'depth']} for loop in parsed['loops']],
+        'accesses': _accesses(statements, loops),
+        'dependences': _dependences(statements, loops),
+        'scalars': _scalars(statements, loops, exits),
+        'control_flow': _unique(parsed['control_flow']),
+    }
+
+
+def _walk(text: str, loops: List[int], conditional: bool, parsed: Dict):
+    """Split text into statements and nested loop/branch bodies, recording them in parsed."""
+    position = 0
+    while True:
+        match = _CONTROL.search(text, position)
+        _add_statements(text[position:match.start() if match else len(text)], loops, conditional, parsed)
+        if match is None:
+            return
+        keyword = match.group(1)
+        cursor = match.end()
+        header = None
+        if keyword != 'else':
+            open_index = text.find('(', cursor)
+            close_index = _matching(text, open_index, '(', ')')
+            header = text[open_index + 1:close_index]
+            cursor = close_index + 1
+        elif re.match(r'\s*if\b', text[cursor:]):
+            position = cursor  # `else if`: the if is handled next, already conditional
+            continue
+
+        rest = text[cursor:]
+        stripped = len(rest) - len(rest.lstrip())
+        if rest.lstrip().startswith('{'):
+            body_start = cursor + stripped + 1
+            body_end = _matching(text, body_start - 1, '{', '}')
+            position = body_end + 1
+        else:
+            body_start = cursor
+            body_end = text.find(';', cursor)
+            body_end = len(text) if body_end < 0 else body_end + 1
+            position = body_end
+        body = text[body_start:body_end]
+
+        if keyword == 'for':
+            loop = _parse_loop(header, len(parsed['loops']), len(loops))
+            if loop['var'] == 'nl':
+                _walk(body, loops, conditional, parsed)  # The timing repetition is not part of the kernel
+                continue
+            parsed['loops'].append(loop)
+            if loop['step'] is None:
+                parsed['control_flow'].append(f"loop `{loop['var']}` has a non-constant step")
+            _walk(body, loops + [loop['id']], conditional, parsed)
+            continue
+
+        if loops:
+            if keyword == 'while':
+                parsed['control_flow'].append("while loop inside the loop (data-dependent trip count)")
+            elif keyword == 'switch':
+                parsed['control_flow'].append(f"switch on `{header.strip()}` (per-element branch selection)")
+            elif keyword == 'if':
+                parsed['control_flow'].append("if statements (needs masking/blending or a predicated formulation)")
+        if header is not None:
+            _add_statement(header, loops, conditional, parsed, condition=True)
+        _walk(body, loops, True, parsed)
+
+
+def _apply_jumps(parsed: Dict) -> set:
+    """
+    Mark the statements a goto, break, return or exit can skip as conditional and report the
+    jumps as control flow. A forward goto inside the loop skips the statements up to its label;
+    a jump out of the loop is an early exit, which skips the rest of the loop body.
+
+    Returns:
+        Ids of the loops with an early exit
+    """
+    exits = set()
+    for jump in parsed['jumps']:
+        innermost = jump['loops'][-1]
+        label = parsed['labels'].get(jump['target']) if jump['target'] else None
+        if label is not None and innermost in label[1] and label[0] >= jump['position']:
+            skipped = range(jump['position'], label[0])
+            parsed['control_flow'].append("goto (unstructured branches; rewrite as conditions)")
+        elif label is not None and innermost in label[1]:
+            skipped = range(0)
+            parsed['control_flow'].append("backward goto (a loop formed by a jump; data-dependent trip count)")
+        else:
+            skipped = range(jump['position'], len(parsed['statements']))
+            exits.add(innermost)
+            via = f"goto {jump['target']}" if jump['target'] else jump['via']
+            parsed['control_flow'].append(f"early exit via `{via}` (iterations after the exit must not take effect)")
+        for index in skipped:
+            if innermost in parsed['statements'][index]['loops']:
+                parsed['statements'][index]['conditional'] = True
+    return exits
+
+
+def _add_statements(segment: str, loops: List[int], conditional: bool, parsed: Dict):
+    for piece in segment.split(';'):
+        _add_statement(piece, loops, conditional, parsed)
+
+
+def _add_statement(text: str, loops: List[int], conditional: bool, parsed: Dict, condition: bool = False):
+    while not condition and _LABEL.match(text):
+        label = re.match(r'^\s*(\w+)', text).group(1)
+        if label not in ('case', 'default'):
+            # The label marks the position of the next statement
+            parsed['labels'][label] = (len(parsed['statements']), tuple(loops))
+        text = _LABEL.sub('', text, count=1)
+    declaration = _DECLARATION.match(text)
+    text = _DECLARATION.sub('', text.strip()).strip()
+    if not text or declaration and '=' not in text:
+        return
+    if loops:
+        goto = re.match(r'^goto\s+(\w+)', text)
+        if goto:
+            parsed['jumps'].append({'position': len(parsed['statements']), 'loops': tuple(loops), 'target': goto.group(1)})
+            return
+        if re.match(r'^(break|return)\b', text) or re.match(r'^exit\s*\(', text):
+            parsed['jumps'].append({'position': len(parsed['statements']), 'loops': tuple(loops), 'target': None,
+                                    'via': text.split('(')[0].strip()})
+            return
+        calls = [name for name in _CALL.findall(text) if name not in _KEYWORDS | _MACROS | _CONSTANTS]
+        if calls:
+            parsed['control_flow'].append(f"calls {', '.join(sorted(set(calls)))} (need vector versions)")
+
+    statement = {'index': len(parsed['statements']), 'loops': tuple(loops), 'conditional': conditional,
+                 'condition': condition, 'text': text, 'scalar': None, 'op': None, 'refs': [], 'scalar_reads': set()}
+    increment = _INCREMENT.match(text)
+    assignment = None if condition or increment else _ASSIGNMENT.search(text)
+    if increment:
+        name = increment.group(2) or increment.group(3)
+        statement.update(scalar=name, op='+', rhs='1')
+        statement['scalar_reads'].add(name)
+    elif assignment:
+        lhs, rhs = text[:assignment.start()].strip(), text[assignment.end():]
+        statement['rhs'] = rhs.strip()
+        target = _ARRAY_START.match(lhs)
+        if target:
+            ref = _parse_ref(lhs, target, write=True, statement=statement)
+            statement['refs'].append(ref)
+            for subscript in ref['subscripts']:
+                _add_reads(subscript, statement)
+            if assignment.group(1):
+                statement['refs'].append(dict(ref, write=False))
+        elif re.fullmatch(r'\w+', lhs):
+            statement.update(scalar=lhs, op=assignment.group(1) or '')
+            if assignment.group(1):
+                statement['scalar_reads'].add(lhs)
+        _add_reads(rhs, statement)
+    else:
+        _add_reads(text, statement)
+    # Reads come before the write of the same statement
+    statement['refs'].sort(key=lambda ref: ref['write'])
+    parsed['statements'].append(statement)
+
+
+def _add_reads(text: str, statement: Dict):
+    """Record the array and scalar reads of an expression (including those inside subscripts)."""
+    for match in _ARRAY_START.finditer(text):
+        statement['refs'].append(_parse_ref(text, match, write=False, statement=statement))
+    stripped = _ARRAY_START.sub('[', text)
+    for name in _IDENTIFIER.findall(stripped):
+        if name not in _CONSTANTS | _KEYWORDS and not re.fullmatch(r'\d\w*', name):
+            statement['scalar_reads'].add(name)
+
+
+def _parse_ref(text: str, match, write: bool, statement: Dict) -> Dict:
+    subscripts = []
+    index = match.end() - 1
+    end = index
+    while index < len(text) and text[index] == '[':
+        end = _matching(text, index, '[', ']')
+        subscripts.append(text[index + 1:end].strip())
+        index = end + 1
+        while index < len(text) and text[index] == ' ':
+            index += 1
+    return {'array': match.group(1), 'subscripts': subscripts, 'text': re.sub(r'\s+', '', text[match.start():end + 1]),
+            'write': write, 'statement': statement['index'], 'loops': statement['loops'],
+            'conditional': statement['conditional'],
+            'indirect': any(_ARRAY_START.search(subscript) for subscript in subscripts)}
+
+
+def _parse_loop(header: str, loop_id: int, depth: int) -> Dict:
+    parts = [part.strip() for part in header.split(';')]
+    init = _LOOP_HEADER.match(parts[0]) if parts else None
+    var = init.group(1) if init else None
+    step = None
+    if var and len(parts) == 3:
+        update = re.sub(r'\s+', '', parts[2])
+        if update in (f'{var}++', f'++{var}'):
+            step = 1
+        elif update in (f'{var}--', f'--{var}'):
+            step = -1
+        else:
+            compound = re.fullmatch(rf'{var}([+-])=(\d+)', update) or re.fullmatch(rf'{var}={var}([+-])(\d+)', update)
+            if compound:
+                step = int(compound.group(2)) * (1 if compound.group(1) == '+' else -1)
+    return {'id': loop_id, 'var': var, 'header': re.sub(r'\s+', ' ', header.strip()), 'step': step, 'depth': depth}
+
+
+def _substitutions(statements: List[Dict], loops: Dict) -> Dict[int, Dict]:
+    """
+    Scalars usable inside subscripts as affine expressions, per statement index: a scalar
+    assigned exactly once in its loop body with a plain affine `=` (e.g. `j = i + 1`) stands
+    for that expression in the statements after the assignment.
+    """
+    assignments = {}
+    for statement in statements:
+        if statement['scalar']:
+            assignments.setdefault((statement['scalar'], statement['loops']), []).append(statement)
+    result = {}
+    for (name, loop_ids), assigned in assignments.items():
+        if len(assigned) != 1 or assigned[0]['op'] != '' or assigned[0]['conditional']:
+            continue
+        loop_vars = {loops[loop_id]['var'] for loop_id in loop_ids}
+        form = _linear(assigned[0]['rhs'], loop_vars, set(), {})
+        if form is None:
+            continue
+        for statement in statements:
+            if statement['index'] > assigned[0]['index'] and statement['loops'][:len(loop_ids)] == loop_ids:
+                result.setdefault(statement['index'], {})[name] = form
+    return result
+
+
+def _linear(expression: str, loop_vars: set, variant: set, substitutions: Dict) -> Optional[Dict]:
+    """
+    Affine form of a subscript as {term: coefficient}: loop variables, loop-invariant terms
+    (names or whole subexpressions such as `LEN_1D/2`) and '1' for the constant.
+    None for non-affine or indirect subscripts and scalars that change inside the loop.
+    """
+    expression = re.sub(r'\(\s*(int|real_t)\s*\)', '', expression)
+    try:
+        tree = ast.parse(expression, mode='eval').body
+    except SyntaxError:
+        return None
+
+    def has_loop_var(node):
+        return any(isinstance(child, ast.Name) and (child.id in loop_vars or child.id in substitutions or child.id in variant)
+                   for child in ast.walk(node))
+
+    def visit(node) -> Dict:
+        if isinstance(node, ast.Constant) and isinstance(node.value, int):
+            return {'1': node.value}
+        if isinstance(node, ast.Name):
+            if node.id in substitutions:
+                return dict(substitutions[node.id])
+            if node.id in variant and node.id not in loop_vars:
+                raise ValueError(node.id)
+            return {node.id: 1}
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            sign = -1 if isinstance(node.op, ast.USub) else 1
+            return {term: sign * value for term, value in visit(node.operand).items()}
+        if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub)):
+            left, right = visit(node.left), visit(node.right)
+            sign = 1 if isinstance(node.op, ast.Add) else -1
+            for term, value in right.items():
+                left[term] = left.get(term, 0) + sign * value
+            return {term: value for term, value in left.items() if value}
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mult):
+            left, right = visit(node.left), visit(node.right)
+            for scale, other in [(left, right), (right, left)]:
+                if set(scale) <= {'1'}:
+                    factor = scale.get('1', 0)
+                    return {term: factor * value for term, value in other.items() if factor * value}
+        if not has_loop_var(node):
+            value = eval_c_int_expression(ast.unparse(node), {})
+            return {'1': value} if value is not None else {ast.unparse(node): 1}
+        raise ValueError(ast.unparse(node))
+
+    try:
+        return visit(tree)
+    except ValueError:
+        return None
+
+
+def _accesses(statements: List[Dict], loops: Dict) -> List[Dict]:
+    """Distinct array accesses per innermost loop with their stride along that loop."""
+    accesses = []
+    seen = set()
+    for statement in statements:
+        if statement['condition'] and not statement['refs']:
+            continue
+        innermost = loops[statement['loops'][-1]]
+        for ref in statement['refs']:
+            key = (innermost['id'], ref['text'], ref['write'])
+            if key in seen:
+                continue
+            seen.add(key)
+            accesses.append({'loop': innermost['id'], 'text': ref['text'], 'mode': 'write' if ref['write'] else 'read',
+                             'stride': _stride(ref, innermost)})
+    return accesses
+
+
+def _stride(ref: Dict, loop: Dict) -> str:
+    if ref['indirect']:
+        return 'indirect: gather' if not ref['write'] else 'indirect: scatter'
+    if any(form is None for form in ref['forms']):
+        return 'non-affine subscript'
+    coefficients = [form.get(loop['var'], 0) * (loop['step'] or 1) for form in ref['forms']]
+    if not any(coefficients):
+        return f"invariant in {loop['var']}"
+    if len(coefficients) == 2 and ref['array'] in TWO_D_ARRAYS and coefficients[0]:
+        rows = coefficients[0]
+        return f"stride {'' if rows == 1 else ('-' if rows == -1 else f'{rows}*')}LEN_2D" + \
+               (f"{coefficients[1]:+d}" if coefficients[1] else '')
+    return f"stride {coefficients[-1]}" + ('' if loop['step'] is not None else ' per step')
+
+
+def _dependences(statements: List[Dict], loops: Dict) -> List[Dict]:
+    refs = [ref for statement in statements for ref in statement['refs']]
+    loop_vars = {loop['var'] for loop in loops.values()}
+    dependences = []
+    seen = set()
+    for first_index, first in enumerate(refs):
+        for second in refs[first_index + 1:]:
+            if first['array'] != second['array'] or not (first['write'] or second['write']):
+                continue
+            common = _common_prefix(first['loops'], second['loops'])
+            if not common:
+                continue
+            dependence = _test_pair(first, second, [loops[loop_id] for loop_id in common], loop_vars)
+            if dependence is None:
+                continue
+            key = (dependence['loop'], dependence['text'])
+            if key not in seen:
+                seen.add(key)
+                dependences.append(dependence)
+    return dependences
+
+
+def _test_pair(first: Dict, second: Dict, common: List[Dict], loop_vars: set) -> Optional[Dict]:
+    """Dependence between two references to the same array inside the common loops, or None if independent."""
+    variables = [loop['var'] for loop in common]
+    distances = {}  # Loop variable -> index distance (second - first)
+    special = None
+    unknown = first['indirect'] or second['indirect'] or len(first['forms']) != len(second['forms'])
+
+    if not unknown:
+        for form_a, form_b in zip(first['forms'], second['forms']):
+            if form_a is None or form_b is None:
+                unknown = True
+                continue
+            result = _test_dimension(form_a, form_b, variables, loop_vars)
+            if result == 'independent':
+                return None
+            if isinstance(result, dict):
+                for var, distance in result.items():
+                    if distances.get(var, distance) != distance:
+                        return None  # Inconsistent distances across dimensions
+                    distances[var] = distance
+            elif isinstance(result, tuple):
+                special = result
+
+    # Convert index distances into iteration distances of each loop
+    vector = []
+    for loop in common:
+        if loop['var'] in distances and not unknown and special is None:
+            step = loop['step']
+            if step is None:
+                vector.append('*')
+            elif distances[loop['var']] % step:
+                return None  # The other iteration never touches that element
+            else:
+                vector.append(distances[loop['var']] // step)
+        elif not unknown and special is None and not any(loop['var'] in form for form in first['forms'] + second['forms']):
+            vector.append('any')  # Not in the subscripts: every iteration of this loop touches the same elements
+        else:
+            vector.append('*')
+
+    innermost = common[-1]
+    conditional = ' (conditional)' if first['conditional'] or second['conditional'] else ''
+    pair = f"{first['text']} ({'write' if first['write'] else 'read'}) and {second['text']} ({'write' if second['write'] else 'read'})"
+
+    if special is not None and not unknown:
+        var, kind, expression = special
+        if kind == 'weak_zero':
+            text = (f"{pair} touch the same element only at {var} = {expression}{conditional}: "
+                    f"iterations before it see the original value, iterations after it see the updated one")
+        else:
+            text = (f"{pair} touch the same element at mirrored iterations ({var} + {var}' = {expression}){conditional}: "
+                    f"the second half of the loop accesses elements the first half already accessed")
+        return {'loop': innermost['id'], 'kind': kind, 'vector': ['*'] * len(common), 'text': text, 'priority': 1}
+
+    if '*' in vector:
+        directions = ', '.join('*' if value == '*' else _direction(value) for value in vector)
+        text = f"possible dependence between {pair}, direction ({directions}) in ({', '.join(variables)}){conditional}"
+        carried = next((loop for loop, value in zip(common, vector) if value != 0), innermost)
+        return {'loop': carried['id'], 'kind': 'unknown', 'vector': vector, 'text': text, 'priority': 4}
+
+    repeated = [loop for loop, value in zip(common, vector) if value == 'any']
+    if repeated and all(value in ('any', 0) for value in vector):
+        text = (f"{pair} access the same elements in every iteration of {repeated[0]['var']}{conditional}: "
+                f"dependence carried by {repeated[0]['var']}")
+        return {'loop': repeated[0]['id'], 'kind': 'repeated', 'vector': vector, 'text': text, 'priority': 2}
+
+    # Order the pair by execution: the first non-zero iteration distance decides
+    leading = next((value for value in vector if value not in ('any', 0)), 0)
+    if leading < 0:
+        first, second = second, first
+        vector = [value if value == 'any' else -value for value in vector]
+    if not any(value not in ('any', 0) for value in vector):
+        return None  # Same iteration: statement order already keeps it in a vectorized body
+    if first['write'] and second['write']:
+        kind, label = 'output', 'output (write-after-write)'
+    elif first['write']:
+        kind, label = 'flow', 'flow (read-after-write)'
+    else:
+        kind, label = 'anti', 'anti (write-after-read)'
+    source, sink = first['text'], second['text']
+
+    carrier_index = next(index for index, value in enumerate(vector) if value not in ('any', 0))
+    carrier = common[carrier_index]
+    if len(vector) == 1:
+        where = f"distance {vector[0]} in {carrier['var']}"
+    else:
+        where = (f"distance ({', '.join('*' if value == 'any' else str(value) for value in vector)}) "
+                 f"in ({', '.join(variables)}), carried by {carrier['var']}")
+        if repeated:
+            where += f", repeated in every iteration of {', '.join(loop['var'] for loop in repeated)}"
+
+    distance = vector[carrier_index]
+    if kind == 'flow':
+        effect = (f"values written are read {distance} iteration{'s' if distance != 1 else ''} later"
+                  f"{' (recurrence)' if carrier is innermost else ''}")
+        priority = 0
+    elif kind == 'anti':
+        effect = f"elements are read {distance} iteration{'s' if distance != 1 else ''} before being overwritten (load before storing)"
+        priority = 2
+    else:
+        effect = "the later write must win"
+        priority = 3
+    text = f"{label} {source} -> {sink}, {where}{conditional}: {effect}"
+    return {'loop': carrier['id'], 'kind': kind, 'vector': vector, 'text': text, 'priority': priority}
+
+
+def _test_dimension(form_a: Dict, form_b: Dict, variables: List[str], loop_vars: set):
+    """
+    Compare one subscript dimension of two references inside the common loops `variables`.
+
+    Returns 'independent', {var: index distance} (ZIV/strong SIV), a (var, kind, expression)
+    tuple for weak-zero and weak-crossing SIV, or None when the dimension does not constrain them.
+    """
+    coefficients_a = {term: value for term, value in form_a.items() if term in loop_vars}
+    coefficients_b = {term: value for term, value in form_b.items() if term in loop_vars}
+    invariant_a = {term: value for term, value in form_a.items() if term != '1' and term not in coefficients_a}
+    invariant_b = {term: value for term, value in form_b.items() if term != '1' and term not in coefficients_b}
+    # Constant difference, symbolic terms included: form_b - form_a without loop variables
+    difference = dict(invariant_b)
+    difference['1'] = form_b.get('1', 0)
+    for term, value in list(invariant_a.items()) + [('1', form_a.get('1', 0))]:
+        difference[term] = difference.get(term, 0) - value
+    difference = {term: value for term, value in difference.items() if value}
+    symbolic = any(term != '1' for term in difference)
+    constant = difference.get('1', 0)
+    used = sorted(set(coefficients_a) | set(coefficients_b))
+
+    if not used:
+        # ZIV: both subscripts invariant
+        return 'independent' if difference and not symbolic else None
+    if len(used) == 1 and used[0] in variables:
+        var = used[0]
+        a, b = coefficients_a.get(var, 0), coefficients_b.get(var, 0)
+        if a == b:
+            # Strong SIV: a * var_a + k_a = a * var_b + k_b
+            if symbolic:
+                return None
+            if constant % a:
+                return 'independent'
+            return {var: -constant // a}
+        if a == 0 or b == 0:
+            # Weak-zero SIV: only one iteration of the varying reference meets the other
+            coefficient = a or b
+            solution = difference if a else {term: -value for term, value in difference.items()}
+            if not symbolic and constant % coefficient:
+                return 'independent'
+            return (var, 'weak_zero', _format_form(solution, coefficient))
+        if a == -b:
+            # Weak-crossing SIV: a * (var_a + var_b) = k_b - k_a
+            return (var, 'weak_crossing', _format_form(difference, a))
+    # MIV or general SIV: GCD test on the numeric part
+    if not symbolic:
+        divisor = 0
+        for value in list(coefficients_a.values()) + list(coefficients_b.values()):
+            divisor = math.gcd(divisor, value)
+        if divisor and constant % divisor:
+            return 'independent'
+    return None
+
+
+def _format_form(form: Dict, divisor: int = 1) -> str:
+    """C-like text of an affine form divided by divisor, e.g. {'LEN_1D': 1, '1': -1} -> 'LEN_1D - 1'."""
+    if divisor < 0:
+        form = {term: -value for term, value in form.items()}
+        divisor = -divisor
+    parts = []
+    for term, value in sorted(form.items(), key=lambda item: item[0] == '1'):
+        magnitude = abs(value)
+        text = str(magnitude) if term == '1' else (term if magnitude == 1 else f"{magnitude}*{term}")
+        parts.append(('- ' if value < 0 else ('+ ' if parts else '')) + text)
+    expression = ' '.join(parts) or '0'
+    if expression.startswith('- '):
+        expression = '-' + expression[2:]
+    return expression if divisor == 1 else f"({expression})/{divisor}"
+
+
+def _scalars(statements: List[Dict], loops: Dict, exits: set) -> List[Dict]:
+    """
+    Role of every scalar assigned inside the loops: reduction, induction, carried value or
+    conditional update (the value of the first match when the loop exits early, exits).
+    """
+    loop_vars = {loop['var'] for loop in loops.values()}
+    variant = {statement['scalar'] for statement in statements if statement['scalar']}
+    roles = []
+    for name in _unique([statement['scalar'] for statement in statements if statement['scalar']]):
+        if name in loop_vars:
+            continue
+        assigned = [statement for statement in statements if statement['scalar'] == name]
+        updates = [statement for statement in assigned if name in statement['scalar_reads']]
+        readers = [statement for statement in statements if name in statement['scalar_reads'] and statement['scalar'] != name]
+        subscript_use = any(re.search(rf'\b{name}\b', ' '.join(ref['subscripts']))
+                            for statement in statements for ref in statement['refs'])
+        conditional = all(statement['conditional'] for statement in assigned)
+        first = assigned[0]
+
+        if subscript_use and updates:
+            # Steps that are constants or loop invariants make an induction variable
+            invariant_step = all(statement['op'] in ('+', '-') and not statement['refs'] and
+                                 not (statement['scalar_reads'] - {name}) & (variant | loop_vars)
+                                 for statement in updates)
+            if not invariant_step:
+                role = "index advanced by a varying amount (not a closed form in the loop variables)"
+            elif any(statement['conditional'] for statement in updates):
+                role = "conditionally incremented index (packing/compaction: positions depend on earlier iterations)"
+            else:
+                role = "induction variable (a closed form in the loop variables removes the dependence)"
+        elif updates and all(statement['op'] in ('+', '-', '*') for statement in updates):
+            stored = any(ref['write'] for reader in readers for ref in reader['refs'])
+            role = (f"{first['op']}= reduction whose running value is also stored each iteration (prefix scan)"
+                    if stored else f"{first['op']}= reduction (combine per-lane partial results at the end)")
+            if conditional:
+                role = "conditional " + role
+        elif conditional and any(statement['condition'] and name in statement['scalar_reads'] for statement in statements):
+            role = "conditional reduction (max/min style: compare-and-keep)"
+        elif conditional and exits & set(first['loops']):
+            role = (f"{'index' if (first.get('rhs') or '').strip() in loop_vars else 'value'} of the first match "
+                    f"(the loop exits right after it is assigned)")
+        elif conditional and (first.get('rhs') or '').strip() in loop_vars:
+            role = "index of the selected element (argmax/last-match style)"
+        elif conditional:
+            role = "conditionally assigned; iterations without the assignment keep the previous value"
+        elif any(reader['index'] < first['index'] and reader['loops'][:len(first['loops'])] == first['loops']
+                 for reader in readers):
+            role = "read before it is assigned in the loop body: carries the previous iteration's value (wrap-around)"
+        else:
+            continue  # Temporary assigned before use: private to each iteration
+        roles.append({'name': name, 'role': role})
+    return roles
+
+
+def _common_prefix(first, second) -> tuple:
+    prefix = []
+    for a, b in zip(first, second):
+        if a != b:
+            break
+        prefix.append(a)
+    return tuple(prefix)
+
+
+def _direction(value: int) -> str:
+    return '<' if value > 0 else ('>' if value < 0 else '=')
+
+
+def _matching(text: str, open_index: int, opening: str, closing: str) -> int:
+    depth = 0
+    for index in range(open_index, len(text)):
+        if text[index] == opening:
+            depth += 1
+        elif text[index] == closing:
+            depth -= 1
+            if depth == 0:
+                return index
+    return len(text) - 1
+
+
+def _unique(items: List) -> List:
+    return list(dict.fromkeys(items))
@@ -0,0 +1,74 @@
+import os
+from typing import Dict, List, Optional
+
+DEFAULT_MODEL = "claude-sonnet-4-20250514"
+DEFAULT_TEMPERATURE = 0.7  # Balanced temperature for creative but consistent solutions
+
+
+def find_core_dir() -> str:
+    """Directory holding common.c: next to this script in an experiment dir, else src/core."""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    if os.path.exists(os.path.join(script_dir, 'common.c')):
+        return script_dir
+    return os.path.join(os.path.dirname(script_dir), 'core')
+
+
+def default_workspace_root() -> str:
+    """Workspace root two levels above this script (the repository root for src/tools)."""
+    return os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..'))
+
+
+class ExperimentConfig:
+    """
+    Per-run settings of one vectorization experiment.
+
+    Runs with different seeds differ only in their config, so several of them can be
+    driven from one source tree (and one process pool) instead of patched copies of
+    vectorizer.py. Results, attempts and logs go under output_root; caches that are
+    meant to be shared between runs (baseline timings, tuned compiler baselines, host
+    roofline, kernel registry) go under shared_dir unless their TSVC_* environment
+    variable points elsewhere.
+    """
+
+    def __init__(self, seed: Optional[int] = None, output_root: Optional[str] = None,
+                 model: str = DEFAULT_MODEL, temperature: float = DEFAULT_TEMPERATURE,
+                 source_dir: Optional[str] = None, shared_dir: Optional[str] = None,
+                 model_cascade: Optional[List[str]] = None):
+        """
+        Args:
+            seed: Seed for Python's random module, recorded with the results (None leaves it unseeded)
+            output_root: Directory for results, attempts, logs and traces (default: workspace root)
+            model: Anthropic model name
+            temperature: Sampling temperature of the LLM
+            source_dir: Directory with tsvc.c, common.c/h, dummy.c and array_defs.h
+            shared_dir: Directory for caches shared between runs (default: output_root)
+            model_cascade: 'model[:attempts]' tiers from cheapest to strongest (None: model for every call)
+        """
+        self.seed = seed
+        self.output_root = os.path.abspath(output_root or default_workspace_root())
+        self.model = model
+        self.temperature = temperature
+        self.source_dir = os.path.abspath(source_dir or find_core_dir())
+        self.shared_dir = os.path.abspath(shared_dir or self.output_root)
+        self.model_cascade = list(model_cascade) if model_cascade else None
+
+    def output_path(self, *parts: str) -> str:
+        return os.path.join(self.output_root, *parts)
+
+    def source_path(self, name: str) -> str:
+        return os.path.join(self.source_dir, name)
+
+    def shared_path(self, name: str, env_var: str) -> str:
+        """Path of a shared cache: $env_var if set, else shared_dir/name."""
+        return os.environ.get(env_var, os.path.join(self.shared_dir, name))
+
+    def to_dict(self) -> Dict:
+        return {
+            'seed': self.seed,
+            'output_root': self.output_root,
+            'model': self.model,
+            'temperature': self.temperature,
+            'source_dir': self.source_dir,
+            'shared_dir': self.shared_dir,
+            'model_cascade': self.model_cascade
+        }
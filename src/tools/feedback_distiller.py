@@ -0,0 +1,129 @@
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+# gcc/ld diagnostic: file:line[:column]: kind: message
+_DIAGNOSTIC = re.compile(r'^(?P<file>[^:\s][^:]*):(?P<line>\d+):(?:(?P<column>\d+):)?\s*'
+                         r'(?P<kind>fatal error|error|warning|note|optimized|missed):\s*(?P<message>.*)$')
+# Source excerpt gcc prints under a diagnostic: "   45 |     code"
+_SOURCE_LINE = re.compile(r'^\s*(?P<line>\d+)\s*\|\s?(?P<code>.*)$')
+_UNDEFINED_REFERENCE = re.compile(r"undefined reference to [`'](?P<symbol>[^`']+)'")
+# Warnings that are usually the root cause of a candidate's errors (a misspelled intrinsic
+# becomes an implicit int function; a wrong pointer type feeds the wrong vector load/store)
+_ROOT_CAUSE_WARNINGS = ('[-Wimplicit-function-declaration]', '[-Wincompatible-pointer-types]')
+_MISMATCH = re.compile(r'^MISMATCH .*$', re.MULTILINE)
+_RESULT_LINE = re.compile(r'\b(?P<name>\w+)_(?P<version>orig|vec)\t\s*(?P<time>[-\d.]+)\t(?P<checksum>\S+)')
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Approximate LLM token count of text (about four characters per token)."""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def distill_compiler_errors(stderr: str, max_errors: int = 6,
+                            kernel_lines: Optional[Tuple[int, int]] = None) -> str:
+    """
+    Compact summary of a failed gcc build for a repair prompt.
+
+    Vectorizer remarks, include chains and most warnings are dropped. Implicit-declaration
+    and incompatible-pointer warnings are kept (with gcc's "did you mean" suggestion) when
+    they point into kernel_lines, the first and last line of the candidate in the compiled
+    file (any line when None). Only the first diagnostic per source location (line and
+    column) is kept, with its source line and the first note explaining it; identical
+    messages at several locations are reported once with the other lines.
+    """
+    clusters: Dict[str, Dict] = {}
+    seen_locations = set()
+    current = None
+    total = 0
+    warnings = 0
+    lines = stderr.splitlines()
+    for index, line in enumerate(lines):
+        match = _DIAGNOSTIC.match(line)
+        if match is None:
+            undefined = _UNDEFINED_REFERENCE.search(line)
+            if undefined:
+                message = f"undefined reference to '{undefined.group('symbol')}'"
+                total += 1
+                clusters.setdefault(message, {'location': 'link', 'source': None, 'note': None, 'others': []})
+            continue
+
+        kind = match.group('kind')
+        line_number = int(match.group('line'))
+        root_cause = (kind == 'warning' and match.group('message').endswith(_ROOT_CAUSE_WARNINGS)
+                      and (kernel_lines is None or kernel_lines[0] <= line_number <= kernel_lines[1]))
+        if kind in ('error', 'fatal error') or root_cause:
+            current = None
+            # A root-cause warning and the error it causes share a column; keep both
+            location = (match.group('file'), match.group('line'), match.group('column'), root_cause)
+            if location in seen_locations:
+                continue
+            seen_locations.add(location)
+            if root_cause:
+                warnings += 1
+            else:
+                total += 1
+            message = f"{kind}: {match.group('message')}"
+            where = f"{os.path.basename(match.group('file'))}:{match.group('line')}"
+            if message in clusters:
+                if match.group('line') not in clusters[message]['others'] + [where.rsplit(':', 1)[1]]:
+                    clusters[message]['others'].append(match.group('line'))
+                continue
+            source = None
+            if index + 1 < len(lines):
+                excerpt = _SOURCE_LINE.match(lines[index + 1])
+                if excerpt and excerpt.group('line') == match.group('line'):
+                    source = excerpt.group('code').strip()
+            current = clusters[message] = {'location': where, 'source': source, 'note': None, 'others': []}
+        elif kind == 'note' and current is not None and current['note'] is None:
+            current['note'] = match.group('message')
+        elif kind != 'note':
+            current = None
+
+    if not clusters:
+        # Nothing recognizable (e.g. a driver failure): keep the tail of the raw output
+        return '\n'.join(lines[-20:])
+
+    parts = [f"Compilation failed with {total} error{'s' if total != 1 else ''}"
+             f"{f' and {warnings} related warning' + ('s' if warnings != 1 else '') if warnings else ''}"
+             f"{f' ({len(clusters)} distinct)' if len(clusters) != total + warnings else ''}:"]
+    shown_sources = set()
+    for message, cluster in list(clusters.items())[:max_errors]:
+        parts.append(f"{cluster['location']}: {message}")
+        if cluster['source'] and cluster['location'] not in shown_sources:
+            shown_sources.add(cluster['location'])
+            parts.append(f"    {cluster['source']}")
+        if cluster['note']:
+            parts.append(f"    note: {cluster['note']}")
+        if cluster['others']:
+            parts.append(f"    (same error at lines {', '.join(cluster['others'])})")
+    if len(clusters) > max_errors:
+        parts.append(f"... {len(clusters) - max_errors} more distinct diagnostics omitted")
+    return '\n'.join(parts)
+
+
+def summarize_mismatch(test_output: Optional[str], element_diff: Optional[str] = None) -> str:
+    """
+    Compact summary of a correctness failure: the returned checksums and, when the
+    element-wise diagnostic run is available, the first differing element of every array.
+    """
+    parts = []
+    results = {match.group('version'): match.group('checksum') for match in _RESULT_LINE.finditer(test_output or '')}
+    if 'orig' in results and 'vec' in results:
+        parts.append(f"Returned checksum: expected {results['orig']}, got {results['vec']}")
+    mismatches: List[str] = _MISMATCH.findall(element_diff or '')
+    if mismatches:
+        parts.append("First differing element per array after both versions ran:")
+        parts.extend(f"  {line[len('MISMATCH '):]}" for line in mismatches)
+    if not parts:
+        return test_output or ''
+    return '\n'.join(parts)
+
+
+def distill_feedback(feedback: Dict) -> Optional[str]:
+    """Compact repair feedback for compilation and correctness failures, None for other error types."""
+    if feedback.get('error_type') == 'compilation' and feedback.get('error_message'):
+        return distill_compiler_errors(feedback['error_message'], kernel_lines=feedback.get('kernel_lines'))
+    if feedback.get('error_type') == 'correctness':
+        return summarize_mismatch(feedback.get('test_output'), feedback.get('element_diff'))
+    return None
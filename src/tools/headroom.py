@@ -0,0 +1,129 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+from baseline_cache import FileLock, function_hash, get_compiler_version, get_cpu_model, load_json, save_json
+from compiler_baselines import build_harness, calibrated_defines, reference_harness, time_original
+
+# Flags that keep the experiment's -O3 build but switch off gcc's loop and SLP vectorizers
+SCALAR_FLAGS = ['-fno-tree-vectorize', '-fno-tree-slp-vectorize']
+
+# gcc remarks about the original's loops, parsed with the experiment's vectorization-info parser
+REMARK_FLAGS = ['-fopt-info-vec-optimized', '-fopt-info-vec-missed']
+
+
+class HeadroomProbe:
+    """
+    How much SIMD headroom gcc leaves in a kernel, measured on the original code.
+
+    The original is built twice at the experiment's flags, once as is and once with the
+    vectorizers disabled, and both builds are timed at the same calibrated repeat count.
+    Their ratio is the speedup gcc's auto-vectorization already achieves; together with
+    gcc's optimized/missed remarks for the original's loops it predicts how much an LLM
+    kernel could still gain. Probes are cached per kernel, compiler, flags and CPU.
+    """
+
+    def __init__(self, experiment, cache_dir: str, repetitions: int = 3, timeout: int = 120):
+        """
+        Args:
+            experiment: TSVCVectorizerExperiment providing harness generation and runs
+            cache_dir: Directory for the probe JSON file and builds
+            repetitions: Timing runs per build (the median is used)
+            timeout: Per-run harness timeout in seconds
+        """
+        self.experiment = experiment
+        self.cache_path = os.path.join(cache_dir, 'headroom_probes.json')
+        self.build_dir = os.path.join(cache_dir, 'headroom_builds')
+        self.repetitions = repetitions
+        self.timeout = timeout
+
+    def make_key(self, func_name: str) -> str:
+        functions = self.experiment.test_functions or self.experiment.extract_tsvc_functions([func_name])
+        return json.dumps({
+            'function': function_hash(functions[func_name]['code']),
+            'compiler': get_compiler_version(self.experiment.compiler),
+            'cpu_model': get_cpu_model(),
+            'flags': self.experiment.compile_flags,
+            'timing': self.experiment.get_timing_config()
+        }, sort_keys=True)
+
+    def probe(self, func_name: str) -> Optional[Dict]:
+        """Return the headroom probe of func_name at the current ISA, measuring (and caching) it on first use."""
+        key = self.make_key(func_name)
+        with FileLock(self.cache_path + '.lock'):
+            cached = load_json(self.cache_path).get(key)
+        if cached:
+            return cached
+
+        measured = self.measure(func_name)
+        if measured is None:
+            return None
+        with FileLock(self.cache_path + '.lock'):
+            cache = load_json(self.cache_path)
+            cache[key] = measured
+            save_json(self.cache_path, cache)
+        return measured
+
+    def measure(self, func_name: str) -> Optional[Dict]:
+        work_dir = os.path.join(self.build_dir, f"{func_name}_{self.experiment.isa.name}")
+        os.makedirs(work_dir, exist_ok=True)
+        harness_path = os.path.join(work_dir, f"reference_{func_name}.c")
+        with open(harness_path, 'w') as f:
+            f.write(reference_harness(self.experiment, func_name))
+
+        base_flags = list(self.experiment.compile_flags)
+        vector_exe = os.path.join(work_dir, 'vectorized')
+        build = build_harness(self.experiment, harness_path, vector_exe, base_flags + REMARK_FLAGS,
+                              self.experiment.get_harness_defines())
+        if build.returncode != 0:
+            return None
+        remarks = self.experiment.parse_vectorization_info(build.stderr, func_name, harness_path)
+        defines = calibrated_defines(self.experiment, vector_exe, self.timeout)
+        if defines is None:
+            return None
+        if build_harness(self.experiment, harness_path, vector_exe, base_flags, defines).returncode != 0:
+            return None
+        vectorized = time_original(self.experiment, vector_exe, self.repetitions, self.timeout)
+
+        scalar_exe = os.path.join(work_dir, 'scalar')
+        if build_harness(self.experiment, harness_path, scalar_exe, base_flags + SCALAR_FLAGS, defines).returncode != 0:
+            return None
+        scalar = time_original(self.experiment, scalar_exe, self.repetitions, self.timeout)
+        if vectorized is None or scalar is None or vectorized['time'] <= 0:
+            return None
+
+        return {
+            'scalar_time': scalar['time'],
+            'vectorized_time': vectorized['time'],
+            'compiler_speedup': scalar['time'] / vectorized['time'],
+            'compiler_vectorized': remarks['original_vectorized'],
+            'missed_remarks': len(remarks['original_missed_reasons']),
+            'lanes': self.experiment.isa.lanes
+        }
+
+
+def predicted_speedup(probe: Optional[Dict], lanes: int) -> float:
+    """
+    Speedup over gcc's build an LLM kernel could plausibly reach.
+
+    The vector width not yet used by gcc (lanes / gcc's own scalar-to-vector speedup),
+    halved when gcc reports the loop vectorized without any missed remark, since the
+    rest of the gap is then usually memory bound. Without a probe, half the lanes.
+    """
+    if not probe:
+        return max(1.0, lanes / 2.0)
+    gap = max(1.0, lanes / max(probe['compiler_speedup'], 1e-9))
+    if probe['compiler_vectorized'] and not probe['missed_remarks']:
+        gap = 1.0 + (gap - 1.0) / 2.0
+    return gap
+
+
+def probe_functions(experiment, probe: HeadroomProbe, functions: List[str]) -> Dict[str, Optional[Dict]]:
+    """Probe every function at the experiment's current ISA; failures map to None."""
+    probes = {}
+    for func_name in functions:
+        probes[func_name] = probe.probe(func_name)
+        if probes[func_name]:
+            print(f"  {func_name}: gcc vectorization {probes[func_name]['compiler_speedup']:.2f}x over scalar, "
+                  f"predicted headroom {predicted_speedup(probes[func_name], experiment.isa.lanes):.2f}x")
+    return probes
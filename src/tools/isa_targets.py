@@ -0,0 +1,259 @@
+import copy
+import os
+import subprocess
+import tempfile
+from typing import Dict, List, Optional, Set, Tuple
+
+# /proc/cpuinfo flag -> feature name understood by __builtin_cpu_supports and target_clones
+CPUID_FEATURES = {'sse4_2': 'sse4.2', 'avx2': 'avx2', 'fma': 'fma', 'avx512f': 'avx512f'}
+
+
+class Precision:
+    """
+    Element type used for real_t throughout the harness, common.c and the prompts.
+
+    Tolerances mirror TSVC_CHECKSUM_ATOL/RTOL in common.h so Python-side checksum
+    comparisons agree with the harness verdict.
+    """
+
+    def __init__(self, name: str, c_type: str, element_bytes: int, suffix: str,
+                 compile_flags: List[str], atol: float, rtol: float):
+        """
+        Args:
+            name: Registry key, 'float' or 'double'
+            c_type: C type real_t is defined as
+            element_bytes: sizeof(real_t)
+            suffix: Intrinsic suffix for packed operations ('ps' or 'pd')
+            compile_flags: Defines selecting this precision in common.h
+            atol: Absolute checksum tolerance
+            rtol: Checksum tolerance relative to the reference checksum
+        """
+        self.name = name
+        self.c_type = c_type
+        self.element_bytes = element_bytes
+        self.suffix = suffix
+        self.compile_flags = compile_flags
+        self.atol = atol
+        self.rtol = rtol
+
+    def checksum_ok(self, reference: float, value: float) -> bool:
+        return abs(reference - value) < self.atol + self.rtol * abs(reference)
+
+
+PRECISIONS: Dict[str, Precision] = {
+    'float': Precision('float', 'float', 4, 'ps', [], atol=1e-5, rtol=0.0),
+    'double': Precision('double', 'double', 8, 'pd', ['-DTSVC_DOUBLE'], atol=1e-9, rtol=1e-12),
+}
+
+DEFAULT_PRECISION = 'float'
+
+
+class IsaTarget:
+    """
+    One SIMD target the vectorizer can ask the LLM for.
+
+    Bundles everything that used to be hardwired to AVX2: the gcc flags, the CPU
+    features the host needs to run the result, how the prompt describes the vector
+    registers, and which tokens count as (or are forbidden for) vectorized code.
+    """
+
+    def __init__(self, name: str, display_name: str, cpu_flags: List[str], compile_flags: List[str],
+                 vector_bits: int, vector_type: str, intrinsic_prefix: str, indicators: List[str],
+                 forbidden: List[str], example_intrinsics: List[str], header_hint: str):
+        """
+        Args:
+            name: Registry key, e.g. 'avx2'
+            display_name: Name used in prompts, e.g. 'AVX2'
+            cpu_flags: /proc/cpuinfo flags the host must report to run this target
+            compile_flags: gcc flags enabling the instruction set
+            vector_bits: Register width in bits
+            vector_type: Float vector type the LLM should use
+            intrinsic_prefix: Prefix of the target's intrinsics ('' for vector extensions)
+            indicators: Tokens whose presence means the code is vectorized for this target
+            forbidden: Tokens that mean the code targets a different instruction set
+            example_intrinsics: A few intrinsics quoted in prompts and hints
+            header_hint: What the code must include or declare
+
+        Targets are registered for float; with_precision() derives the double variant.
+        """
+        self.name = name
+        self.display_name = display_name
+        self.cpu_flags = cpu_flags
+        self.compile_flags = compile_flags
+        self.vector_bits = vector_bits
+        self.vector_type = vector_type
+        self.intrinsic_prefix = intrinsic_prefix
+        self.indicators = indicators
+        self.forbidden = forbidden
+        self.example_intrinsics = example_intrinsics
+        self.header_hint = header_hint
+        self.precision = PRECISIONS['float']
+
+    @property
+    def lanes(self) -> int:
+        """real_t elements per vector register."""
+        return self.vector_bits // (8 * self.precision.element_bytes)
+
+    def with_precision(self, precision: Precision) -> 'IsaTarget':
+        """
+        Copy of this target describing real_t as the given precision.
+
+        Intrinsic targets switch to the d-suffixed register types (__m256 -> __m256d)
+        and _pd intrinsics; the generic target declares a double vector typedef.
+        """
+        if precision.name == self.precision.name:
+            return self
+        target = copy.copy(self)
+        target.precision = precision
+        old_suffix, new_suffix = self.precision.suffix, precision.suffix
+        if self.uses_intrinsics:
+            target.vector_type = self.vector_type.rstrip('d') + ('d' if precision.name == 'double' else '')
+        else:
+            target.vector_type = f"v{target.lanes}{new_suffix[-1]}f"
+            target.header_hint = self.header_hint.replace(
+                f"typedef {self.precision.c_type} {self.vector_type}", f"typedef {precision.c_type} {target.vector_type}")
+        target.indicators = [token[:-2] + new_suffix if token.startswith('v') and token.endswith(old_suffix)
+                             else token for token in self.indicators]
+        target.example_intrinsics = [example.replace(f"_{old_suffix}", f"_{new_suffix}")
+                                     .replace(self.vector_type, target.vector_type)
+                                     for example in self.example_intrinsics]
+        return target
+
+    @property
+    def c_name(self) -> str:
+        """Name usable inside C identifiers, e.g. 'sse4_2'."""
+        return self.name.replace('.', '_')
+
+    @property
+    def cpu_features(self) -> List[str]:
+        """Required features as spelled for __builtin_cpu_supports."""
+        return [CPUID_FEATURES[flag] for flag in self.cpu_flags]
+
+    @property
+    def uses_intrinsics(self) -> bool:
+        return bool(self.intrinsic_prefix)
+
+    def is_supported(self, host_flags: Set[str]) -> bool:
+        return all(flag in host_flags for flag in self.cpu_flags)
+
+    @property
+    def api_name(self) -> str:
+        """e.g. 'AVX2 intrinsics' or 'GCC vector extensions'."""
+        return f"{self.display_name} intrinsics" if self.uses_intrinsics else "GCC vector extensions"
+
+    def describe_api(self) -> str:
+        """Short phrase for prompts, e.g. 'AVX2 intrinsics (_mm256_* functions)'."""
+        if self.uses_intrinsics:
+            return f"{self.api_name} ({self.intrinsic_prefix}* functions)"
+        return f"{self.api_name} ({self.vector_type})"
+
+    def lint(self, code: str) -> Tuple[bool, str]:
+        """
+        Check that code is vectorized for this target.
+
+        Returns:
+            (is_vectorized, message)
+        """
+        used_forbidden = [token for token in self.forbidden if token in code]
+        if used_forbidden:
+            return False, (f"The code uses {', '.join(used_forbidden)}, which is not available for the "
+                           f"{self.display_name} target. Use {self.describe_api()} only.")
+        # Single-precision intrinsics on double arrays compile (with a pointer warning) but compute garbage
+        if self.uses_intrinsics and self.precision.name == 'double' and '_ps(' in code:
+            return False, (f"The code uses _ps intrinsics, but real_t is double. Use {self.vector_type} "
+                           f"and _pd intrinsics ({self.lanes} doubles per vector).")
+        if any(indicator in code for indicator in self.indicators):
+            return True, f"Found {self.display_name} vector code"
+        examples = ', '.join(self.example_intrinsics)
+        return False, (f"No {self.display_name} vector code found. The code needs to use {self.describe_api()} "
+                       f"like {examples}. Remember: real_t is {self.precision.c_type}, so use "
+                       f"{self.lanes}-lane {self.precision.c_type} vectors.")
+
+
+ISA_TARGETS: Dict[str, IsaTarget] = {
+    'sse4.2': IsaTarget(
+        name='sse4.2', display_name='SSE4.2', cpu_flags=['sse4_2'], compile_flags=['-msse4.2'],
+        vector_bits=128, vector_type='__m128', intrinsic_prefix='_mm_',
+        indicators=['_mm_', '__m128'],
+        forbidden=['_mm256_', '__m256', '_mm512_', '__m512'],
+        example_intrinsics=['_mm_load_ps', '_mm_add_ps', '_mm_mul_ps'],
+        header_hint='#include <immintrin.h> (SSE4.2 and older only; no AVX)'),
+    'avx2': IsaTarget(
+        name='avx2', display_name='AVX2', cpu_flags=['avx2', 'fma'], compile_flags=['-mavx2', '-mfma'],
+        vector_bits=256, vector_type='__m256', intrinsic_prefix='_mm256_',
+        indicators=['_mm256_', '__m256', '_mm_', '__m128', 'vmovups', 'vaddps'],
+        forbidden=['_mm512_', '__m512'],
+        example_intrinsics=['_mm256_load_ps', '_mm256_add_ps', '_mm256_fmadd_ps'],
+        header_hint='#include <immintrin.h> for AVX2'),
+    'avx512f': IsaTarget(
+        name='avx512f', display_name='AVX-512F', cpu_flags=['avx512f'],
+        compile_flags=['-mavx512f', '-mavx2', '-mfma'],
+        vector_bits=512, vector_type='__m512', intrinsic_prefix='_mm512_',
+        indicators=['_mm512_', '__m512'],
+        forbidden=[],
+        example_intrinsics=['_mm512_load_ps', '_mm512_add_ps', '_mm512_mask_storeu_ps'],
+        header_hint='#include <immintrin.h> for AVX-512F (masked loads/stores handle remainders)'),
+    'generic': IsaTarget(
+        name='generic', display_name='generic vector', cpu_flags=[], compile_flags=[],
+        vector_bits=128, vector_type='v4sf',
+        intrinsic_prefix='',
+        indicators=['vector_size'],
+        forbidden=['_mm_', '_mm256_', '_mm512_', '__m128', '__m256', '__m512'],
+        example_intrinsics=['v4sf arithmetic (+, *, ...)', '__builtin_shuffle', 'memcpy for unaligned loads'],
+        header_hint='no intrinsics header; declare `typedef float v4sf __attribute__((vector_size(16)));` before the function'),
+}
+
+DEFAULT_ISA = 'avx2'
+
+
+def read_cpuinfo_flags(path: str = '/proc/cpuinfo') -> Optional[Set[str]]:
+    """CPU feature flags of the first processor listed in /proc/cpuinfo."""
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                if line.startswith('flags'):
+                    return set(line.split(':', 1)[1].split())
+    except OSError:
+        pass
+    return None
+
+
+def probe_cpuid_flags(compiler: str = 'gcc') -> Set[str]:
+    """Ask cpuid through __builtin_cpu_supports when /proc/cpuinfo is unavailable."""
+    checks = '\n'.join(f'    if (__builtin_cpu_supports("{builtin}")) puts("{flag}");'
+                       for flag, builtin in CPUID_FEATURES.items())
+    source = f"#include <stdio.h>\nint main(void) {{\n    __builtin_cpu_init();\n{checks}\n    return 0;\n}}\n"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source_path = os.path.join(tmp_dir, 'cpuid_probe.c')
+        exe = os.path.join(tmp_dir, 'cpuid_probe')
+        with open(source_path, 'w') as f:
+            f.write(source)
+        try:
+            if subprocess.run([compiler, '-o', exe, source_path], capture_output=True).returncode != 0:
+                return set()
+            return set(subprocess.run([exe], capture_output=True, text=True).stdout.split())
+        except OSError:
+            return set()
+
+
+def detect_host_flags(compiler: str = 'gcc') -> Set[str]:
+    flags = read_cpuinfo_flags()
+    return flags if flags is not None else probe_cpuid_flags(compiler)
+
+
+def supported_isas(host_flags: Set[str] = None) -> List[str]:
+    """Names of the registered targets this host can run."""
+    host_flags = detect_host_flags() if host_flags is None else host_flags
+    return [name for name, target in ISA_TARGETS.items() if target.is_supported(host_flags)]
+
+
+def get_precision(name: str) -> Precision:
+    if name not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{name}' (known: {', '.join(PRECISIONS)})")
+    return PRECISIONS[name]
+
+
+def get_isa_target(name: str) -> IsaTarget:
+    if name not in ISA_TARGETS:
+        raise ValueError(f"Unknown target ISA '{name}' (known: {', '.join(ISA_TARGETS)})")
+    return ISA_TARGETS[name]
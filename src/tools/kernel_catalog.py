@@ -0,0 +1,258 @@
+import ast
+import operator
+import re
+from typing import Dict, List, Optional
+
+# Arrays declared in array_defs.h, split by dimensionality
+ONE_D_ARRAYS = ['a', 'b', 'c', 'd', 'e', 'x']
+TWO_D_ARRAYS = ['aa', 'bb', 'cc', 'tt']
+
+# Every array whose elements count as memory traffic (indx and ip hold 4-byte ints)
+TRAFFIC_ARRAYS = ONE_D_ARRAYS + TWO_D_ARRAYS + ['flat_2d_array', 'xx', 'yy', 'indx', 'ip']
+
+# Timing scaffolding that is not part of the measured loop body
+_SCAFFOLDING = re.compile(
+    r'^.*\b(initialise_arrays|gettimeofday|dummy|calc_checksum)\s*\(.*$', re.MULTILINE)
+# First assignment operator, including compound ones, but not ==, <=, >= or !=
+_ASSIGNMENT = re.compile(r'(?<![=!<>+\-*/])([+\-*/]?)=(?!=)')
+# Lines that do no work: lone braces, scalar declarations and the return statement
+_NON_STATEMENT = re.compile(r'^\s*([{}]|(real_t|int)\s+\w+\s*;|return\b)')
+_ARRAY_REF = re.compile(r'\b(' + '|'.join(TRAFFIC_ARRAYS) + r')\s*\[')
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.floordiv,  # C integer division on non-negative loop bounds
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+
+
+def eval_c_int_expression(expression: str, names: Dict[str, int]) -> Optional[int]:
+    """
+    Evaluate a simple C integer expression such as `200*(iterations/(LEN_2D))`.
+
+    Args:
+        expression: C expression using + - * / % and parentheses
+        names: Values for the identifiers that may appear (iterations, LEN_1D, ...)
+
+    Returns:
+        The integer value, or None if the expression uses anything else
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+    except SyntaxError:
+        return None
+
+    def _eval(node):
+        if isinstance(node, ast.Expression):
+            return _eval(node.body)
+        if isinstance(node, ast.Constant) and isinstance(node.value, int):
+            return node.value
+        if isinstance(node, ast.Name) and node.id in names:
+            return int(names[node.id])
+        if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+            return _BIN_OPS[type(node.op)](_eval(node.left), _eval(node.right))
+        raise ValueError(f"unsupported expression node: {ast.dump(node)}")
+
+    try:
+        return _eval(tree)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+class KernelCatalog:
+    """
+    Static view of the kernels in tsvc.c.
+
+    Provides the per-kernel facts the benchmarking tools need without running anything:
+    the TSVC section each kernel belongs to, its source lines in tsvc.c, the outer `nl`
+    repetition count, the arrays it touches and an estimate of the elements processed
+    per repetition.
+    """
+
+    def __init__(self, tsvc_content: str):
+        self.tsvc_content = tsvc_content
+        self.kernels = self._parse(tsvc_content)
+
+    @classmethod
+    def from_file(cls, tsvc_path: str) -> 'KernelCatalog':
+        with open(tsvc_path, 'r') as f:
+            return cls(f.read())
+
+    def _parse(self, content: str) -> Dict[str, Dict]:
+        kernels = {}
+        func_pattern = re.compile(
+            r'real_t (s\d+[a-z]*?)\(struct args_t \* func_args\)\s*\{(.*?)\n\}', re.DOTALL)
+        section = None
+        position = 0
+        for match in func_pattern.finditer(content):
+            # Section markers such as `// %2.1` precede each group of kernels
+            sections = re.findall(r'//\s*%(\d+\.\d+)', content[position:match.start()])
+            if sections:
+                section = sections[-1]
+            position = match.end()
+
+            body = re.sub(r'//.*?$', '', match.group(2), flags=re.MULTILINE)
+            nl_match = re.search(r'for\s*\(\s*int\s+nl\s*=\s*0\s*;\s*nl\s*<\s*([^;]+);', body)
+            kernels[match.group(1)] = {
+                'section': section,
+                'lines': (content.count('\n', 0, match.start()) + 1, content.count('\n', 0, match.end()) + 1),
+                'body': body,
+                'outer_expression': nl_match.group(1).strip() if nl_match else None,
+                'arrays_1d': [arr for arr in ONE_D_ARRAYS if re.search(rf'\b{arr}\[', body)],
+                'arrays_2d': [arr for arr in TWO_D_ARRAYS if re.search(rf'\b{arr}\[', body)],
+                'uses_flat_2d': 'flat_2d_array' in body,
+            }
+        return kernels
+
+    def __contains__(self, func_name: str) -> bool:
+        return func_name in self.kernels
+
+    def get(self, func_name: str) -> Optional[Dict]:
+        return self.kernels.get(func_name)
+
+    def is_2d(self, func_name: str) -> bool:
+        """Whether the kernel's working set is dominated by LEN_2D x LEN_2D arrays."""
+        kernel = self.kernels[func_name]
+        return bool(kernel['arrays_2d']) or kernel['uses_flat_2d']
+
+    def outer_loop_count(self, func_name: str, iterations: int, len_1d: int,
+                         len_2d: int) -> Optional[int]:
+        """Number of timed `nl` repetitions for the given build constants."""
+        expression = self.kernels[func_name]['outer_expression']
+        if expression is None:
+            return None
+        return eval_c_int_expression(
+            expression, {'iterations': iterations, 'LEN_1D': len_1d, 'LEN_2D': len_2d})
+
+    def working_set_bytes(self, func_name: str, len_1d: int, len_2d: int,
+                          element_size: int = 4) -> int:
+        """Bytes of array data the kernel touches per `nl` repetition."""
+        counts = self.working_set_arrays(func_name)
+        return (counts['1d'] * len_1d + counts['2d'] * len_2d * len_2d) * element_size
+
+    def estimate_traffic(self, func_name: str, element_size: int = 4) -> Dict:
+        """
+        Static bytes-moved and flops per inner-loop element, STREAM style.
+
+        Each array read contributes one element of traffic and each array written one
+        more, regardless of how many offsets of it the loop uses (neighbouring offsets
+        share cache lines). Flops are the + - * / operators on the right-hand side of
+        statements that touch an array, plus one per compound assignment.
+
+        Returns:
+            Dict with 'bytes_per_element', 'flops_per_element', 'reads' and 'writes'
+        """
+        kernel = self.kernels[func_name]
+        if 'traffic' not in kernel:
+            kernel['traffic'] = self._estimate_traffic(kernel['body'])
+        reads, writes, flops = kernel['traffic']
+        return {
+            'bytes_per_element': (len(reads) + len(writes)) * element_size,
+            'flops_per_element': flops,
+            'reads': sorted(reads),
+            'writes': sorted(writes),
+        }
+
+    def _estimate_traffic(self, body: str):
+        body = _SCAFFOLDING.sub('', body)
+        reads, writes = set(), set()
+        flops = 0
+
+        # Loop headers carry no traffic; branch conditions only read
+        statements = []
+        position = 0
+        for match in re.finditer(r'\b(for|if|while|switch)\s*\(', body):
+            if match.start() < position:
+                continue
+            close = _matching_paren(body, match.end() - 1)
+            statements.append(body[position:match.start()])
+            if match.group(1) != 'for':
+                reads.update(_array_names(body[match.end():close]))
+            position = close + 1
+        statements.append(body[position:])
+
+        for statement in re.split(r'[;{}]', ''.join(statements)):
+            assignment = _ASSIGNMENT.search(statement)
+            if not assignment:
+                continue
+            lhs, rhs = statement[:assignment.start()], statement[assignment.end():]
+            written = _array_names(lhs)
+            read = _array_names(rhs)
+            # Subscripts on the left-hand side (e.g. a[ip[i]]) are reads
+            for name, subscript in _array_refs(lhs):
+                read |= _array_names(subscript)
+            if assignment.group(1):
+                read |= written
+            writes |= written
+            reads |= read
+            if written or read:
+                flops += len(re.findall(r'[+\-*/]', _strip_subscripts(rhs)))
+                flops += 1 if assignment.group(1) else 0
+        return reads, writes, flops
+
+    def loop_body(self, func_name: str) -> str:
+        """The kernel body (comments removed) without its timing scaffolding calls."""
+        return _SCAFFOLDING.sub('', self.kernels[func_name]['body'])
+
+    def loop_statements(self, func_name: str) -> int:
+        """Source lines of the kernel's work: the body without timing scaffolding, declarations, braces and the nl loop."""
+        body = self.loop_body(func_name)
+        return sum(1 for line in body.split('\n')
+                   if line.strip() and not _NON_STATEMENT.match(line) and not re.search(r'\bnl\b', line))
+
+    def elements_per_pass(self, func_name: str, len_1d: int, len_2d: int) -> int:
+        """Approximate number of loop elements processed per `nl` repetition."""
+        return len_2d * len_2d if self.is_2d(func_name) else len_1d
+
+    def working_set_arrays(self, func_name: str) -> Dict[str, int]:
+        """Count of 1D and 2D arrays touched (flat_2d_array counts as a 2D array)."""
+        kernel = self.kernels[func_name]
+        return {
+            '1d': len(kernel['arrays_1d']),
+            '2d': len(kernel['arrays_2d']) + (1 if kernel['uses_flat_2d'] else 0)
+        }
+
+
+def _matching_paren(text: str, open_index: int) -> int:
+    depth = 0
+    for index in range(open_index, len(text)):
+        if text[index] in '([':
+            depth += 1
+        elif text[index] in ')]':
+            depth -= 1
+            if depth == 0:
+                return index
+    return len(text) - 1
+
+
+def _array_refs(text: str) -> List:
+    """(array name, outermost subscript text) for every array reference in text."""
+    refs = []
+    for match in _ARRAY_REF.finditer(text):
+        close = _matching_paren(text, match.end() - 1)
+        refs.append((match.group(1), text[match.end():close]))
+    return refs
+
+
+def _array_names(text: str) -> set:
+    return {match.group(1) for match in _ARRAY_REF.finditer(text)}
+
+
+def _strip_subscripts(text: str) -> str:
+    """Drop subscript contents and casts so only value arithmetic remains."""
+    result = []
+    depth = 0
+    for char in text:
+        if char == '[':
+            depth += 1
+        elif char == ']':
+            depth -= 1
+        elif depth == 0:
+            result.append(char)
+    stripped = ''.join(result)
+    stripped = re.sub(r'\(\s*(real_t|int|float|double)\s*\)', '', stripped)
+    # Exponent signs in literals such as 1e-5 are not operations
+    return re.sub(r'(\d\.?\d*[eE])[+\-]', r'\1', stripped)
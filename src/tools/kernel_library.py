@@ -0,0 +1,432 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+from typing import Dict, List, Optional
+
+from isa_targets import ISA_TARGETS, get_isa_target
+
+# Files from the TSVC core the library links against (initialisation, checksums, dummy())
+CORE_FILES = ['common.c', 'common.h', 'array_defs.h', 'dummy.c']
+
+HEADER_TEMPLATE = '''/*
+ * Generated by kernel_library.py - do not edit.
+ * TSVC kernels with the best verified LLM variant per instruction set, selected at load time.
+ */
+#ifndef TSVC_KERNELS_HDR
+#define TSVC_KERNELS_HDR
+
+#include "common.h"
+
+typedef real_t (*tsvc_kernel_fn)(struct args_t *);
+
+struct tsvc_kernel {
+    const char * name;
+    tsvc_kernel_fn original;    /* tsvc.c code, target_clones-dispatched auto-vectorization */
+    tsvc_kernel_fn selected;    /* best variant this CPU supports, chosen by the constructor */
+    const char * selected_isa;  /* "original" when no LLM variant is usable */
+    double recorded_speedup;    /* speedup of the selected variant when it was verified */
+    void * arg_info;
+};
+
+extern struct tsvc_kernel tsvc_kernels[];
+extern const int tsvc_kernel_count;
+
+/* Dispatched entry points */
+%(prototypes)s
+
+#endif
+'''
+
+BENCH_SOURCE = r'''/*
+ * Generated by kernel_library.py - do not edit.
+ * Runs every library kernel as original and dispatched variant and compares checksums.
+ * Usage: tsvc_bench [kernel ...]; TSVC_KERNEL_ISA=<isa|original> forces the variant.
+ * Exits non-zero when any selected variant disagrees with the original.
+ */
+#define _POSIX_C_SOURCE 200112L
+#include <fcntl.h>
+#include <math.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+
+#include "tsvc_kernels.h"
+
+static double elapsed(const struct args_t * args)
+{
+    return (args->t2.tv_sec - args->t1.tv_sec) + (args->t2.tv_usec - args->t1.tv_usec) / 1000000.0;
+}
+
+// initialise_arrays() prints the kernel name; keep it out of the result table
+static real_t run_quietly(tsvc_kernel_fn kernel, struct args_t * args)
+{
+    fflush(stdout);
+    int saved_stdout = dup(STDOUT_FILENO);
+    int devnull = open("/dev/null", O_WRONLY);
+    if (devnull >= 0) {
+        dup2(devnull, STDOUT_FILENO);
+        close(devnull);
+    }
+    real_t checksum = kernel(args);
+    fflush(stdout);
+    if (saved_stdout >= 0) {
+        dup2(saved_stdout, STDOUT_FILENO);
+        close(saved_stdout);
+    }
+    return checksum;
+}
+
+static int wanted(const char * name, int argc, char ** argv)
+{
+    if (argc < 2) return 1;
+    for (int i = 1; i < argc; i++)
+        if (strcmp(argv[i], name) == 0) return 1;
+    return 0;
+}
+
+int main(int argc, char ** argv)
+{
+    int * ip;
+    real_t s1, s2;
+    init(&ip, &s1, &s2);
+
+    int failures = 0;
+    printf("%-8s %-10s %12s %12s %9s %9s %13s  %s\n", "Kernel", "Variant", "Orig(sec)", "Variant(sec)",
+           "Speedup", "Recorded", "Checksum diff", "Status");
+    for (int k = 0; k < tsvc_kernel_count; k++) {
+        const struct tsvc_kernel * kernel = &tsvc_kernels[k];
+        if (!wanted(kernel->name, argc, argv)) continue;
+
+        struct args_t orig_args = {0}, variant_args = {0};
+        orig_args.arg_info = kernel->arg_info;
+        variant_args.arg_info = kernel->arg_info;
+        real_t orig_checksum = run_quietly(kernel->original, &orig_args);
+        real_t variant_checksum = run_quietly(kernel->selected, &variant_args);
+
+        double orig_time = elapsed(&orig_args), variant_time = elapsed(&variant_args);
+        double diff = fabs((double)orig_checksum - (double)variant_checksum);
+        int pass = TSVC_CHECKSUM_OK(orig_checksum, variant_checksum);
+        failures += !pass;
+        printf("%-8s %-10s %12.6f %12.6f %8.2fx %8.2fx %13e  %s\n", kernel->name, kernel->selected_isa,
+               orig_time, variant_time, variant_time > 0.0 ? orig_time / variant_time : 0.0,
+               kernel->recorded_speedup, diff, pass ? "PASS" : "FAIL");
+    }
+    printf("%d checksum mismatches\n", failures);
+    return failures ? EXIT_FAILURE : EXIT_SUCCESS;
+}
+'''
+
+VARIANT_TEMPLATE = '''/*
+ * Generated by kernel_library.py - do not edit.
+ * %(func)s for %(display)s: best verified LLM kernel (%(speedup).2fx over the gcc baseline, from %(source)s)
+ */
+#include "common.h"
+#include "array_defs.h"
+#include <immintrin.h>
+#include <math.h>
+#include <stdio.h>
+#include <stdlib.h>
+%(additional)s
+%(code)s
+'''
+
+
+class KernelLibraryExporter:
+    """
+    Collect verified LLM kernels into a multi-versioned C library.
+
+    For every function the best verified variant per target ISA (highest speedup,
+    correctness passed) is written to its own translation unit compiled with that
+    ISA's flags. The generated tsvc_kernels.c holds the original tsvc.c kernels,
+    built with target_clones so the fallback gets the same auto-vectorization as
+    the experiment baseline, and a constructor that checks the CPU with
+    __builtin_cpu_supports and points each entry at the fastest variant it can run.
+    A benchmark driver and Makefile make the library a regression test.
+    """
+
+    def __init__(self, experiment, min_speedup: float = 1.0):
+        """
+        Args:
+            experiment: TSVCVectorizerExperiment providing code cleanup, flags and kernel arguments
+            min_speedup: Variants must have beaten the baseline by this factor to be exported
+        """
+        self.experiment = experiment
+        self.min_speedup = min_speedup
+
+    def collect(self, results: List[Dict], source: str = 'experiment') -> Dict[str, Dict[str, Dict]]:
+        """
+        Pick the best verified variant per function and ISA.
+
+        Args:
+            results: Per-function result dicts as produced by run_vectorization_fsm
+            source: Label recorded with every winner (e.g. the results file)
+
+        Returns:
+            {function: {isa: {'code', 'speedup', 'iteration', 'source'}}}
+        """
+        winners = {}
+        for result in results:
+            # The library is built for one real_t; kernels verified at another precision do not fit
+            if not result.get('success') or result.get('precision', 'float') != self.experiment.precision.name:
+                continue
+            isa = result.get('isa', 'avx2')
+            for attempt in result.get('attempts', []):
+                speedup = (attempt.get('performance_data') or {}).get('speedup')
+                if not attempt.get('success') or speedup is None or speedup < self.min_speedup:
+                    continue
+                best = winners.setdefault(result['function'], {}).get(isa)
+                if best is None or speedup > best['speedup']:
+                    winners[result['function']][isa] = {
+                        'code': attempt['vectorized_code'],
+                        'speedup': speedup,
+                        'iteration': attempt.get('iteration'),
+                        'source': source
+                    }
+        return winners
+
+    def export(self, winners: Dict[str, Dict[str, Dict]], output_dir: str) -> Dict:
+        """Write the library sources, benchmark driver, Makefile and manifest; returns the manifest."""
+        os.makedirs(os.path.join(output_dir, 'kernels'), exist_ok=True)
+        core_dir = self.experiment.config.source_dir
+        for name in CORE_FILES:
+            shutil.copy2(os.path.join(core_dir, name), os.path.join(output_dir, name))
+
+        manifest = {'compile_flags': self.experiment.base_compile_flags,
+                    'precision': self.experiment.precision.name, 'kernels': {}}
+        variant_rules = []
+        for func_name in sorted(winners):
+            variants = []
+            # Fastest recorded variant first: the constructor takes the first one the CPU supports
+            for isa_name, winner in sorted(winners[func_name].items(), key=lambda item: -item[1]['speedup']):
+                isa = get_isa_target(isa_name)
+                path = f"kernels/{func_name}_{isa.c_name}.c"
+                with open(os.path.join(output_dir, path), 'w') as f:
+                    f.write(self._variant_source(func_name, isa, winner))
+                uses_openmp = '#pragma omp' in winner['code']
+                variant_rules.append((path, isa.compile_flags + (['-fopenmp'] if uses_openmp else [])))
+                variants.append({'isa': isa_name, 'speedup': winner['speedup'], 'source': winner['source'],
+                                 'iteration': winner['iteration'], 'file': path, 'openmp': uses_openmp})
+            manifest['kernels'][func_name] = variants
+
+        with open(os.path.join(output_dir, 'tsvc_kernels.c'), 'w') as f:
+            f.write(self._dispatch_source(manifest['kernels']))
+        with open(os.path.join(output_dir, 'tsvc_kernels.h'), 'w') as f:
+            prototypes = '\n'.join(f"real_t tsvc_{func}(struct args_t * func_args);" for func in manifest['kernels'])
+            f.write(HEADER_TEMPLATE % {'prototypes': prototypes})
+        with open(os.path.join(output_dir, 'tsvc_bench.c'), 'w') as f:
+            f.write(BENCH_SOURCE)
+        with open(os.path.join(output_dir, 'Makefile'), 'w') as f:
+            f.write(self._makefile(variant_rules))
+        with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+    def build(self, output_dir: str, run_check: bool = False, timeout: int = 3600) -> subprocess.CompletedProcess:
+        """Build the library and driver with make (and run the driver when run_check is set)."""
+        return subprocess.run(['make', '-C', output_dir, 'check' if run_check else 'all'],
+                              capture_output=True, text=True, timeout=timeout)
+
+    def _variant_source(self, func_name: str, isa, winner: Dict) -> str:
+        code = self.experiment.extract_and_clean_function(winner['code'])
+        code = re.sub(rf'\b{func_name}_vectorized\b', f"{func_name}_{isa.c_name}", code)
+        return VARIANT_TEMPLATE % {
+            'func': func_name,
+            'display': isa.display_name,
+            'speedup': winner['speedup'],
+            'source': winner['source'],
+            'additional': self._static_additional_functions(func_name),
+            'code': code
+        }
+
+    def _static_additional_functions(self, func_name: str) -> str:
+        # Helpers like s31111's test() are needed by both TUs; keep each copy private
+        helpers = self.experiment._get_additional_functions(func_name)
+        return re.sub(r'^(real_t\s+\w+\s*\()', r'static \1', helpers, flags=re.MULTILINE)
+
+    def _original_source(self, func_name: str) -> str:
+        code = self.experiment.extract_tsvc_functions([func_name])[func_name]['code']
+        code = code.replace('__func__', f'"{func_name}"')
+        return re.sub(rf'^real_t {func_name}\(', f"static real_t {func_name}_original(", code, flags=re.MULTILINE)
+
+    def _argument_definition(self, func_name: str) -> Optional[str]:
+        args = self.experiment._get_function_arguments(func_name)
+        if args is None:
+            return None
+        if isinstance(args, dict):
+            return f"static struct {{real_t a; real_t b;}} {func_name}_args = {{{args['a']}, {args['b']}}};"
+        return f"static int {func_name}_args = {args};"
+
+    def _dispatch_source(self, kernels: Dict[str, List[Dict]]) -> str:
+        clones = ', '.join(['"default"'] + [f'"{isa.cpu_features[0]}"' for isa in ISA_TARGETS.values()
+                                             if isa.uses_intrinsics])
+        lines = [
+            '/*',
+            ' * Generated by kernel_library.py - do not edit.',
+            ' * Original TSVC kernels plus load-time selection of the best verified LLM variant.',
+            ' */',
+            '#include <stdlib.h>',
+            '#include <string.h>',
+            '#include <math.h>',
+            '#include <stdio.h>',
+            '#include "common.h"',
+            '#include "array_defs.h"',
+            '#include "tsvc_kernels.h"',
+            '',
+            '#ifndef TSVC_HEAP_ARRAYS',
+            '__attribute__((aligned(ARRAY_ALIGNMENT))) real_t flat_2d_array[LEN_2D*LEN_2D];',
+            '__attribute__((aligned(ARRAY_ALIGNMENT))) real_t x[LEN_1D];',
+            '__attribute__((aligned(ARRAY_ALIGNMENT))) real_t a[LEN_1D],b[LEN_1D],c[LEN_1D],d[LEN_1D],e[LEN_1D],',
+            '                                   aa[LEN_2D][LEN_2D],bb[LEN_2D][LEN_2D],cc[LEN_2D][LEN_2D],tt[LEN_2D][LEN_2D];',
+            '__attribute__((aligned(ARRAY_ALIGNMENT))) int indx[LEN_1D];',
+            '#endif',
+            'real_t* __restrict__ xx;',
+            'real_t* yy;',
+            '',
+            '// TSVC_KERNEL_ISA=<isa> restricts selection to that ISA; "original" disables the LLM variants',
+            'static int tsvc_allowed(const char * forced, const char * isa)',
+            '{',
+            '    return forced == NULL || strcmp(forced, isa) == 0;',
+            '}',
+        ]
+        table, selectors = [], []
+        for index, (func_name, variants) in enumerate(kernels.items()):
+            lines += ['', f'/* ---- {func_name} ---- */']
+            helpers = self._static_additional_functions(func_name)
+            if helpers:
+                lines.append(helpers)
+            lines.append(f'__attribute__((target_clones({clones})))')
+            lines.append(self._original_source(func_name))
+            argument = self._argument_definition(func_name)
+            if argument:
+                lines.append(argument)
+
+            lines.append('')
+            selector = [f'static void tsvc_select_{func_name}(struct tsvc_kernel * k, const char * forced)', '{']
+            for variant in variants:
+                isa = get_isa_target(variant['isa'])
+                symbol = f"{func_name}_{isa.c_name}"
+                lines.append(f'real_t {symbol}(struct args_t * func_args);')
+                checks = ' && '.join([f'tsvc_allowed(forced, "{isa.name}")'] +
+                                     [f'__builtin_cpu_supports("{feature}")' for feature in isa.cpu_features])
+                selector += [f'    if ({checks}) {{',
+                             f'        k->selected = &{symbol};',
+                             f'        k->selected_isa = "{isa.name}";',
+                             f'        k->recorded_speedup = {variant["speedup"]:.4f};',
+                             '        return;',
+                             '    }']
+            selector.append('}')
+            selectors.append('\n'.join(selector))
+            lines.append(f'real_t tsvc_{func_name}(struct args_t * func_args)')
+            lines.append('{')
+            lines.append(f'    return tsvc_kernels[{index}].selected(func_args);')
+            lines.append('}')
+
+            arg_info = f'&{func_name}_args' if argument else 'NULL'
+            table.append(f'    {{"{func_name}", &{func_name}_original, &{func_name}_original, '
+                         f'"original", 1.0, {arg_info}}},')
+
+        lines += ['', 'struct tsvc_kernel tsvc_kernels[] = {'] + table
+        if not table:
+            lines.append('    {NULL, NULL, NULL, NULL, 0.0, NULL}')
+        lines += ['};', f'const int tsvc_kernel_count = {len(table)};', '']
+        lines += selectors
+        lines += [
+            '',
+            '__attribute__((constructor))',
+            'static void tsvc_dispatch_init(void)',
+            '{',
+            '    const char * forced = getenv("TSVC_KERNEL_ISA");',
+            '    __builtin_cpu_init();',
+        ]
+        lines += [f'    tsvc_select_{func_name}(&tsvc_kernels[{index}], forced);'
+                  for index, func_name in enumerate(kernels)]
+        if not kernels:
+            lines.append('    (void)forced;')
+        lines += ['}', '']
+        return '\n'.join(lines)
+
+    def _makefile(self, variant_rules: List) -> str:
+        objects = ' '.join(path[:-2] + '.o' for path, _ in variant_rules)
+        uses_openmp = any('-fopenmp' in flags for _, flags in variant_rules)
+        rules = '\n'.join(f"{path[:-2]}.o: {path} common.h array_defs.h\n"
+                          f"\t$(CC) $(CFLAGS) {' '.join(flags)} -c -o $@ $<\n"
+                          for path, flags in variant_rules)
+        return f'''# Generated by kernel_library.py - do not edit.
+# make            builds libtsvc_kernels.a and the tsvc_bench driver
+# make check      runs every kernel and fails on a checksum mismatch
+# make DEFINES=-Diterations=1000 check   quicker regression run (after make clean)
+CC = {self.experiment.compiler}
+DEFINES =
+CFLAGS = {' '.join(self.experiment.base_compile_flags)} -I. $(DEFINES)
+LDLIBS = -lm{' -fopenmp' if uses_openmp else ''}
+
+VARIANT_OBJS = {objects}
+LIB_OBJS = tsvc_kernels.o common.o dummy.o $(VARIANT_OBJS)
+
+all: libtsvc_kernels.a tsvc_bench
+
+libtsvc_kernels.a: $(LIB_OBJS)
+\t$(AR) rcs $@ $^
+
+tsvc_bench: tsvc_bench.o libtsvc_kernels.a
+\t$(CC) $(CFLAGS) -o $@ $^ $(LDLIBS)
+
+%.o: %.c common.h array_defs.h tsvc_kernels.h
+\t$(CC) $(CFLAGS) -c -o $@ $<
+
+{rules}
+check: tsvc_bench
+\t./tsvc_bench
+
+clean:
+\trm -f *.o kernels/*.o libtsvc_kernels.a tsvc_bench
+
+.PHONY: all check clean
+'''
+
+
+def main():
+    """Build a kernel library from one or more tsvc_vectorization_results.json files"""
+    import argparse
+    import sys
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from vectorizer import TSVCVectorizerExperiment
+
+    parser = argparse.ArgumentParser(description='Export verified LLM kernels as a multi-versioned C library')
+    parser.add_argument('results', nargs='+', help='tsvc_vectorization_results.json files')
+    parser.add_argument('--output-dir', default='tsvc_kernel_library', help='Library output directory')
+    parser.add_argument('--min-speedup', type=float, default=1.0, help='Minimum verified speedup to export')
+    parser.add_argument('--precision', choices=['float', 'double'], default='float',
+                        help='real_t of the library; results at the other precision are ignored')
+    parser.add_argument('--check', action='store_true', help='Build and run the benchmark driver')
+    args = parser.parse_args()
+
+    experiment = TSVCVectorizerExperiment('unused', enable_baseline_cache=False, enable_roofline=False,
+                                          precision=args.precision)
+    exporter = KernelLibraryExporter(experiment, args.min_speedup)
+    winners = {}
+    for results_file in args.results:
+        with open(results_file, 'r') as f:
+            collected = exporter.collect(json.load(f)['results'], source=results_file)
+        for func_name, variants in collected.items():
+            for isa, winner in variants.items():
+                best = winners.setdefault(func_name, {}).get(isa)
+                if best is None or winner['speedup'] > best['speedup']:
+                    winners[func_name][isa] = winner
+
+    manifest = exporter.export(winners, args.output_dir)
+    print(f"Exported {sum(len(v) for v in manifest['kernels'].values())} variants "
+          f"of {len(manifest['kernels'])} functions to {args.output_dir}")
+    build = exporter.build(args.output_dir, run_check=args.check)
+    print(build.stdout)
+    if build.returncode != 0:
+        print(build.stderr)
+        sys.exit(build.returncode)
+
+
+if __name__ == "__main__":
+    main()
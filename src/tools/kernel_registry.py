@@ -0,0 +1,110 @@
+import hashlib
+import json
+import time
+from typing import Dict, List, Optional
+
+from baseline_cache import FileLock, function_hash, get_compiler_version, get_cpu_model, load_json, save_json
+
+# How the FSM uses the registry: ignore it, reuse a revalidated winner without calling the
+# LLM, or revalidate the winner and ask the LLM to beat it
+REGISTRY_MODES = ['off', 'reuse', 'improve']
+
+
+class KernelRegistry:
+    """
+    Persistent registry of verified vectorized kernels, shared across runs and seeds.
+
+    One winner is kept per (kernel source hash, compiler version, compile flags); the
+    flags carry the target ISA and precision. A winner stores the LLM output that
+    passed, its measured speedup and where it came from. Winners are only replaced by
+    a verified kernel that is faster by more than min_gain (so timing noise does not
+    churn winners), and a winner that fails revalidation is dropped.
+    """
+
+    def __init__(self, registry_path: str, min_gain: float = 0.02, max_history: int = 20):
+        """
+        Args:
+            registry_path: JSON file holding the registry (shared between processes)
+            min_gain: Relative speedup improvement needed to replace a winner
+            max_history: Revalidation speedups kept per winner
+        """
+        self.registry_path = registry_path
+        self.lock_path = registry_path + '.lock'
+        self.min_gain = min_gain
+        self.max_history = max_history
+        self._compiler_versions = {}
+
+    def make_key(self, func_code: str, compiler: str, flags: List[str]) -> str:
+        """Registry key of a kernel under a given compiler and build flags."""
+        if compiler not in self._compiler_versions:
+            self._compiler_versions[compiler] = get_compiler_version(compiler)
+        key_material = json.dumps({
+            'function': function_hash(func_code),
+            'compiler': self._compiler_versions[compiler],
+            'flags': list(flags)
+        }, sort_keys=True)
+        return hashlib.sha256(key_material.encode()).hexdigest()[:24]
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        with FileLock(self.lock_path):
+            return load_json(self.registry_path).get(key)
+
+    def register(self, key: str, func_name: str, code: str, performance_data: Dict,
+                 provenance: Dict) -> bool:
+        """
+        Offer a verified kernel; it becomes the winner if there is none or it is faster by min_gain.
+
+        Args:
+            key: make_key() of the original kernel
+            func_name: TSVC function name
+            code: LLM output that passed the harness
+            performance_data: Parsed harness output of the passing run
+            provenance: Model, iteration, ISA, precision, ... of the run that produced it
+
+        Returns:
+            True if the kernel is now the registered winner
+        """
+        speedup = performance_data.get('speedup')
+        if speedup is None:
+            return False
+        with FileLock(self.lock_path):
+            registry = load_json(self.registry_path)
+            current = registry.get(key)
+            if current is not None and speedup <= current['speedup'] * (1.0 + self.min_gain):
+                return False
+            registry[key] = {
+                'function': func_name,
+                'code': code,
+                'speedup': speedup,
+                'original_time': performance_data.get('original_time'),
+                'vectorized_time': performance_data.get('vectorized_time'),
+                'cpu_model': get_cpu_model(),
+                'provenance': provenance,
+                'registered': time.time(),
+                'replaced_speedup': current['speedup'] if current else None,
+                'history': [speedup]
+            }
+            save_json(self.registry_path, registry)
+        return True
+
+    def record_validation(self, key: str, performance_data: Dict):
+        """Store a successful re-benchmark; the winner's speedup tracks the latest measurement."""
+        with FileLock(self.lock_path):
+            registry = load_json(self.registry_path)
+            entry = registry.get(key)
+            if entry is None or performance_data.get('speedup') is None:
+                return
+            entry['speedup'] = performance_data['speedup']
+            entry['original_time'] = performance_data.get('original_time')
+            entry['vectorized_time'] = performance_data.get('vectorized_time')
+            entry['history'] = (entry.get('history', []) + [performance_data['speedup']])[-self.max_history:]
+            entry['last_validated'] = time.time()
+            entry['validations'] = entry.get('validations', 0) + 1
+            save_json(self.registry_path, registry)
+
+    def invalidate(self, key: str):
+        """Drop a winner, e.g. after it failed revalidation."""
+        with FileLock(self.lock_path):
+            registry = load_json(self.registry_path)
+            if registry.pop(key, None) is not None:
+                save_json(self.registry_path, registry)
@@ -0,0 +1,187 @@
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds (seconds) of the stage duration histogram: sub-second extraction up to
+# multi-minute LLM calls, sweeps and autotuning
+DURATION_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0]
+
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels: Tuple) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+
+class ExperimentMetrics:
+    """
+    Live counters, gauges and histograms of one experiment process.
+
+    Fed by the vectorizer (function start/finish, attempt outcomes) and by PipelineTrace
+    (stage start/finish), and rendered in the Prometheus text exposition format.
+    """
+
+    def __init__(self, duration_buckets: List[float] = None):
+        self.duration_buckets = duration_buckets or DURATION_BUCKETS
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._gauges: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, Dict]] = {}
+        self._log_speedup_sum = 0.0
+        self._speedup_count = 0
+
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def add_gauge(self, name: str, amount: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._gauges.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.setdefault(key, {'buckets': [0] * len(self.duration_buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.duration_buckets):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    # PipelineTrace observer interface
+    def stage_started(self, stage: str):
+        self.add_gauge('tsvc_stage_in_flight', 1, stage=stage)
+
+    def stage_finished(self, stage: str, duration: float, args: Dict):
+        self.add_gauge('tsvc_stage_in_flight', -1, stage=stage)
+        self.observe('tsvc_stage_duration_seconds', duration, stage=stage)
+        if stage == 'llm':
+            self.inc('tsvc_llm_requests_total')
+            for direction in ['input', 'output', 'cache_read', 'cache_write']:
+                tokens = args.get(f'{direction}_tokens')
+                if tokens:
+                    self.inc('tsvc_llm_tokens_total', tokens, direction=direction)
+            if args.get('code_seconds') is not None:
+                self.observe('tsvc_llm_time_to_code_seconds', args['code_seconds'])
+            if args.get('cut_off'):
+                self.inc('tsvc_llm_stream_cutoffs_total')
+
+    # Experiment progress
+    def functions_queued(self, count: int):
+        self.set_gauge('tsvc_functions_pending', count)
+
+    def functions_skipped(self, count: int):
+        self.add_gauge('tsvc_functions_pending', -count)
+
+    def function_started(self):
+        self.add_gauge('tsvc_functions_pending', -1)
+        self.add_gauge('tsvc_functions_in_flight', 1)
+
+    def function_finished(self, result: Dict, resumed: bool = False):
+        if not resumed:
+            self.add_gauge('tsvc_functions_in_flight', -1)
+        else:
+            self.add_gauge('tsvc_functions_pending', -1)
+        self.inc('tsvc_functions_completed_total', status='success' if result.get('success') else 'failed',
+                 isa=result.get('isa', ''), precision=result.get('precision', ''),
+                 source='resumed' if resumed else 'run')
+        speedup = (result.get('final_performance_data') or {}).get('speedup')
+        if result.get('success') and speedup and speedup > 0:
+            with self._lock:
+                self._log_speedup_sum += math.log(speedup)
+                self._speedup_count += 1
+                geomean = math.exp(self._log_speedup_sum / self._speedup_count)
+            self.set_gauge('tsvc_speedup_geomean', geomean)
+            self.set_gauge('tsvc_speedups_observed', self._speedup_count)
+
+    def record_attempt(self, attempt: Dict):
+        outcome = 'success' if attempt.get('success') else 'failure'
+        self.inc('tsvc_attempts_total', outcome=outcome)
+        if not attempt.get('success'):
+            self.inc('tsvc_attempt_failures_total', error_type=attempt.get('error_type') or 'unknown')
+
+    def render(self) -> str:
+        """All series in the Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            '# HELP tsvc_experiment_start_time_seconds Unix time the experiment process started.',
+            '# TYPE tsvc_experiment_start_time_seconds gauge',
+            f'tsvc_experiment_start_time_seconds {self.started:.3f}',
+        ]
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f'# TYPE {name} counter')
+                lines.extend(f'{name}{format_labels(labels)} {value:g}' for labels, value in sorted(series.items()))
+            for name, series in sorted(self._gauges.items()):
+                lines.append(f'# TYPE {name} gauge')
+                lines.extend(f'{name}{format_labels(labels)} {value:g}' for labels, value in sorted(series.items()))
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in sorted(series.items()):
+                    for bound, count in zip(self.duration_buckets, histogram['buckets']):
+                        lines.append(f'{name}_bucket{format_labels(labels + (("le", f"{bound:g}"),))} {count}')
+                    lines.append(f'{name}_bucket{format_labels(labels + (("le", "+Inf"),))} {histogram["count"]}')
+                    lines.append(f'{name}_sum{format_labels(labels)} {histogram["sum"]:.6f}')
+                    lines.append(f'{name}_count{format_labels(labels)} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Serves ExperimentMetrics on http://host:port/metrics from a daemon thread."""
+
+    def __init__(self, metrics: ExperimentMetrics, port: int, host: str = '127.0.0.1'):
+        """
+        Args:
+            metrics: Registry to expose
+            port: TCP port (0 picks a free one; see self.port after start())
+            host: Interface to bind; loopback by default
+        """
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> int:
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would drown the experiment's own output
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='tsvc-metrics', daemon=True).start()
+        return self.port
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,138 @@
+import re
+from typing import Dict, List, Optional
+
+# Failures a cheaper tier does not get another try at: the next iteration goes to the next tier
+ESCALATE_ON = ['compilation', 'correctness', 'formal_verification_failed', 'execution_error']
+
+# Token counts of an LLM stage record summed per model
+TOKEN_FIELDS = ['input_tokens', 'output_tokens', 'cache_read_tokens', 'cache_write_tokens']
+
+# Loop features that make a kernel hard to vectorize by hand, each worth one difficulty point
+_DIFFICULTY_FEATURES = {
+    # Neighbouring-element accesses such as a[i-1] or aa[j][i+1] (recurrences, wavefronts)
+    'shifted_access': re.compile(r'\[\s*[ijk]\s*[-+]\s*\d+\s*\]'),
+    # Gathers and scatters through index arrays
+    'indirect': re.compile(r'\[\s*(ip|indx)\s*\['),
+    # Control flow inside the loop body
+    'conditional': re.compile(r'\bif\s*\(|\?|\bgoto\b|\bbreak\b'),
+    # Scalars carried from one iteration to the next (reductions, induction variables)
+    'carried_scalar': re.compile(r'^\s*(\w+)\s*[+\-*]=\s*[^;]*\w+\[', re.MULTILINE),
+    # Loop nests over the 2D arrays
+    'nested_2d': re.compile(r'\b(aa|bb|cc|tt)\s*\[[^\]]*\]\s*\['),
+}
+
+
+class ModelTier:
+    """One model of a cascade and how many FSM iterations it gets before escalating."""
+
+    def __init__(self, model: str, attempts: Optional[int] = None):
+        """
+        Args:
+            model: Anthropic model name
+            attempts: Iterations on this tier before the next tier takes over (None: all remaining)
+        """
+        self.model = model
+        self.attempts = attempts
+
+    def spec(self) -> str:
+        return self.model if self.attempts is None else f"{self.model}:{self.attempts}"
+
+
+class ModelCascade:
+    """
+    Ordered models from cheapest to strongest for the vectorize/repair iterations.
+
+    A kernel starts on the first tier, or further up when its predicted difficulty
+    reaches hard_threshold per tier skipped. A tier keeps the kernel for its attempts,
+    except that the failures in escalate_on hand the next iteration straight to the
+    next tier; the last tier keeps every remaining iteration. Each attempt records the
+    model that produced it, and tier_stats() turns a run's results into per-model
+    success rates, LLM latency and token use for tuning the tiers and thresholds.
+    """
+
+    def __init__(self, tiers: List[ModelTier], hard_threshold: int = 2,
+                 escalate_on: Optional[List[str]] = None):
+        """
+        Args:
+            tiers: Models from cheapest to strongest (at least one)
+            hard_threshold: Difficulty points per tier a kernel skips at the start
+            escalate_on: Error types that escalate immediately (default: ESCALATE_ON)
+        """
+        if not tiers:
+            raise ValueError("A model cascade needs at least one tier")
+        self.tiers = list(tiers)
+        self.hard_threshold = hard_threshold
+        self.escalate_on = list(ESCALATE_ON if escalate_on is None else escalate_on)
+
+    @classmethod
+    def parse(cls, specs: List[str], **kwargs) -> 'ModelCascade':
+        """Cascade from 'model[:attempts]' strings, e.g. ['claude-3-5-haiku-20241022:1', 'claude-sonnet-4-20250514']."""
+        tiers = []
+        for spec in specs:
+            model, _, attempts = spec.partition(':')
+            try:
+                tiers.append(ModelTier(model, int(attempts) if attempts else None))
+            except ValueError:
+                raise ValueError(f"Invalid model tier '{spec}' (expected model[:attempts])")
+        return cls(tiers, **kwargs)
+
+    def is_single(self) -> bool:
+        return len(self.tiers) == 1
+
+    def spec(self) -> List[str]:
+        return [tier.spec() for tier in self.tiers]
+
+    def start_tier(self, difficulty: Dict) -> int:
+        if self.hard_threshold <= 0:
+            return 0
+        return min(difficulty['score'] // self.hard_threshold, len(self.tiers) - 1)
+
+    def next_tier(self, tier: int, tier_attempts: int, error_type: Optional[str]) -> int:
+        """Tier for the next iteration after a failed attempt, the tier_attempts-th on this tier."""
+        if tier >= len(self.tiers) - 1:
+            return tier
+        limit = self.tiers[tier].attempts
+        if error_type in self.escalate_on or (limit is not None and tier_attempts >= limit):
+            return tier + 1
+        return tier
+
+
+def predict_difficulty(function_code: str) -> Dict:
+    """
+    Static difficulty of a TSVC kernel: the loop features it uses (shifted accesses, gathers,
+    control flow, carried scalars, 2D nests) and a score of one point per feature.
+    """
+    body = function_code[function_code.find('{'):]
+    features = sorted(name for name, pattern in _DIFFICULTY_FEATURES.items() if pattern.search(body))
+    return {'features': features, 'score': len(features)}
+
+
+def tier_stats(results: List[Dict]) -> Dict[str, Dict]:
+    """
+    Per-model totals over the LLM attempts of a run's results.
+
+    Returns, keyed by model: attempts, successes, success_rate, functions it finished
+    (the final successful attempt was its), mean LLM seconds per attempt and token counts
+    (uncached input, output, cache reads and writes).
+    """
+    stats = {}
+    for result in results:
+        for attempt in result.get('attempts', []):
+            if attempt.get('registered') or not attempt.get('model'):
+                continue
+            entry = stats.setdefault(attempt['model'], dict({'attempts': 0, 'successes': 0, 'functions_finished': 0,
+                                                             'llm_seconds': 0.0}, **{name: 0 for name in TOKEN_FIELDS}))
+            entry['attempts'] += 1
+            entry['successes'] += bool(attempt['success'])
+            for record in attempt.get('stages', []):
+                if record['stage'] == 'llm':
+                    entry['llm_seconds'] += record['duration'] or 0.0
+                    for name in TOKEN_FIELDS:
+                        entry[name] += record['args'].get(name) or 0
+        final = (result.get('model_cascade') or {}).get('final_model')
+        if result['success'] and final in stats:
+            stats[final]['functions_finished'] += 1
+    for entry in stats.values():
+        entry['success_rate'] = entry['successes'] / entry['attempts']
+        entry['mean_llm_seconds'] = entry['llm_seconds'] / entry['attempts']
+    return stats
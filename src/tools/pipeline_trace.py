@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+
+class PipelineTrace:
+    """
+    Wall-time record of the vectorization pipeline's stages.
+
+    Each `stage()` block (LLM call, extraction, gcc, Alive2, benchmark run, ...) becomes
+    one record with its start, duration and free-form args such as token counts. Records
+    accumulate in a per-thread pending list that the FSM drains into the attempt or
+    result they belong to, and in a global event list that can be written as a Chrome
+    trace-event file (chrome://tracing, Perfetto) to inspect stalls and concurrency.
+    Observers (e.g. ExperimentMetrics) are told when each stage starts and finishes.
+    """
+
+    def __init__(self):
+        self.origin = time.time()
+        self.events: List[Dict] = []
+        self.observers = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, **args) -> Iterator[Dict]:
+        """
+        Time the enclosed block as stage `name`.
+
+        Yields the record so the block can attach results, e.g. record['args']['output_tokens'].
+        """
+        record = {'stage': name, 'start': time.time() - self.origin, 'duration': None, 'args': dict(args)}
+        for observer in self.observers:
+            observer.stage_started(name)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['duration'] = time.perf_counter() - start
+            for observer in self.observers:
+                observer.stage_finished(name, record['duration'], record['args'])
+            self._pending().append(record)
+            with self._lock:
+                self.events.append(dict(record, pid=os.getpid(), tid=threading.get_ident()))
+
+    def pop_stages(self) -> List[Dict]:
+        """Stage records finished on this thread since the last call."""
+        pending = self._pending()
+        self._local.pending = []
+        return pending
+
+    def _pending(self) -> List[Dict]:
+        if not hasattr(self._local, 'pending'):
+            self._local.pending = []
+        return self._local.pending
+
+    def export_chrome_trace(self, path: str, metadata: Dict = None):
+        """Write all recorded stages as complete ('X') trace events."""
+        with self._lock:
+            events = list(self.events)
+        trace_events = [{
+            'name': event['stage'],
+            'cat': 'pipeline',
+            'ph': 'X',
+            'ts': int(event['start'] * 1e6),
+            'dur': int(event['duration'] * 1e6),
+            'pid': event['pid'],
+            'tid': event['tid'],
+            'args': event['args']
+        } for event in events]
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms',
+                       'otherData': metadata or {}}, f, default=str)
+        os.replace(tmp_path, path)
+
+
+def summarize_stages(stages: List[Dict]) -> Dict:
+    """Total seconds and call count per stage, plus LLM token totals (uncached input, output, cache reads and writes)."""
+    totals = {}
+    tokens = {'input_tokens': 0, 'output_tokens': 0, 'cache_read_tokens': 0, 'cache_write_tokens': 0}
+    for record in stages:
+        entry = totals.setdefault(record['stage'], {'seconds': 0.0, 'count': 0})
+        entry['seconds'] += record['duration'] or 0.0
+        entry['count'] += 1
+        for name in tokens:
+            tokens[name] += record['args'].get(name) or 0
+    return {'stages': totals, 'tokens': tokens}
@@ -0,0 +1,69 @@
+import re
+from typing import Dict, List
+
+# Kernels with at most this many loop statements (KernelCatalog.loop_statements) are batched
+BATCH_MAX_STATEMENTS = 5
+
+
+def plan_batches(catalog, func_names: List[str], batch_size: int,
+                 max_statements: int = BATCH_MAX_STATEMENTS) -> List[List[str]]:
+    """
+    Group small kernels of the same TSVC section (`// %2.3` in tsvc.c) into batches.
+
+    Args:
+        catalog: KernelCatalog of tsvc.c
+        func_names: Functions to vectorize, in run order
+        batch_size: Most kernels per batch
+        max_statements: Kernels with more loop statements are never batched
+
+    Returns:
+        Batches of at least two functions each, in order of their first function;
+        functions left out are requested on their own
+    """
+    groups: Dict[str, List[str]] = {}
+    for func_name in func_names:
+        kernel = catalog.get(func_name)
+        if kernel and kernel['section'] and catalog.loop_statements(func_name) <= max_statements:
+            groups.setdefault(kernel['section'], []).append(func_name)
+
+    batches = []
+    for members in groups.values():
+        for start in range(0, len(members), batch_size):
+            batch = members[start:start + batch_size]
+            if len(batch) > 1:
+                batches.append(batch)
+    return batches
+
+
+def split_batch_response(text: str, func_names: List[str]) -> Dict[str, str]:
+    """
+    Route the code blocks of a batched response to their functions.
+
+    Returns, for each function with a closed code block defining `<name>_vectorized`, that
+    block (the first one if the response has several, as for single-kernel responses and the
+    stream cutoff); functions without one are left out.
+    """
+    blocks = text.split('```')[1:-1:2]  # Every other segment between fences is inside a block
+    routed = {}
+    for func_name in func_names:
+        definition = re.compile(rf'real_t\s+{re.escape(func_name)}_vectorized\s*\([^)]*\)\s*\{{.*\}}', re.DOTALL)
+        for block in blocks:
+            if definition.search(block):
+                routed[func_name] = f"```{block}```"
+                break
+    return routed
+
+
+def share_stage_records(records: List[Dict], count: int) -> List[Dict]:
+    """
+    One kernel's share of a batched request's stage records: copies with the duration and
+    token counts divided by the batch size, so per-kernel totals add up to the real call.
+    """
+    shares = []
+    for record in records:
+        args = dict(record['args'], batch_share=1.0 / count)
+        for name in ['input_tokens', 'output_tokens', 'cache_read_tokens', 'cache_write_tokens']:
+            if args.get(name):
+                args[name] = args[name] / count
+        shares.append(dict(record, duration=(record['duration'] or 0.0) / count, args=args))
+    return shares
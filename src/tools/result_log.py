@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Iterator, Optional
+
+from baseline_cache import FileLock, function_hash
+
+
+class ResultLog:
+    """
+    Append-only JSONL log of per-function experiment results.
+
+    Every finished function is appended as one line {'key', 'function', 'logged', 'result'}
+    with a single O_APPEND write followed by fsync, so a crash loses at most the function
+    in flight and never corrupts earlier lines. The key hashes the kernel source, the
+    model and the run configuration: a rerun skips keys already in the log and only
+    redoes kernels whose source or configuration changed. When a key appears more than
+    once the last line wins; a torn final line from a crash is ignored on load.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: JSONL file holding the log (created on first append)
+        """
+        self.path = path
+        self._entries = None
+
+    @staticmethod
+    def make_key(func_code: str, model: str, config: Dict) -> str:
+        """Key of one function's result under a model and run configuration."""
+        key_material = json.dumps({
+            'function': function_hash(func_code),
+            'model': model,
+            'config': config
+        }, sort_keys=True)
+        return hashlib.sha256(key_material.encode()).hexdigest()[:24]
+
+    def records(self) -> Iterator[Dict]:
+        """Every well-formed line of the log, oldest first."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(record, dict) and 'key' in record:
+                    yield record
+
+    def entries(self) -> Dict[str, Dict]:
+        """Latest logged result per key."""
+        if self._entries is None:
+            self._entries = {record['key']: record['result'] for record in self.records()}
+        return self._entries
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self.entries().get(key)
+
+    def append(self, key: str, result: Dict):
+        """Durably append one function's result."""
+        line = json.dumps({
+            'key': key,
+            'function': result.get('function'),
+            'logged': time.time(),
+            'result': result
+        }, default=str) + '\n'
+        # Lock so lines from concurrent runs sharing a log never interleave
+        with FileLock(self.path + '.lock'):
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                data = line.encode()
+                # A crash may have left a torn last line; end it so this record starts on its own line
+                size = os.fstat(fd).st_size
+                if size and os.pread(fd, 1, size - 1) != b'\n':
+                    data = b'\n' + data
+                while data:
+                    data = data[os.write(fd, data):]
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self.entries()[key] = result
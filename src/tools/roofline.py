@@ -0,0 +1,309 @@
+import json
+import os
+import subprocess
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from baseline_cache import FileLock, get_compiler_version, get_cpu_model, load_json, save_json
+from size_sweep import read_cache_hierarchy
+
+# Probe program: STREAM triad at a given array length, or peak FMA throughput.
+# The vector width and element type (-DTSVC_DOUBLE) follow the harness's own compile
+# flags, so the measured peak is the one reachable by the kernels being timed.
+PROBE_SOURCE = r'''
+#define _POSIX_C_SOURCE 200112L
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/time.h>
+
+#if defined(__AVX512F__)
+#define VBYTES 64
+#elif defined(__AVX__)
+#define VBYTES 32
+#else
+#define VBYTES 16
+#endif
+#ifdef TSVC_DOUBLE
+typedef double real_t;
+#else
+typedef float real_t;
+#endif
+#define LANES (VBYTES / (int)sizeof(real_t))
+#define NACC 12
+
+typedef real_t vreal __attribute__((vector_size(VBYTES)));
+
+static double now(void)
+{
+    struct timeval tv;
+    gettimeofday(&tv, NULL);
+    return tv.tv_sec + tv.tv_usec * 1e-6;
+}
+
+static int triad(long n, int reps)
+{
+    real_t *a, *b, *c;
+    if (posix_memalign((void **)&a, 64, n * sizeof(real_t)) || posix_memalign((void **)&b, 64, n * sizeof(real_t))
+        || posix_memalign((void **)&c, 64, n * sizeof(real_t))) {
+        fprintf(stderr, "allocation of %ld elements failed\n", n);
+        return 1;
+    }
+    for (long i = 0; i < n; i++) {
+        a[i] = 0;
+        b[i] = 1;
+        c[i] = 2;
+    }
+
+    /* Repeat small arrays so every timed rep moves at least 256 MB */
+    long inner = (256L << 20) / (3 * n * (long)sizeof(real_t));
+    if (inner < 1) inner = 1;
+    const real_t s = 3;
+    double best = 1e30;
+    for (int r = 0; r < reps; r++) {
+        double t0 = now();
+        for (long k = 0; k < inner; k++) {
+            for (long i = 0; i < n; i++)
+                a[i] = b[i] + s * c[i];
+            __asm__ volatile("" : : "r"(a) : "memory");
+        }
+        double elapsed = now() - t0;
+        if (elapsed < best) best = elapsed;
+    }
+    printf("triad_bytes_per_sec %.6e check %g\n", 3.0 * sizeof(real_t) * n * inner / best, (double)a[n / 2]);
+    free(a); free(b); free(c);
+    return 0;
+}
+
+static int flops(long n, int reps)
+{
+    vreal acc[NACC];
+    vreal m, add;
+    for (int l = 0; l < LANES; l++) {
+        m[l] = (real_t)0.999999;
+        add[l] = (real_t)1e-7;
+    }
+    for (int j = 0; j < NACC; j++)
+        for (int l = 0; l < LANES; l++)
+            acc[j][l] = (real_t)(j + l);
+
+    double best = 1e30;
+    for (int r = 0; r < reps; r++) {
+        double t0 = now();
+        for (long k = 0; k < n; k++) {
+            for (int j = 0; j < NACC; j++)
+                acc[j] = acc[j] * m + add;
+        }
+        double elapsed = now() - t0;
+        if (elapsed < best) best = elapsed;
+    }
+    real_t check = 0;
+    for (int j = 0; j < NACC; j++)
+        check += acc[j][0];
+    printf("flops_per_sec %.6e lanes %d check %g\n", 2.0 * LANES * NACC * n / best, LANES, (double)check);
+    return 0;
+}
+
+int main(int argc, char **argv)
+{
+    if (argc < 3) {
+        fprintf(stderr, "usage: %s triad|flops N [reps]\n", argv[0]);
+        return 2;
+    }
+    long n = atol(argv[2]);
+    int reps = argc > 3 ? atoi(argv[3]) : 5;
+    if (strcmp(argv[1], "triad") == 0)
+        return triad(n, reps);
+    return flops(n, reps);
+}
+'''
+
+
+class HostRoofline:
+    """
+    Measured bandwidth and compute ceilings of this host, cached per machine.
+
+    The probe runs a STREAM triad with a working set sized for each cache level and one
+    well past the last-level cache, plus an FMA throughput loop for peak GFLOP/s. Results
+    are stored in a JSON file keyed by CPU model, compiler version and compile flags, so
+    the probe runs once per host. A failed probe is recorded too (in memory and as a
+    marker in the file) and retried only after retry_failed_seconds. Kernels are then placed
+    on the roofline using the bandwidth of the cache level their working set fits in.
+    """
+
+    def __init__(self, cache_path: str, compiler: str = 'gcc', flags: List[str] = None,
+                 cache_levels: List[Dict] = None, fill_fraction: float = 0.5,
+                 dram_factor: float = 4.0, max_footprint_bytes: int = 1 << 30, element_size: int = 4,
+                 retry_failed_seconds: float = 24 * 3600):
+        """
+        Args:
+            cache_path: JSON file holding probe results (shared between processes)
+            compiler: Compiler used to build the probe
+            flags: Compile flags of the harness; the probe uses the same ISA
+            cache_levels: Override of read_cache_hierarchy()
+            fill_fraction: Fraction of each cache level the triad working set occupies
+            dram_factor: Out-of-cache working set as a multiple of the LLC
+            max_footprint_bytes: Cap on the triad's three arrays combined
+            element_size: sizeof(real_t) under flags
+            retry_failed_seconds: Age after which a recorded probe failure is probed again
+        """
+        self.cache_path = cache_path
+        self.compiler = compiler
+        self.flags = list(flags or ['-O3'])
+        self.cache_levels = cache_levels or read_cache_hierarchy()
+        self.fill_fraction = fill_fraction
+        self.dram_factor = dram_factor
+        self.max_footprint_bytes = max_footprint_bytes
+        self.element_size = element_size
+        self.retry_failed_seconds = retry_failed_seconds
+        self._ceilings = None
+        self._failed = False
+
+    def make_key(self) -> str:
+        return json.dumps({
+            'cpu_model': get_cpu_model(),
+            'compiler': get_compiler_version(self.compiler),
+            'flags': self.flags
+        }, sort_keys=True)
+
+    def get(self) -> Optional[Dict]:
+        """Return the host ceilings, probing and caching them on first use."""
+        if self._ceilings is not None or self._failed:
+            return self._ceilings
+        key = self.make_key()
+        # Hold the lock while probing so concurrent runs neither probe twice nor disturb each other
+        with FileLock(self.cache_path + '.lock'):
+            cache = load_json(self.cache_path)
+            entry = cache.get(key)
+            if entry is None or (entry.get('failed') and time.time() - entry['failed'] > self.retry_failed_seconds):
+                print("  Probing host bandwidth and peak FLOP rate (once per host)...")
+                entry = self.probe() or {'failed': time.time()}
+                cache[key] = entry
+                save_json(self.cache_path, cache)
+        if entry.get('failed'):
+            self._failed = True
+            return None
+        self._ceilings = entry
+        return self._ceilings
+
+    def probe(self) -> Optional[Dict]:
+        """Compile and run the probe program; returns None if it cannot be built."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = os.path.join(tmp_dir, 'roofline_probe.c')
+            exe = os.path.join(tmp_dir, 'roofline_probe')
+            with open(source, 'w') as f:
+                f.write(PROBE_SOURCE)
+            # -std=c99 disables FMA contraction, which the peak loop relies on
+            flags = [flag for flag in self.flags if not flag.startswith('-fopt-info')]
+            build = subprocess.run([self.compiler] + flags + ['-ffp-contract=fast', '-o', exe, source],
+                                   capture_output=True, text=True)
+            if build.returncode != 0:
+                print(f"  WARNING: roofline probe failed to compile: {build.stderr.strip()[:200]}")
+                return None
+
+            bandwidth = []
+            for label, working_set in self._triad_points():
+                n = max(16, working_set // (3 * self.element_size))
+                value = self._run(exe, ['triad', str(n)], 'triad_bytes_per_sec')
+                if value:
+                    bandwidth.append({'level': label, 'working_set_bytes': 3 * self.element_size * n,
+                                      'gbs': value / 1e9})
+            peak = self._run(exe, ['flops', '20000000'], 'flops_per_sec')
+
+        if not bandwidth or not peak:
+            return None
+        return {
+            'cpu_model': get_cpu_model(),
+            'peak_gflops': peak / 1e9,
+            'bandwidth': bandwidth,
+            'cache_levels': self.cache_levels,
+            'measured': time.time()
+        }
+
+    def _triad_points(self) -> List:
+        points = [(f"L{lvl['level']}", int(lvl['size_bytes'] * self.fill_fraction))
+                  for lvl in self.cache_levels]
+        llc = self.cache_levels[-1]['size_bytes']
+        dram = min(int(llc * self.dram_factor), self.max_footprint_bytes)
+        if dram > llc:
+            points.append(('DRAM', dram))
+        return points
+
+    def _run(self, exe: str, args: List[str], field: str) -> Optional[float]:
+        try:
+            result = subprocess.run([exe] + args, capture_output=True, text=True, timeout=300)
+        except subprocess.TimeoutExpired:
+            return None
+        parts = result.stdout.split()
+        if result.returncode != 0 or field not in parts:
+            return None
+        return float(parts[parts.index(field) + 1])
+
+    def bandwidth_for(self, working_set_bytes: int, ceilings: Optional[Dict] = None) -> Optional[Dict]:
+        """Bandwidth ceiling of the smallest cache level holding the working set."""
+        ceilings = ceilings or self.get()
+        if not ceilings:
+            return None
+        by_level = {point['level']: point for point in ceilings['bandwidth']}
+        for lvl in ceilings['cache_levels']:
+            label = f"L{lvl['level']}"
+            if working_set_bytes <= lvl['size_bytes'] and label in by_level:
+                return by_level[label]
+        return by_level.get('DRAM') or ceilings['bandwidth'][-1]
+
+    def annotate(self, traffic: Dict, total_elements: int, working_set_bytes: int,
+                 timings: Dict[str, Optional[float]]) -> Optional[Dict]:
+        """
+        Place measured timings on the roofline.
+
+        Args:
+            traffic: KernelCatalog.estimate_traffic() result for the kernel
+            total_elements: Inner-loop elements processed over the whole timed run
+            working_set_bytes: Bytes of array data the kernel touches per pass
+            timings: Elapsed seconds per variant, e.g. {'original': ..., 'vectorized': ...}
+
+        Returns:
+            Dict with the ceilings used and achieved GB/s, GFLOP/s and percent of
+            roofline per variant, or None if the host could not be probed
+        """
+        ceilings = self.get()
+        if not ceilings or total_elements <= 0:
+            return None
+        bandwidth = self.bandwidth_for(working_set_bytes, ceilings)
+        if not bandwidth:
+            return None
+
+        bytes_per_element = traffic['bytes_per_element']
+        flops_per_element = traffic['flops_per_element']
+        intensity = flops_per_element / bytes_per_element if bytes_per_element else None
+        peak = ceilings['peak_gflops']
+        if intensity is None:
+            attainable = peak
+        else:
+            attainable = min(peak, intensity * bandwidth['gbs'])
+
+        annotation = {
+            'bytes_per_element': bytes_per_element,
+            'flops_per_element': flops_per_element,
+            'arithmetic_intensity': intensity,
+            'working_set_bytes': working_set_bytes,
+            'memory_level': bandwidth['level'],
+            'bandwidth_ceiling_gbs': bandwidth['gbs'],
+            'peak_gflops': peak,
+            'attainable_gflops': attainable,
+            'bound': 'compute' if intensity is None or attainable >= peak else 'memory',
+        }
+        for variant, elapsed in timings.items():
+            if not elapsed or elapsed <= 0:
+                annotation[variant] = None
+                continue
+            gbs = bytes_per_element * total_elements / elapsed / 1e9
+            gflops = flops_per_element * total_elements / elapsed / 1e9
+            # Copy-only kernels have no flops; rate them against the bandwidth ceiling instead
+            if flops_per_element:
+                percent = 100.0 * gflops / attainable
+            else:
+                percent = 100.0 * gbs / bandwidth['gbs']
+            annotation[variant] = {'gbs': gbs, 'gflops': gflops, 'pct_of_roofline': percent}
+        return annotation
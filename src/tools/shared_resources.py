@@ -0,0 +1,76 @@
+import multiprocessing
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from thread_scaling import available_cpus
+
+
+class SharedResources:
+    """
+    Limits shared by concurrent experiment runs in separate worker processes.
+
+    Created once by the parent before the workers start and handed to each run's
+    TSVCVectorizerExperiment. LLM requests are bounded by a cross-process semaphore,
+    and every harness run is pinned to CPUs checked out of a common pool, so runs
+    benchmarking at the same time never share a core and their timings stay comparable.
+    LLM tokens are counted across runs against an optional global token budget and deadline.
+    """
+
+    def __init__(self, llm_concurrency: int = 4, cpus: Optional[List[int]] = None,
+                 token_budget: Optional[int] = None, deadline: Optional[float] = None):
+        """
+        Args:
+            llm_concurrency: LLM requests allowed in flight across all runs
+            cpus: CPU ids of the benchmark pool (default: every CPU this process may use)
+            token_budget: LLM input + output tokens all runs may use together (None: unlimited)
+            deadline: Unix time after which no new LLM iteration starts (None: none)
+        """
+        if cpus is None:
+            try:
+                cpus = sorted(os.sched_getaffinity(0))
+            except AttributeError:
+                cpus = list(range(available_cpus()))
+        self.llm_concurrency = llm_concurrency
+        self.cpus = list(cpus)
+        self._llm_slots = multiprocessing.BoundedSemaphore(llm_concurrency)
+        self._free_cpus = multiprocessing.Queue()
+        for cpu in self.cpus:
+            self._free_cpus.put(cpu)
+        # Multi-CPU checkouts take their CPUs atomically so two of them cannot deadlock
+        self._checkout_lock = multiprocessing.Lock()
+        self.token_budget = token_budget
+        self.deadline = deadline
+        self._tokens_used = multiprocessing.Value('q', 0)
+
+    @contextmanager
+    def llm_slot(self) -> Iterator[None]:
+        with self._llm_slots:
+            yield
+
+    @contextmanager
+    def benchmark_cpus(self, count: int = 1) -> Iterator[List[int]]:
+        """Check out `count` CPUs (at most the pool size) for one benchmark; blocks until they are free."""
+        count = max(1, min(count, len(self.cpus)))
+        with self._checkout_lock:
+            cpus = [self._free_cpus.get() for _ in range(count)]
+        try:
+            yield cpus
+        finally:
+            for cpu in cpus:
+                self._free_cpus.put(cpu)
+
+    def add_tokens(self, count: int):
+        with self._tokens_used.get_lock():
+            self._tokens_used.value += count
+
+    @property
+    def tokens_used(self) -> int:
+        return self._tokens_used.value
+
+    def budget_exhausted(self) -> bool:
+        """True once the token budget is spent or the deadline has passed."""
+        if self.token_budget is not None and self.tokens_used >= self.token_budget:
+            return True
+        return self.deadline is not None and time.time() >= self.deadline
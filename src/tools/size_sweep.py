@@ -0,0 +1,222 @@
+import glob
+import math
+import os
+import re
+import subprocess
+from typing import Dict, List
+
+# Used when /sys does not expose the cache hierarchy (containers, non-Linux hosts)
+DEFAULT_CACHE_LEVELS = [
+    {'level': 1, 'size_bytes': 32 * 1024},
+    {'level': 2, 'size_bytes': 1024 * 1024},
+    {'level': 3, 'size_bytes': 32 * 1024 * 1024},
+]
+
+# Default build constants from common.h; work per size is scaled to match them
+DEFAULT_LEN_1D = 32000
+DEFAULT_LEN_2D = 256
+DEFAULT_ITERATIONS = 100000
+
+
+def _parse_cache_size(text: str) -> int:
+    match = re.match(r'(\d+)\s*([KMG]?)', text.strip().upper())
+    if not match:
+        return 0
+    scale = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}[match.group(2)]
+    return int(match.group(1)) * scale
+
+
+def read_cache_hierarchy(cpu: int = 0) -> List[Dict]:
+    """
+    Read data/unified cache capacities for one CPU from /sys.
+
+    Returns:
+        List of {'level', 'size_bytes'} sorted by level, or DEFAULT_CACHE_LEVELS
+    """
+    levels = {}
+    for index_dir in glob.glob(f'/sys/devices/system/cpu/cpu{cpu}/cache/index*'):
+        try:
+            with open(os.path.join(index_dir, 'type')) as f:
+                cache_type = f.read().strip()
+            with open(os.path.join(index_dir, 'level')) as f:
+                level = int(f.read().strip())
+            with open(os.path.join(index_dir, 'size')) as f:
+                size_bytes = _parse_cache_size(f.read())
+        except (OSError, ValueError):
+            continue
+        if cache_type == 'Instruction' or size_bytes <= 0:
+            continue
+        levels[level] = max(levels.get(level, 0), size_bytes)
+
+    if not levels:
+        return [dict(level) for level in DEFAULT_CACHE_LEVELS]
+    return [{'level': level, 'size_bytes': levels[level]} for level in sorted(levels)]
+
+
+class ProblemSizeSweep:
+    """
+    Rebuild a function's harness for a list of problem sizes across the cache hierarchy.
+
+    For each cache level a size is chosen whose working set fills about half of that
+    level, plus one size well past the last-level cache when the static arrays can be
+    made that large. With `include_remainder`, each size also gets a non-multiple-of-8
+    variant to exercise remainder handling. The outer repetition count is scaled so
+    every size does roughly the same total work.
+    """
+
+    def __init__(self, experiment, catalog, cache_levels: List[Dict] = None,
+                 include_remainder: bool = True, fill_fraction: float = 0.5,
+                 dram_factor: float = 4.0, max_footprint_bytes: int = 1 << 30,
+                 timeout: int = 120):
+        """
+        Args:
+            experiment: TSVCVectorizerExperiment providing harness generation and compilation
+            catalog: KernelCatalog for tsvc.c
+            cache_levels: Override of read_cache_hierarchy()
+            include_remainder: Add a non-multiple-of-8 variant of every size
+            fill_fraction: Fraction of each cache level the working set should occupy
+            dram_factor: Working set of the out-of-cache point as a multiple of the LLC
+            max_footprint_bytes: Cap on the harness's total static array footprint
+            timeout: Per-size harness timeout in seconds
+        """
+        self.experiment = experiment
+        self.catalog = catalog
+        self.cache_levels = cache_levels or read_cache_hierarchy()
+        self.include_remainder = include_remainder
+        self.fill_fraction = fill_fraction
+        self.dram_factor = dram_factor
+        self.max_footprint_bytes = max_footprint_bytes
+        self.timeout = timeout
+        self.element_size = experiment.precision.element_bytes  # sizeof(real_t)
+
+    def choose_sizes(self, func_name: str) -> List[Dict]:
+        """Pick (LEN_1D, LEN_2D, iterations) points for a kernel from the cache capacities."""
+        counts = self.catalog.working_set_arrays(func_name)
+        is_2d = self.catalog.is_2d(func_name)
+        llc = self.cache_levels[-1]['size_bytes']
+
+        targets = [(f"L{lvl['level']}", lvl['size_bytes'] * self.fill_fraction)
+                   for lvl in self.cache_levels]
+        targets.append(('DRAM', llc * self.dram_factor))
+
+        points = []
+        for label, target_bytes in targets:
+            if is_2d:
+                n_arrays = max(counts['2d'], 1)
+                len_2d = max(16, int(math.sqrt(target_bytes / (n_arrays * self.element_size))) // 8 * 8)
+                len_2d = min(len_2d, self._max_len_2d())
+                if label == 'DRAM' and n_arrays * len_2d * len_2d * self.element_size <= llc:
+                    continue  # Static arrays cannot be made larger than the LLC on this host
+                variants = [len_2d, len_2d + 3] if self.include_remainder else [len_2d]
+                for value in variants:
+                    points.append(self._make_point(label, max(DEFAULT_LEN_1D, value), value, is_2d))
+            else:
+                n_arrays = max(counts['1d'], 1)
+                len_1d = max(64, int(target_bytes / (n_arrays * self.element_size)) // 8 * 8)
+                len_1d = min(len_1d, self._max_len_1d())
+                if label == 'DRAM' and n_arrays * len_1d * self.element_size <= llc:
+                    continue
+                variants = [len_1d, len_1d + 5] if self.include_remainder else [len_1d]
+                for value in variants:
+                    points.append(self._make_point(label, max(value, DEFAULT_LEN_2D), DEFAULT_LEN_2D, is_2d))
+        return points
+
+    def _max_len_1d(self) -> int:
+        # Every harness statically allocates x, a-e and indx at LEN_1D plus five LEN_2D^2 arrays
+        fixed = 5 * DEFAULT_LEN_2D * DEFAULT_LEN_2D * self.element_size
+        return (self.max_footprint_bytes - fixed) // (7 * self.element_size) // 8 * 8 - 8
+
+    def _max_len_2d(self) -> int:
+        fixed = 7 * DEFAULT_LEN_1D * self.element_size
+        return int(math.sqrt((self.max_footprint_bytes - fixed) / (5 * self.element_size))) // 8 * 8 - 8
+
+    def _make_point(self, label: str, len_1d: int, len_2d: int, is_2d: bool) -> Dict:
+        if is_2d:
+            scale = (DEFAULT_LEN_2D * DEFAULT_LEN_2D) / (len_2d * len_2d)
+        else:
+            scale = DEFAULT_LEN_1D / len_1d
+        # Kernels divide iterations by LEN_2D, so keep at least one repetition
+        iterations = max(len_2d, int(DEFAULT_ITERATIONS * scale))
+        return {'cache_level': label, 'len_1d': len_1d, 'len_2d': len_2d, 'iterations': iterations}
+
+    def run(self, func_name: str, vectorized_func: str, output_dir: str) -> List[Dict]:
+        """Build and run the harness at every size; returns one record per size."""
+        os.makedirs(output_dir, exist_ok=True)
+        harness = self.experiment.create_modified_tsvc(func_name, vectorized_func)
+        harness_path = os.path.join(output_dir, f"modified_tsvc_{func_name}_sweep.c")
+        with open(harness_path, 'w') as f:
+            f.write(harness)
+
+        records = []
+        for point in self.choose_sizes(func_name):
+            tag = f"{point['len_1d']}x{point['len_2d']}"
+            exe_file = os.path.join(output_dir, f"sweep_{func_name}_{tag}")
+            defines = [f"-DLEN_1D={point['len_1d']}", f"-DLEN_2D={point['len_2d']}",
+                       f"-Diterations={point['iterations']}"]
+            record = dict(point)
+            record['remainder'] = (point['len_2d'] if self.catalog.is_2d(func_name) else point['len_1d']) % 8 != 0
+
+            compile_result = self.experiment.compile_harness(harness_path, exe_file, defines)
+            if compile_result.returncode != 0:
+                record['status'] = 'compile_error'
+                records.append(record)
+                continue
+
+            try:
+                run_result = self.experiment.run_harness(exe_file, timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                record['status'] = 'timeout'
+                records.append(record)
+                continue
+
+            perf = self.experiment.parse_performance_output(run_result.stdout)
+            record.update(self._derive_metrics(func_name, point, perf))
+            record['status'] = 'ok' if run_result.returncode == 0 else 'crashed'
+            record['correct'] = "CORRECTNESS: PASS" in run_result.stdout
+            records.append(record)
+            print(f"    {point['cache_level']:>4} LEN_1D={point['len_1d']:<9} LEN_2D={point['len_2d']:<6} "
+                  f"speedup={record.get('speedup')}x correct={record['correct']}")
+        return records
+
+    def _derive_metrics(self, func_name: str, point: Dict, perf: Dict) -> Dict:
+        # A calibrating harness reports the repeat count it actually used
+        iterations = perf.get('iterations') or point['iterations']
+        outer = self.catalog.outer_loop_count(func_name, iterations, point['len_1d'], point['len_2d'])
+        elements = self.catalog.elements_per_pass(func_name, point['len_1d'], point['len_2d'])
+        working_set = self.catalog.working_set_bytes(func_name, point['len_1d'], point['len_2d'],
+                                                     self.element_size)
+
+        metrics = {
+            'working_set_bytes': working_set,
+            'outer_iterations': outer,
+            'original_time': perf.get('original_time'),
+            'vectorized_time': perf.get('vectorized_time'),
+            'speedup': perf.get('speedup'),
+            'original_ns_per_element': None,
+            'vectorized_ns_per_element': None,
+        }
+        total_elements = (outer or 0) * elements
+        if total_elements > 0:
+            for key in ['original', 'vectorized']:
+                elapsed = perf.get(f'{key}_time')
+                if elapsed:
+                    metrics[f'{key}_ns_per_element'] = elapsed * 1e9 / total_elements
+        return metrics
+
+
+def classify_scaling(records: List[Dict], collapse_ratio: float = 0.75) -> str:
+    """
+    Summarize a speedup curve.
+
+    'bandwidth_bound' when the out-of-cache speedup drops below collapse_ratio of the
+    best in-cache speedup, 'compute_bound' when it holds, 'unknown' without data.
+    """
+    in_cache = [r['speedup'] for r in records
+                if r.get('speedup') and r.get('correct') and r['cache_level'] != 'DRAM']
+    out_of_cache = [r['speedup'] for r in records
+                    if r.get('speedup') and r.get('correct') and r['cache_level'] == 'DRAM']
+    if not in_cache or not out_of_cache:
+        return 'unknown'
+    if min(out_of_cache) < collapse_ratio * max(in_cache):
+        return 'bandwidth_bound'
+    return 'compute_bound'
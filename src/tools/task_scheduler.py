@@ -0,0 +1,169 @@
+import glob
+import heapq
+import os
+import statistics
+from typing import Dict, List, Optional, Tuple
+
+from headroom import predicted_speedup
+from result_log import ResultLog
+
+# LLM tokens per FSM iteration assumed before any run has logged token counts
+DEFAULT_TOKENS_PER_ITERATION = 6000
+
+
+class TaskCostModel:
+    """
+    Expected wall time of vectorizing one function, learned from earlier runs' result logs.
+
+    Uses the median of each logged result's timing['wall_seconds'] per (function, ISA),
+    falling back to the function on any ISA. Functions never seen before are assumed to
+    be as expensive as the slowest known one, so a longest-first schedule starts them
+    early instead of leaving an unknown straggler for the end. The same logs give each
+    function's past success rate and verified speedups, and the LLM tokens per iteration.
+    """
+
+    def __init__(self, log_paths: List[str]):
+        """
+        Args:
+            log_paths: tsvc_results_log.jsonl files of earlier runs (missing files are ignored)
+        """
+        self.log_paths = list(log_paths)
+        samples: Dict[Tuple[str, str], List[float]] = {}
+        self.outcomes: Dict[str, List[bool]] = {}
+        self.speedups: Dict[str, List[float]] = {}
+        iteration_tokens = []
+        for path in self.log_paths:
+            for record in ResultLog(path).records():
+                result = record['result']
+                if result.get('api_error') or result.get('budget_exhausted'):
+                    continue
+                func_name = result.get('function')
+                self.outcomes.setdefault(func_name, []).append(bool(result.get('success')))
+                speedup = (result.get('final_performance_data') or {}).get('speedup')
+                if result.get('success') and speedup:
+                    self.speedups.setdefault(func_name, []).append(speedup)
+                timing = result.get('timing') or {}
+                llm_calls = timing.get('stages', {}).get('llm', {}).get('count')
+                if llm_calls:
+                    tokens = timing.get('tokens', {})
+                    # Tokens counted against a token budget; cache reads are not
+                    iteration_tokens.append(sum(tokens.get(name) or 0 for name in
+                                                ['input_tokens', 'cache_write_tokens', 'output_tokens']) / llm_calls)
+                if timing.get('wall_seconds'):
+                    samples.setdefault((func_name, result.get('isa')), []).append(timing['wall_seconds'])
+
+        self.costs = {key: statistics.median(values) for key, values in samples.items()}
+        by_function: Dict[str, List[float]] = {}
+        for (func_name, _), values in samples.items():
+            by_function.setdefault(func_name, []).extend(values)
+        self.function_costs = {name: statistics.median(values) for name, values in by_function.items()}
+        self.default_cost = max(self.costs.values()) if self.costs else 1.0
+        self.tokens_per_iteration = (statistics.median(iteration_tokens) if iteration_tokens
+                                     else DEFAULT_TOKENS_PER_ITERATION)
+
+    @classmethod
+    def from_runs(cls, base_dir: str) -> 'TaskCostModel':
+        """Cost model over every experiment_run_*/tsvc_results_log.jsonl under base_dir."""
+        return cls(sorted(glob.glob(os.path.join(base_dir, 'experiment_run_*', 'tsvc_results_log.jsonl'))))
+
+    def expected_seconds(self, func_name: str, isa_name: Optional[str] = None) -> float:
+        if (func_name, isa_name) in self.costs:
+            return self.costs[(func_name, isa_name)]
+        return self.function_costs.get(func_name, self.default_cost)
+
+    def success_rate(self, func_name: str) -> float:
+        """Past share of successful results, with a uniform prior ((successes + 1) / (runs + 2))."""
+        outcomes = self.outcomes.get(func_name, [])
+        return (sum(outcomes) + 1.0) / (len(outcomes) + 2.0)
+
+    def past_speedup(self, func_name: str) -> Optional[float]:
+        """Median verified speedup of earlier successful results, None if there are none."""
+        speedups = self.speedups.get(func_name)
+        return statistics.median(speedups) if speedups else None
+
+
+def longest_first(tasks: List[Dict], cost_model: TaskCostModel) -> List[Dict]:
+    """
+    Order tasks by expected cost, longest first (LPT list scheduling).
+
+    Workers that always take the next task of this order finish a task matrix within
+    4/3 of the optimal makespan; each task gets its estimate as 'expected_seconds'.
+    """
+    for task in tasks:
+        task['expected_seconds'] = cost_model.expected_seconds(task['function'], task['isa'])
+    return sorted(tasks, key=lambda task: -task['expected_seconds'])
+
+
+def rank_by_headroom(tasks: List[Dict], cost_model: TaskCostModel, probes: Dict[Tuple[str, str], Optional[Dict]],
+                     isa_lanes: Dict[str, int]) -> List[Dict]:
+    """
+    Order tasks by expected speedup gained per expected second, highest first.
+
+    A task's predicted speedup is the median of earlier verified speedups of its function,
+    else the SIMD headroom its HeadroomProbe leaves (predicted_speedup); the expected gain
+    weights (predicted - 1) by the function's past success rate. Each task gets
+    'predicted_speedup', 'success_rate', 'expected_gain' and 'expected_seconds'.
+    """
+    for task in tasks:
+        func_name, isa_name = task['function'], task['isa']
+        task['expected_seconds'] = cost_model.expected_seconds(func_name, isa_name)
+        task['predicted_speedup'] = (cost_model.past_speedup(func_name)
+                                     or predicted_speedup(probes.get((func_name, isa_name)), isa_lanes[isa_name]))
+        task['success_rate'] = cost_model.success_rate(func_name)
+        task['expected_gain'] = task['success_rate'] * max(task['predicted_speedup'] - 1.0, 0.0)
+    return sorted(tasks, key=lambda task: -task['expected_gain'] / max(task['expected_seconds'], 1e-3))
+
+
+def allocate_iterations(tasks: List[Dict], cost_model: TaskCostModel, token_budget: Optional[float],
+                        seconds_budget: Optional[float], default_iterations: int = 3,
+                        max_iterations: int = 6) -> List[Dict]:
+    """
+    Split a global token and worker-seconds budget into per-task FSM iteration limits.
+
+    A task whose function succeeded with probability p within default_iterations is taken
+    to succeed in each iteration with q = 1 - (1 - p)^(1 / default_iterations), so its k-th
+    iteration adds (predicted - 1) * q * (1 - q)^(k - 1) expected speedup. Iterations are
+    handed out greedily by that marginal gain per unit of budget until the budget is spent;
+    tasks are expected to come from rank_by_headroom. Each task gets 'max_iterations'
+    (0 when the budget ran out before its first iteration). Without budgets every task
+    gets default_iterations.
+    """
+    if token_budget is None and seconds_budget is None:
+        for task in tasks:
+            task['max_iterations'] = default_iterations
+        return tasks
+
+    tokens_left = token_budget if token_budget is not None else float('inf')
+    seconds_left = seconds_budget if seconds_budget is not None else float('inf')
+    heap = []
+    for index, task in enumerate(tasks):
+        task['max_iterations'] = 0
+        task['iteration_seconds'] = task['expected_seconds'] / default_iterations
+        task['iteration_q'] = 1.0 - (1.0 - task['success_rate']) ** (1.0 / default_iterations)
+        heapq.heappush(heap, (-_iteration_value(task, 1, token_budget, seconds_budget, cost_model), index))
+
+    while heap:
+        _, index = heapq.heappop(heap)
+        task = tasks[index]
+        if cost_model.tokens_per_iteration > tokens_left or task['iteration_seconds'] > seconds_left:
+            continue
+        tokens_left -= cost_model.tokens_per_iteration
+        seconds_left -= task['iteration_seconds']
+        task['max_iterations'] += 1
+        if task['max_iterations'] < max_iterations:
+            value = _iteration_value(task, task['max_iterations'] + 1, token_budget, seconds_budget, cost_model)
+            heapq.heappush(heap, (-value, index))
+    return tasks
+
+
+def _iteration_value(task: Dict, iteration: int, token_budget: Optional[float], seconds_budget: Optional[float],
+                     cost_model: TaskCostModel) -> float:
+    """Expected speedup gain of a task's iteration-th iteration per share of the budget it uses."""
+    # A small floor keeps no-headroom kernels in the queue for leftover budget
+    gain = max(task['predicted_speedup'] - 1.0, 0.01) * task['iteration_q'] * (1.0 - task['iteration_q']) ** (iteration - 1)
+    cost = 0.0
+    if token_budget:
+        cost += cost_model.tokens_per_iteration / token_budget
+    if seconds_budget:
+        cost += task['iteration_seconds'] / seconds_budget
+    return gain / max(cost, 1e-12)
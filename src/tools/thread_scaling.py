@@ -0,0 +1,119 @@
+import os
+import subprocess
+from typing import Dict, List
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects taskset/cgroup affinity)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_thread_counts(max_threads: int) -> List[int]:
+    """Powers of two up to max_threads, plus max_threads itself."""
+    counts = []
+    threads = 1
+    while threads < max_threads:
+        counts.append(threads)
+        threads *= 2
+    counts.append(max_threads)
+    return counts
+
+
+def openmp_env(threads: int, base_env: Dict = None) -> Dict[str, str]:
+    """Environment for a pinned OpenMP run: one thread per core, packed close together."""
+    env = dict(base_env if base_env is not None else os.environ)
+    env.update({
+        'OMP_NUM_THREADS': str(threads),
+        'OMP_PROC_BIND': 'close',
+        'OMP_PLACES': 'cores',
+        'OMP_DYNAMIC': 'false',
+    })
+    return env
+
+
+class ThreadScalingRunner:
+    """
+    Strong-scaling measurement of an OpenMP + SIMD candidate.
+
+    One harness build (compiled with -fopenmp) is run with 1..N pinned threads at a
+    fixed repeat count, the one calibrated for the single-thread run. The original
+    kernel has no OpenMP pragmas, so it stays the single-thread scalar baseline while
+    the vectorized kernel's time gives parallel speedup and efficiency.
+    """
+
+    def __init__(self, experiment, thread_counts: List[int] = None, timeout: int = 120):
+        """
+        Args:
+            experiment: TSVCVectorizerExperiment providing harness generation and compilation
+            thread_counts: Thread counts to run (default: powers of two up to available_cpus())
+            timeout: Per-run harness timeout in seconds
+        """
+        self.experiment = experiment
+        self.thread_counts = thread_counts or default_thread_counts(available_cpus())
+        self.timeout = timeout
+
+    def run(self, func_name: str, vectorized_func: str, output_dir: str) -> List[Dict]:
+        """Build the harness and run it once per thread count; returns one record per count."""
+        os.makedirs(output_dir, exist_ok=True)
+        harness = self.experiment.create_modified_tsvc(func_name, vectorized_func)
+        harness_path = os.path.join(output_dir, f"modified_tsvc_{func_name}_threads.c")
+        with open(harness_path, 'w') as f:
+            f.write(harness)
+
+        exe_file = os.path.join(output_dir, f"threads_{func_name}")
+        compile_result = self.experiment.compile_harness(harness_path, exe_file)
+        if compile_result.returncode != 0:
+            return [{'threads': threads, 'status': 'compile_error'} for threads in self.thread_counts]
+
+        records = []
+        pinned_iterations = None
+        for threads in self.thread_counts:
+            record = {'threads': threads}
+            if pinned_iterations is None and records and records[0].get('iterations'):
+                # Rebuild at the repeat count calibrated by the first run so every count does equal work
+                pinned_iterations = records[0]['iterations']
+                rebuild = self.experiment.compile_harness(harness_path, exe_file,
+                                                          [f"-DTSVC_FIXED_ITERATIONS={pinned_iterations}"])
+                if rebuild.returncode != 0:
+                    # The old binary would recalibrate per count; don't report unequal work as scaling
+                    records += [{'threads': count, 'status': 'compile_error'}
+                                for count in self.thread_counts[len(records):]]
+                    break
+
+            try:
+                run_result = self.experiment.run_harness(exe_file, timeout=self.timeout,
+                                                         env=openmp_env(threads))
+            except subprocess.TimeoutExpired:
+                record['status'] = 'timeout'
+                records.append(record)
+                continue
+
+            perf = self.experiment.parse_performance_output(run_result.stdout)
+            record.update({
+                'status': 'ok' if run_result.returncode == 0 else 'crashed',
+                'correct': "CORRECTNESS: PASS" in run_result.stdout,
+                'iterations': perf.get('iterations'),
+                'original_time': perf.get('original_time'),
+                'vectorized_time': perf.get('vectorized_time'),
+                'speedup': perf.get('speedup'),
+            })
+            records.append(record)
+
+        self._add_efficiency(records)
+        for record in records:
+            print(f"    threads={record['threads']:<3} speedup={record.get('speedup')}x "
+                  f"efficiency={record.get('parallel_efficiency')} correct={record.get('correct')}")
+        return records
+
+    def _add_efficiency(self, records: List[Dict]):
+        single = next((r for r in records if r['threads'] == 1 and r.get('vectorized_time')), None)
+        if single is None:
+            return
+        for record in records:
+            elapsed = record.get('vectorized_time')
+            if elapsed:
+                record['parallel_speedup'] = single['vectorized_time'] / elapsed
+                record['parallel_efficiency'] = record['parallel_speedup'] / record['threads']